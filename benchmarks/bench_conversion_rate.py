@@ -0,0 +1,62 @@
+# benchmarks/bench_conversion_rate.py
+"""
+Daily sales conversion: groupby.apply(lambda) vs the vectorized bincount path.
+
+    python benchmarks/bench_conversion_rate.py --rows 1000000 10000000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.kpis import FRACTION_KPIS, fraction_per_period
+
+
+def make_leads(rows: int, days: int = 365, seed: int = 5) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "date": pd.Timestamp("2025-01-01") + pd.to_timedelta(np.sort(rng.integers(0, days, rows)), unit="D"),
+        "stage": pd.Categorical(rng.choice(["MQL", "SQL"], rows, p=[0.7, 0.3])),
+    })
+
+
+def apply_lambda(df):
+    return df.groupby(df['date'].dt.date).apply(lambda g: (g['stage'] == 'SQL').sum() / max(1, len(g)))
+
+
+def vectorized(df):
+    return fraction_per_period(df, FRACTION_KPIS['sales_conversion'])
+
+
+def best_of(fn, df, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn(df)
+        times.append(time.perf_counter() - t0)
+    return out, min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        df = make_leads(rows)
+        slow, t_slow = best_of(apply_lambda, df, args.repeat)
+        fast, t_fast = best_of(vectorized, df, args.repeat)
+        np.testing.assert_allclose(slow.to_numpy(dtype=float), fast.to_numpy())
+        print(f"rows={rows:>10,}  groupby.apply={t_slow * 1000:9.1f} ms  "
+              f"bincount={t_fast * 1000:8.1f} ms  ({t_slow / t_fast:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
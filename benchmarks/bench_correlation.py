@@ -0,0 +1,64 @@
+# benchmarks/bench_correlation.py
+"""
+Cost of CorrelationStore: building lagged statistics of a few headline KPIs
+against many daily segment series and appending one day, versus recomputing
+every lagged pair with pandas.
+
+    python benchmarks/bench_correlation.py --series 2000 --targets 5 --days 365
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.correlation_store import CorrelationStore
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--series", type=int, default=500)
+    parser.add_argument("--targets", type=int, default=5)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--max-lag", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    values = rng.normal(size=(args.days + 1, args.series)).cumsum(axis=0)
+    frame = pd.DataFrame(values, index=pd.date_range("2024-01-01", periods=args.days + 1),
+                         columns=[f"kpi{i}" if i < args.targets else f"kpi0|segment=s{i}"
+                                  for i in range(args.series)])
+
+    store = CorrelationStore(None, max_lag=args.max_lag, max_series=args.series)
+    t0 = time.perf_counter()
+    store.update(frame.iloc[:-1])
+    build = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    store.update(frame)
+    append = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    store.matrix()
+    corr = time.perf_counter() - t0
+
+    # pandas baseline: one full correlation per lag over the whole history
+    t0 = time.perf_counter()
+    closed = frame.iloc[:-1]
+    for lag in range(min(args.max_lag + 1, 2)):
+        pd.concat([closed, closed.shift(lag).add_suffix("_lag")], axis=1).corr()
+    baseline = (time.perf_counter() - t0) / min(args.max_lag + 1, 2) * (args.max_lag + 1)
+
+    mb = sum(a.nbytes for a in store._stats.values()) / 1e6
+    print(f"series={args.series} targets={args.targets} days={args.days} lags=0..{args.max_lag} state={mb:.1f} MB")
+    print(f"initial build  {build:8.3f}s")
+    print(f"append 1 day   {append:8.3f}s")
+    print(f"matrix         {corr:8.3f}s")
+    print(f"pandas recompute (est.) {baseline:8.3f}s per cycle")
+
+
+if __name__ == "__main__":
+    main()
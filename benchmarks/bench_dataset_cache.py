@@ -0,0 +1,70 @@
+# benchmarks/bench_dataset_cache.py
+"""
+Cold vs warm load of a synthetic support export through DataFetcher.
+
+    python benchmarks/bench_dataset_cache.py --rows 1000000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.tools.data_fetcher import DataFetcher
+from src.tools.dataset_cache import DatasetCache
+
+
+def make_support_csv(path: str, rows: int, seed: int = 7):
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp("2025-01-01", tz="UTC")
+    created = start + pd.to_timedelta(np.sort(rng.integers(0, 300 * 86400, rows)), unit="s")
+    pd.DataFrame({
+        "ticket_id": [f"T{i}" for i in range(rows)],
+        "created_at": created.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "customer_id": rng.integers(1000, 99999, rows).astype(str),
+        "priority": rng.choice(["low", "medium", "high"], rows),
+        "status": rng.choice(["open", "pending", "closed"], rows),
+        "subject": rng.choice(["checkout error", "login failure", "payment declined", "slow page"], rows),
+        "agent": rng.choice(["Riya", "Ravi", "Amit", "Reena"], rows),
+        "tags": rng.choice(["checkout;payment", "auth", "payment", "perf"], rows),
+        "escalated": rng.random(rows) < 0.1,
+    }).to_csv(path, index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        support = os.path.join(tmp, "support.csv")
+        make_support_csv(support, args.rows)
+        size_mb = os.path.getsize(support) / 1e6
+
+        cache = DatasetCache(os.path.join(tmp, "cache"))
+        fetcher = DataFetcher(None, support, None, cache=cache)
+
+        t0 = time.perf_counter()
+        fetcher.fetch_support()
+        cold = time.perf_counter() - t0
+
+        warm = []
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            fetcher.fetch_support()
+            warm.append(time.perf_counter() - t0)
+
+        print(f"rows={args.rows} csv={size_mb:.1f}MB cache_format={cache.fmt}")
+        print(f"cold (parse + store): {cold * 1000:9.1f} ms")
+        print(f"warm (cache load):    {min(warm) * 1000:9.1f} ms  ({cold / min(warm):.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
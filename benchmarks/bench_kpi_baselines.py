@@ -0,0 +1,75 @@
+# benchmarks/bench_kpi_baselines.py
+"""
+KPIBaselineStore with thousands of KPIs: write-through set(), cold load,
+latest() and history() range lookups, versus MemoryBank.get_latest_kpi on
+kpi_baseline events in memory.json.
+
+    python benchmarks/bench_kpi_baselines.py --kpis 5000 --days 60
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.kpi_baselines import KPIBaselineStore
+from src.services.memory_bank import MemoryBank
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--kpis", type=int, default=5000)
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--lookups", type=int, default=100_000)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    try:
+        names = [f"support_volume|segment=s{i}" for i in range(args.kpis)]
+        start = datetime(2024, 1, 1)
+        store = KPIBaselineStore(os.path.join(tmp, "kpi_baselines"))
+        t0 = time.perf_counter()
+        for day in range(args.days):
+            ts = start + timedelta(days=day)
+            for name in names:
+                store.set(name, day, ts)
+        writes = args.kpis * args.days
+        print(f"set: {writes} values in {time.perf_counter() - t0:.1f}s "
+              f"({(time.perf_counter() - t0) / writes * 1e6:.1f} us/value)")
+        store.close()
+
+        store = KPIBaselineStore(os.path.join(tmp, "kpi_baselines"))
+        t0 = time.perf_counter()
+        store.latest(names[0])
+        print(f"cold load: {time.perf_counter() - t0:.2f}s")
+
+        picks = np.random.default_rng(0).integers(0, args.kpis, args.lookups)
+        t0 = time.perf_counter()
+        for i in picks:
+            store.latest(names[i])
+        print(f"latest(): {(time.perf_counter() - t0) / args.lookups * 1e6:.2f} us/lookup")
+        t0 = time.perf_counter()
+        for i in picks[:10_000]:
+            store.history(names[i], start + timedelta(days=10), start + timedelta(days=20))
+        print(f"history(10 days): {(time.perf_counter() - t0) / 10_000 * 1e6:.1f} us/query")
+
+        bank = MemoryBank(os.path.join(tmp, "memory.json"))
+        for i in range(min(args.kpis, 500)):
+            bank.set_kpi_baseline(names[i], i)
+        t0 = time.perf_counter()
+        for i in picks[:200] % min(args.kpis, 500):
+            MemoryBank(bank.path).get_latest_kpi(names[i])
+        print(f"MemoryBank events, 500 KPIs, cold: {(time.perf_counter() - t0) / 200 * 1e6:.0f} us/lookup")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# benchmarks/bench_memory_log.py
+"""
+Write cost of MemoryBank backends as history grows. The JSON backend
+rewrites memory.json on every add_event, so its cost per event grows with
+the store; SegmentLogMemoryBank appends one line and should stay flat
+(rotation/compaction included) up to millions of events.
+
+    python benchmarks/bench_memory_log.py --events 1000000
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.memory_bank import MemoryBank
+from src.services.memory_log import SegmentLogMemoryBank
+
+
+def event(i):
+    if i % 10 == 0:
+        return {"type": "kpi_baseline", "kpi": f"kpi{i % 7}", "value": float(i)}
+    return {"type": "incident", "trace_id": f"trace-{i}",
+            "insights": {"support": {"latest_count": i % 50, "anomaly": i % 3 == 0}},
+            "reasons": [{"reason": "product_bug_or_degradation", "confidence": 0.5}]}
+
+
+def run(bank, total, marks, window):
+    """Mean microseconds per add_event over `window` events ending at each mark."""
+    out = {}
+    for i in range(total):
+        if i + window in marks:
+            t0 = time.perf_counter()
+        bank.add_event(event(i))
+        if i + 1 in marks:
+            out[i + 1] = (time.perf_counter() - t0) / window * 1e6
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=1_000_000)
+    parser.add_argument("--json-events", type=int, default=2000)
+    parser.add_argument("--window", type=int, default=1000)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    try:
+        marks = {m for m in (1_000, 10_000, 100_000, 1_000_000, args.events) if m <= args.events}
+        t0 = time.perf_counter()
+        bank = SegmentLogMemoryBank(os.path.join(tmp, "memory_log"))
+        log_cost = run(bank, args.events, marks, args.window)
+        bank.close()
+        total = time.perf_counter() - t0
+        print(f"log backend: {args.events} events in {total:.1f}s, segments={len(bank._segments)}")
+        for mark, us in sorted(log_cost.items()):
+            print(f"  at {mark:>9} events: {us:8.1f} us/event")
+
+        t0 = time.perf_counter()
+        reopened = SegmentLogMemoryBank(os.path.join(tmp, "memory_log"))
+        print(f"  reopen from checkpoint: {time.perf_counter() - t0:.2f}s, "
+              f"incidents={reopened.count(type='incident')}")
+
+        json_marks = {m for m in (500, 1_000, 2_000, args.json_events) if m <= args.json_events}
+        json_cost = run(MemoryBank(os.path.join(tmp, "memory.json")), args.json_events, json_marks,
+                        min(args.window, 200))
+        print("json backend:")
+        for mark, us in sorted(json_cost.items()):
+            print(f"  at {mark:>9} events: {us:8.1f} us/event")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+# benchmarks/bench_segment_anomalies.py
+"""
+Segment-level detection over a (segments x days) matrix.
+
+    python benchmarks/bench_segment_anomalies.py --rows 2000000 --segments 20000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.segments import SegmentKPI, detect_segment_anomalies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--segments", type=int, default=20_000)
+    parser.add_argument("--days", type=int, default=28)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(1)
+    leads = pd.DataFrame({
+        "date": pd.Timestamp("2025-10-01") + pd.to_timedelta(rng.integers(0, args.days, args.rows), unit="D"),
+        "source": pd.Categorical.from_codes(rng.integers(0, args.segments, args.rows),
+                                            [f"src-{i}" for i in range(args.segments)]),
+        "stage": rng.choice(["MQL", "SQL"], args.rows, p=[0.7, 0.3]),
+    })
+    # Collapse one segment on the last day
+    last = leads["date"] == leads["date"].max()
+    leads.loc[last & (leads["source"] == "src-42"), "stage"] = "MQL"
+
+    specs = (
+        SegmentKPI("sales_conversion", "sales", "date", ("source",), "rate", "stage", "SQL"),
+        SegmentKPI("sales_volume", "sales", "date", ("source",), "count"),
+    )
+    t0 = time.perf_counter()
+    top = detect_segment_anomalies({"sales": leads}, specs, top_k=5, threshold=2.0)
+    elapsed = time.perf_counter() - t0
+
+    print(f"rows={args.rows:,} segments={args.segments:,} days={args.days} time={elapsed * 1000:.1f} ms")
+    for seg in top:
+        print(f"  {seg['kpi']:18s} {seg['dimension']}={seg['segment']:10s} z={seg['z_score']:+.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# benchmarks/bench_serialization.py
+"""
+Encode throughput for typical incident payloads (NumPy scalars from the
+detectors, Insights records, timestamps): the old recursive _to_json_safe
+walk + json.dumps(indent=2) versus src.utils.serialization with the stdlib
+encoder and with orjson (when installed). Each is run on incidents with and
+without None fields (open incidents carry resolved_at/last_trace_id = None).
+
+    python benchmarks/bench_serialization.py --events 20000
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils import serialization
+from src.utils.insights import Insights, KPIInsight
+
+
+def incident(i, rng):
+    kpi = lambda name, kind: KPIInsight(name, kind, rng.random(), rng.random(), rng.normal() * 10,
+                                        np.float64(rng.normal() * 2), np.bool_(rng.random() < 0.1))
+    return {
+        "type": "incident",
+        "trace_id": f"trace-{i}",
+        "timestamp": pd.Timestamp("2024-01-01") + pd.Timedelta(minutes=i),
+        "insights": Insights(kpi("sales_conversion", "rate"), kpi("marketing_conversion", "rate"),
+                             kpi("support_volume", "count"), "Support volume spike",
+                             segments=[{"kpi": "support_volume", "segment": f"region=r{j}",
+                                        "z_score": np.float64(rng.normal()), "count": np.int64(j)}
+                                       for j in range(5)]),
+        "reasons": [{"reason": "product_bug_or_degradation", "confidence": np.float64(0.7)}],
+        "plan": [{"action": "notify_slack", "priority": "high"}, {"action": "create_task"}],
+        "results": [{"action": "notify_slack", "ok": True, "at": datetime(2024, 1, 1, 12)}],
+    }
+
+
+def open_incident(i, rng):
+    return {**incident(i, rng), "resolved_at": None, "last_trace_id": None}
+
+
+def legacy_safe(obj):
+    # MemoryBank._to_json_safe before the shared encoder
+    if hasattr(obj, 'to_dict'):
+        return legacy_safe(obj.to_dict())
+    if isinstance(obj, dict):
+        return {k: legacy_safe(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [legacy_safe(i) for i in obj]
+    if isinstance(obj, (np.bool_, bool)):
+        return bool(obj)
+    if isinstance(obj, np.integer):
+        return int(obj)
+    if isinstance(obj, np.floating):
+        return float(obj)
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    return obj
+
+
+def timed(label, fn, events):
+    t0 = time.perf_counter()
+    size = sum(len(fn(e)) for e in events)
+    elapsed = time.perf_counter() - t0
+    print(f"{label:<34} {len(events) / elapsed:>10,.0f} events/s  {size / len(events):>6,.0f} bytes/event")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=20_000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    for label, make in (("closed incidents", incident), ("open incidents (None fields)", open_incident)):
+        events = [make(i, rng) for i in range(args.events)]
+        print(label)
+        timed("recursive walk + json indent=2", lambda e: json.dumps(legacy_safe(e), indent=2), events)
+        timed("recursive walk + json compact", lambda e: json.dumps(legacy_safe(e), separators=(',', ':')), events)
+        with patch.object(serialization, "orjson", None):
+            timed("serialization.dumps (stdlib)", serialization.dumps, events)
+        if serialization.orjson is not None:
+            timed("serialization.dumps (orjson)", serialization.dumps, events)
+            # MemoryBank.add_event: coerce once for the index, then write
+            timed("json_safe + dumps (orjson)", lambda e: serialization.dumps(serialization.json_safe(e)), events)
+        else:
+            print("orjson not installed; skipped")
+
+
+if __name__ == "__main__":
+    main()
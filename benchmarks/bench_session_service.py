@@ -0,0 +1,62 @@
+# benchmarks/bench_session_service.py
+"""
+SessionService at scale: create N sessions, update a fraction of them, then
+time get_session / get_active_session / a cold open, plus how fast a second
+instance picks up another writer's updates.
+
+    python benchmarks/bench_session_service.py --sessions 100000
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.session_service import SessionService
+
+
+def timed(label, fn, n):
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn()
+    elapsed = time.perf_counter() - t0
+    print(f"{label:<28} {elapsed / n * 1e6:>10,.1f} µs/op")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=100_000)
+    parser.add_argument("--updates", type=int, default=20_000)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    path = os.path.join(tmp, "sessions.jsonl")
+    try:
+        svc = SessionService(path)
+        t0 = time.perf_counter()
+        ids = [svc.create_session(f"s{i}", {"owner": "ops"})["session_id"] for i in range(args.sessions)]
+        print(f"create {args.sessions:,} sessions        {time.perf_counter() - t0:>8.1f} s")
+
+        rng = random.Random(0)
+        states = ["active", "paused", "finished"]
+        timed("update_session_state", lambda: svc.update_session_state(rng.choice(ids), rng.choice(states)),
+              args.updates)
+        timed("get_session", lambda: svc.get_session(rng.choice(ids)), 100_000)
+        timed("get_active_session", svc.get_active_session, 100_000)
+
+        t0 = time.perf_counter()
+        other = SessionService(path)
+        print(f"cold open ({os.path.getsize(path) / 1e6:.0f} MB log)     {time.perf_counter() - t0:>8.2f} s")
+        timed("pick up 1 foreign write", lambda: (svc.set_last_trace(rng.choice(ids), "t"),
+                                                  other.get_active_session()), 1_000)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
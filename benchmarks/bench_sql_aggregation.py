@@ -0,0 +1,77 @@
+# benchmarks/bench_sql_aggregation.py
+"""
+Daily sales conversion inputs: CSV full scan + pandas vs SQL aggregation in SQLite.
+
+    python benchmarks/bench_sql_aggregation.py --rows 1000000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.tools.data_sources import Aggregate, CSVSource, SQLSource, load_csv_into_sqlite, sqlite_pool
+
+AGGREGATES = [Aggregate("leads", "count"), Aggregate("sql_leads", "count_eq", "stage", "SQL")]
+
+
+def make_sales_csv(path: str, rows: int, seed: int = 11):
+    rng = np.random.default_rng(seed)
+    dates = pd.Timestamp("2025-01-01") + pd.to_timedelta(np.sort(rng.integers(0, 365, rows)), unit="D")
+    pd.DataFrame({
+        "date": dates.strftime("%Y-%m-%d"),
+        "lead_id": [f"LD{i}" for i in range(rows)],
+        "source": rng.choice(["GoogleAds", "Email", "Referral", "Organic"], rows),
+        "stage": rng.choice(["MQL", "SQL"], rows, p=[0.7, 0.3]),
+        "amount": rng.integers(0, 10000, rows),
+        "owner": rng.choice(["Amit", "Reena", "Riya", "Ravi"], rows),
+        "region": rng.choice(["EMEA", "APAC", "AMER"], rows),
+    }).to_csv(path, index=False)
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=500_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "sales.csv")
+        db_path = os.path.join(tmp, "warehouse.db")
+        make_sales_csv(csv_path, args.rows)
+        load_csv_into_sqlite(csv_path, db_path, "sales", "date")
+
+        def csv_full_scan():
+            df = pd.read_csv(csv_path, parse_dates=["date"])
+            return df.groupby(df["date"].dt.normalize())["stage"].agg(
+                leads="size", sql_leads=lambda s: (s == "SQL").sum())
+
+        pool = sqlite_pool(db_path)
+        sql = SQLSource(pool, "sales", "date")
+        csv_source = CSVSource(csv_path, "date")
+
+        full, t_full = timed(csv_full_scan)
+        chunked, t_chunked = timed(lambda: csv_source.daily_aggregates(AGGREGATES))
+        agg, t_sql = timed(lambda: sql.daily_aggregates(AGGREGATES))
+        pool.close()
+
+        assert int(agg["sql_leads"].sum()) == int(full["sql_leads"].sum())
+        print(f"rows={args.rows} days={len(agg)}")
+        print(f"csv full scan + pandas:   {t_full * 1000:9.1f} ms")
+        print(f"CSVSource daily (chunks): {t_chunked * 1000:9.1f} ms")
+        print(f"SQLSource daily (server): {t_sql * 1000:9.1f} ms  ({t_full / t_sql:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# benchmarks/bench_subject_clusters.py
+"""
+Throughput of SubjectClusterer.update (hashing + MiniBatchKMeans.partial_fit)
+on synthetic ticket subjects, and whether a topic planted on the last day is
+flagged.
+
+    python benchmarks/bench_subject_clusters.py --tickets 1000000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.subject_clusters import SubjectClusterer
+
+TOPICS = ["login failure on mobile app", "password reset email not received", "checkout error payment declined",
+          "invoice shows wrong amount", "app crashes on startup", "cannot upload attachment",
+          "shipping delayed order missing", "account locked after update"]
+SUFFIXES = ["please help", "urgent", "again", "since yesterday", "for my team", ""]
+
+
+def make_tickets(n: int, days: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    topics = np.array(TOPICS, dtype=object)[rng.integers(0, len(TOPICS), n)]
+    suffixes = np.array(SUFFIXES, dtype=object)[rng.integers(0, len(SUFFIXES), n)]
+    created = pd.Timestamp("2025-11-01") + pd.to_timedelta(rng.uniform(0, days * 86400, n), unit="s")
+    df = pd.DataFrame({"created_at": created, "subject": topics + " " + suffixes})
+    planted = pd.DataFrame({"created_at": pd.Timestamp("2025-11-01") + pd.Timedelta(days=days - 1, hours=9),
+                            "subject": ["refund not processed for order"] * (n // days // 3)})
+    return pd.concat([df, planted], ignore_index=True).sort_values("created_at", ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tickets", type=int, default=1_000_000)
+    parser.add_argument("--days", type=int, default=14)
+    parser.add_argument("--clusters", type=int, default=20)
+    args = parser.parse_args()
+
+    df = make_tickets(args.tickets, args.days)
+    clusterer = SubjectClusterer(None, n_clusters=args.clusters)
+    t0 = time.perf_counter()
+    assigned = clusterer.update(df)
+    elapsed = time.perf_counter() - t0
+    print(f"tickets={assigned:,} clusters={args.clusters} "
+          f"update={elapsed:.2f}s ({assigned / elapsed:,.0f} tickets/s)")
+    for issue in clusterer.detect(lookback_days=args.days):
+        print(f"  cluster {issue['cluster']:3d} share {issue['baseline_share']:.1%} -> "
+              f"{issue['latest_share']:.1%} z={issue['z_score']:.1f} {issue['examples'][:1]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+# benchmarks/bench_windowed_read.py
+"""
+Peak memory of a full CSV read vs a windowed, chunked read through DataFetcher.
+
+    python benchmarks/bench_windowed_read.py --rows 1000000 --window-days 14
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_dataset_cache import make_support_csv
+from src.tools.data_fetcher import DataFetcher
+
+
+def measure(fetcher: DataFetcher):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    df = fetcher.fetch_support()
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(df), elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--window-days", type=int, default=14)
+    parser.add_argument("--chunksize", type=int, default=100_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        support = os.path.join(tmp, "support.csv")
+        make_support_csv(support, args.rows)
+
+        for label, fetcher in (
+            ("full", DataFetcher(None, support, None)),
+            ("windowed", DataFetcher(None, support, None, window_days=args.window_days,
+                                     chunksize=args.chunksize)),
+        ):
+            rows, elapsed, peak = measure(fetcher)
+            print(f"{label:9s} rows_kept={rows:9d} time={elapsed * 1000:8.1f} ms peak={peak / 1e6:8.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
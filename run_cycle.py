@@ -8,13 +8,24 @@ sys.path.append(os.path.join(os.path.dirname(__file__), "src"))
 from src.config import Config
 from src.utils.logger import logger
 
-from src.tools.data_fetcher import DataFetcher
+from src.tools.data_fetcher import TIME_COLUMNS, DataFetcher
+from src.tools.data_sources import ParquetSource, SQLSource, sqlite_pool
+from src.tools.dataset_cache import DatasetCache
 from src.tools.slack_notifier import SlackNotifier
 from src.tools.email_sender import EmailSender
 from src.tools.task_manager import TaskManager
 from src.tools.pdf_report import PDFReportGenerator
 
 from src.services.memory_bank import MemoryBank
+from src.services.memory_log import SegmentLogMemoryBank
+from src.services.memory_sqlite import SQLiteMemoryBank
+from src.services.kpi_baselines import KPIBaselineStore
+from src.services.memory_archive import MemoryArchive
+from src.services.rollup_store import RollupStore
+from src.services.online_detector import OnlineZDetector
+from src.services.resolution_tracker import ResolutionTimeTracker
+from src.services.subject_clusters import SubjectClusterer
+from src.services.correlation_store import CorrelationStore
 from src.services.knowledge_base import KnowledgeBase
 
 from src.agents.data_collector_agent import DataCollectorAgent
@@ -33,10 +44,21 @@ def main():
 
     # Instantiate tools
     logger.info("Initializing tools...")
+    pool = None
+    if Config.DATA_SOURCE == "sqlite":
+        pool = sqlite_pool(Config.WAREHOUSE_DB)
+        sources = {name: SQLSource(pool, name, col) for name, col in TIME_COLUMNS.items()}
+    elif Config.DATA_SOURCE == "parquet":
+        sources = {name: ParquetSource(Config.DATA_DIR / f"{name}.parquet", col) for name, col in TIME_COLUMNS.items()}
+    else:
+        sources = {}
     fetcher = DataFetcher(
         sales_path=str(Config.SALES_DATA), 
         support_path=str(Config.SUPPORT_DATA), 
-        marketing_path=str(Config.MARKETING_DATA)
+        marketing_path=str(Config.MARKETING_DATA),
+        cache=DatasetCache(Config.CACHE_DIR),
+        concurrency=Config.FETCH_CONCURRENCY,
+        sources=sources
     )
     slack = SlackNotifier(log_path=str(Config.SLACK_LOGS))
     email = EmailSender()
@@ -45,14 +67,36 @@ def main():
 
     # Services
     logger.info("Initializing services...")
-    memory = MemoryBank(path=str(Config.MEMORY_FILE))
+    stores = dict(baselines=KPIBaselineStore(path=str(Config.KPI_BASELINE_DIR)),
+                  archive=MemoryArchive(path=str(Config.MEMORY_ARCHIVE_DIR)))
+    if Config.MEMORY_BACKEND == "log":
+        memory = SegmentLogMemoryBank(path=str(Config.MEMORY_LOG_DIR), **stores)
+    elif Config.MEMORY_BACKEND == "sqlite":
+        memory = SQLiteMemoryBank(path=str(Config.MEMORY_DB), **stores)
+    else:
+        memory = MemoryBank(path=str(Config.MEMORY_FILE), **stores)
     kb = KnowledgeBase(path=str(Config.CHROMA_DB_DIR))
 
     # Agents
     logger.info("Initializing agents...")
-    dc = DataCollectorAgent(fetcher=fetcher)
-    an = AnalyticsAgent(lookback_days=14)
-    rc = RootCauseAgent(memory_bank=memory, knowledge_base=kb)
+    dc = DataCollectorAgent(fetcher=fetcher, window_days=Config.LOOKBACK_DAYS)
+    an = AnalyticsAgent(
+        lookback_days=Config.LOOKBACK_DAYS,
+        rollups=RollupStore(path=str(Config.ROLLUP_FILE), sources=sources),
+        segment_top_k=Config.SEGMENT_TOP_K,
+        online_detector=OnlineZDetector(path=str(Config.DETECTOR_STATE_FILE)),
+        online_kpis=Config.ONLINE_KPIS,
+        resolution=Config.ANALYTICS_RESOLUTION,
+        resolution_tracker=ResolutionTimeTracker(path=str(Config.RESOLUTION_SKETCH_FILE)),
+        subject_clusterer=SubjectClusterer(path=str(Config.SUBJECT_CLUSTER_FILE), n_clusters=Config.SUBJECT_CLUSTERS)
+    )
+    rc = RootCauseAgent(
+        memory_bank=memory,
+        knowledge_base=kb,
+        lookback_days=Config.LOOKBACK_DAYS,
+        correlations=CorrelationStore(path=str(Config.CORRELATION_FILE)),
+        resolution=Config.ANALYTICS_RESOLUTION
+    )
     dm = DecisionMakerAgent()
     ae = ActionExecutorAgent(
         slack_notifier=slack, 
@@ -91,6 +135,15 @@ def main():
         logger.info(f"Results: {incident['results']}")
     except Exception as e:
         logger.error(f"Error during cycle execution: {e}", exc_info=True)
+    finally:
+        try:
+            archived = memory.archive_cold(Config.MEMORY_RETENTION_DAYS)
+            if archived:
+                logger.info(f"Archived {archived} cold memory events")
+        finally:
+            memory.close()
+            if pool is not None:
+                pool.close()
 
 if __name__ == "__main__":
     main()
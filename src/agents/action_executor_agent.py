@@ -88,8 +88,12 @@ class ActionExecutorAgent:
 
         summary = {'action': action, 'owner': owner, 'status': 'pending'}
 
-        if action in ['pause_campaign', 'audit_campaign', 'open_bug', 'create_postmortem']:
-            task = self._create_task(title=f"Action: {action}", body=item.get('note',''), assignee=owner, trace_id=trace_id)
+        if action in ['pause_campaign', 'audit_campaign', 'open_bug', 'create_postmortem', 'review_pipeline',
+                      'investigate_driver']:
+            body = item.get('note','')
+            if item.get('detail'):
+                body = f"{body}\n{item['detail']}"
+            task = self._create_task(title=f"Action: {action}", body=body, assignee=owner, trace_id=trace_id)
             # openapi returns different shape; normalize
             if isinstance(task, dict) and task.get('ok') and task.get('task'):
                 task_obj = task['task']
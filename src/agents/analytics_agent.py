@@ -1,64 +1,178 @@
 import pandas as pd
 import numpy as np
-from scipy.stats import zscore
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, Iterable, List, Optional, Tuple
 
 from src.config import Config
+from src.services.online_detector import OnlineZDetector
+from src.services.resolution_tracker import ResolutionTimeTracker
+from src.services.subject_clusters import SubjectClusterer
+from src.services.rollup_store import RESOLUTIONS, RollupStore
+from src.utils.detectors import DETECTORS, run_detectors, series_matrix
+from src.utils.insights import Insights, KPIInsight
+from src.utils.kpis import FRACTION_KPIS, fraction_per_period, period_sums
 from src.utils.logger import logger
+from src.utils.segments import SEGMENT_KPIS, detect_segment_anomalies
+
+# KPIs bucketed at the agent's resolution; marketing data is daily only.
+INTRADAY_KPIS = ('sales_conversion', 'support_volume')
 
 class AnalyticsAgent:
-    def __init__(self, lookback_days: int = 14):
+    def __init__(self, lookback_days: int = 14, rollups: Optional[RollupStore] = None,
+                 segment_top_k: int = 0, online_detector: Optional[OnlineZDetector] = None,
+                 online_kpis: Iterable[str] = (), detectors: Optional[Dict[str, str]] = None,
+                 compare_detectors: bool = False, resolution: str = 'daily',
+                 resolution_tracker: Optional[ResolutionTimeTracker] = None,
+                 subject_clusterer: Optional[SubjectClusterer] = None):
         self.lookback_days = lookback_days
-        logger.info(f"AnalyticsAgent initialized with lookback_days={lookback_days}")
+        # Bucket size for INTRADAY_KPIS: "5min", "hourly" or "daily". Finer
+        # buckets surface a spike within minutes instead of after a full day.
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"Unknown resolution {resolution!r}; expected one of {list(RESOLUTIONS)}")
+        self.resolution = resolution
+        self.freq = RESOLUTIONS[resolution]
+        # With a RollupStore, daily KPI series come from materialized
+        # aggregates instead of re-grouping the raw frames every cycle.
+        self.rollups = rollups
+        # segment_top_k > 0 also scores every segment of SEGMENT_KPIS
+        # (per source, owner, campaign, ...) and reports the top-k.
+        self.segment_top_k = segment_top_k
+        # KPIs listed in online_kpis are scored by the streaming detector
+        # (persisted running mean/variance) instead of a batch z-score.
+        self.online_detector = online_detector
+        self.online_kpis = set(online_kpis) if online_detector else set()
+        # Batch detector per KPI (see src/utils/detectors.py), default "zscore".
+        # compare_detectors runs every registered detector and records its
+        # scores and runtime in last_detector_stats.
+        self.detectors = dict(detectors or {})
+        unknown = set(self.detectors.values()) - set(DETECTORS)
+        if unknown:
+            raise ValueError(f"Unknown detectors: {unknown}")
+        self.compare_detectors = compare_detectors
+        self.last_detector_stats: Dict[str, Dict] = {}
+        # With a ResolutionTimeTracker, daily p95 resolution time is scored as
+        # the "support_mttr_p95" KPI and MTTR/p50/p95/p99 per priority and
+        # issue_type are reported under insights["support_mttr"].
+        self.resolution_tracker = resolution_tracker
+        # With a SubjectClusterer, support subjects are clustered into topics
+        # and topics whose daily share jumps go to insights["emerging_issues"].
+        self.subject_clusterer = subject_clusterer
+        logger.info(f"AnalyticsAgent initialized with lookback_days={lookback_days}, resolution={resolution}")
+
+    def _recent(self, df: pd.DataFrame, col: str) -> pd.DataFrame:
+        """Rows within lookback_days of the newest one: the baseline plus the latest day."""
+        if not self.lookback_days or df.empty:
+            return df
+        start = df[col].max().normalize() - pd.Timedelta(days=self.lookback_days - 1)
+        return df[df[col] >= start]
+
+    def _freq(self, kpi: str) -> str:
+        return self.freq if kpi in INTRADAY_KPIS else 'D'
+
+    def _rollup(self, kpi: str, resolution: str = 'daily') -> Optional[pd.Series]:
+        if self.rollups is None:
+            return None
+        return self.rollups.series(kpi, resolution, lookback_days=self.lookback_days)
+
+    def _sales_series(self, df: pd.DataFrame) -> pd.Series:
+        conv = self._rollup('sales_conversion', self.resolution)
+        if conv is None:
+            df['date'] = pd.to_datetime(df['date'])
+            df = self._recent(df, 'date')
+            conv = fraction_per_period(df, FRACTION_KPIS['sales_conversion'], self.freq)
+        return conv
+
+    def _marketing_series(self, df: pd.DataFrame) -> pd.Series:
+        conv = self._rollup('marketing_conversion')
+        if conv is None:
+            df['date'] = pd.to_datetime(df['date'])
+            df = self._recent(df, 'date')
+            conv = df.groupby(df['date'].dt.date)['conversion_rate'].mean()
+        return conv
+
+    def _support_series(self, df: pd.DataFrame) -> pd.Series:
+        counts = self._rollup('support_volume', self.resolution)
+        if counts is None:
+            df['created_at'] = pd.to_datetime(df['created_at'])
+            df = self._recent(df, 'created_at')
+            counts = period_sums(df['created_at'], freq=self.freq)['num']
+        # buckets without tickets are zero volume, not missing
+        return counts.asfreq(self.freq, fill_value=0.0) if len(counts) else counts
+
+    def _score_all(self, series: Dict[str, pd.Series]) -> Dict[str, Tuple[bool, float]]:
+        """
+        Scores the latest period of every KPI series. Batch detectors run once
+        per detector over all KPIs assigned to it; online KPIs use the
+        streaming detector.
+        """
+        results = {}
+        batch = {}
+        for kpi, s in series.items():
+            if s.empty:
+                results[kpi] = (False, 0.0)
+            elif kpi in self.online_kpis:
+                history = ((str(p), v) for p, v in s.iloc[:-1].items())
+                results[kpi] = self.online_detector.score(kpi, str(s.index[-1]), float(s.iloc[-1]), history=history)
+            else:
+                batch[kpi] = s
+        self.last_detector_stats = {}
+        by_freq: Dict[str, Dict[str, pd.Series]] = {}
+        for kpi, s in batch.items():
+            by_freq.setdefault(self._freq(kpi), {})[kpi] = s
+        for freq, group in by_freq.items():
+            results.update(self._score_batch(group, freq))
+        return results
 
-    def _z_anomaly(self, series: pd.Series) -> Tuple[bool, float]:
-        if len(series) < 5:
-            return False, 0.0
-        z = zscore(series)
-        latest = z[-1]
-        return abs(latest) > 2.5, float(latest)  # anomaly if z > 2.5
+    def _score_batch(self, batch: Dict[str, pd.Series], freq: str) -> Dict[str, Tuple[bool, float]]:
+        names, matrix = series_matrix(batch, freq)
+        assigned = {kpi: self.detectors.get(kpi, 'zscore') for kpi in names}
+        wanted = list(DETECTORS) if self.compare_detectors else sorted(set(assigned.values()))
+        scored = run_detectors(matrix, wanted)
 
-    def _sales_conversion_change(self, df: pd.DataFrame) -> Dict[str, Any]:
-        df['date'] = pd.to_datetime(df['date'])
-        conv = df.groupby(df['date'].dt.date).apply(lambda g: (g['stage']=='SQL').sum()/max(1,len(g)))
+        for name, r in scored.items():
+            stats = self.last_detector_stats.setdefault(name, {'seconds': 0.0, 'scores': {}})
+            stats['seconds'] += r['seconds']
+            stats['scores'].update({kpi: float(np.nan_to_num(r['scores'][i])) for i, kpi in enumerate(names)})
+            logger.debug(f"Detector {name}: {r['seconds'] * 1000:.2f} ms for {len(names)} KPIs at {freq}")
 
-        anomaly, z_val = self._z_anomaly(conv)
+        results = {}
+        for i, kpi in enumerate(names):
+            r = scored[assigned[kpi]]
+            score = r['scores'][i]
+            if np.isnan(score):
+                results[kpi] = (False, 0.0)
+            else:
+                results[kpi] = (bool(abs(score) > r['threshold']), float(score))
+        return results
+
+    def _score(self, kpi: str, series: pd.Series) -> Tuple[bool, float]:
+        return self._score_all({kpi: series})[kpi]
+
+    def _sales_conversion_change(self, df: pd.DataFrame, conv: Optional[pd.Series] = None,
+                                 scored: Optional[Tuple[bool, float]] = None) -> KPIInsight:
+        conv = self._sales_series(df) if conv is None else conv
+        anomaly, z_val = scored or self._score('sales_conversion', conv)
         percent_change = (conv.iloc[-1] - conv.mean()) / (conv.mean() + 1e-9)
 
         if anomaly:
             logger.info(f"Sales anomaly detected: z_score={z_val:.2f}")
 
-        return {
-            "latest_rate": float(conv.iloc[-1]),
-            "avg_rate": float(conv.mean()),
-            "pct_change": float(percent_change),
-            "z_score": float(z_val),
-            "anomaly": anomaly
-        }
-
-    def _marketing_conversion_change(self, df: pd.DataFrame) -> Dict[str, Any]:
-        df['date'] = pd.to_datetime(df['date'])
-        conv = df.groupby(df['date'].dt.date)['conversion_rate'].mean()
+        return KPIInsight('sales_conversion', 'rate', conv.iloc[-1], conv.mean(), percent_change, z_val, anomaly)
 
-        anomaly, z_val = self._z_anomaly(conv)
+    def _marketing_conversion_change(self, df: pd.DataFrame, conv: Optional[pd.Series] = None,
+                                     scored: Optional[Tuple[bool, float]] = None) -> KPIInsight:
+        conv = self._marketing_series(df) if conv is None else conv
+        anomaly, z_val = scored or self._score('marketing_conversion', conv)
         percent_change = (conv.iloc[-1] - conv.mean()) / (conv.mean() + 1e-9)
 
         if anomaly:
             logger.info(f"Marketing anomaly detected: z_score={z_val:.2f}")
 
-        return {
-            "latest_rate": float(conv.iloc[-1]),
-            "avg_rate": float(conv.mean()),
-            "pct_change": float(percent_change),
-            "z_score": float(z_val),
-            "anomaly": anomaly
-        }
+        return KPIInsight('marketing_conversion', 'rate', conv.iloc[-1], conv.mean(), percent_change, z_val, anomaly)
 
-    def _support_spike(self, df: pd.DataFrame) -> Dict[str, Any]:
-        df['created_at'] = pd.to_datetime(df['created_at'])
-        daily = df.groupby(df['created_at'].dt.date).size()
-
-        anomaly, z_val = self._z_anomaly(daily)
+    def _support_spike(self, df: pd.DataFrame, daily: Optional[pd.Series] = None,
+                       scored: Optional[Tuple[bool, float]] = None) -> KPIInsight:
+        daily = self._support_series(df) if daily is None else daily
+        anomaly, z_val = scored or self._score('support_volume', daily)
         change = (daily.iloc[-1] - daily.mean()) / (daily.mean() + 1e-9)
 
         # Force anomaly for demo
@@ -70,31 +184,90 @@ class AnalyticsAgent:
         if anomaly:
             logger.info(f"Support spike detected: z_score={z_val:.2f}")
 
+        return KPIInsight('support_volume', 'count', daily.iloc[-1], daily.mean(), change, z_val, anomaly)
+
+    def _support_mttr(self, p95: pd.Series, scored: Tuple[bool, float]) -> Dict[str, Any]:
+        anomaly, z_val = scored
+        overall = self.resolution_tracker.summary(lookback_days=self.lookback_days)
+        if anomaly:
+            logger.info(f"Support resolution time anomaly: p95={p95.iloc[-1]:.1f}h z_score={z_val:.2f}")
         return {
-            "latest_count": int(daily.iloc[-1]),
-            "avg_count": float(daily.mean()),
-            "pct_change": float(change),
+            **overall,
+            "latest_p95": float(p95.iloc[-1]) if len(p95) else float('nan'),
             "z_score": float(z_val),
-            "anomaly": anomaly
+            "anomaly": anomaly,
+            "segments": self.resolution_tracker.segments(lookback_days=self.lookback_days),
         }
 
-    def analyze(self, datasets: Dict[str, pd.DataFrame]) -> Dict[str, Any]:
+    def _emerging_issues(self, df: pd.DataFrame) -> List[Dict[str, Any]]:
+        self.subject_clusterer.update(df)
+        issues = self.subject_clusterer.detect(lookback_days=self.lookback_days)
+        self.subject_clusterer.save()
+        for issue in issues:
+            logger.info(f"Emerging support issue: cluster {issue['cluster']} share "
+                        f"{issue['baseline_share']:.1%} -> {issue['latest_share']:.1%} e.g. {issue['examples'][:1]}")
+        return issues
+
+    def _segment_anomalies(self, datasets: Dict[str, pd.DataFrame]) -> List[Dict[str, Any]]:
+        recent = {}
+        for spec in SEGMENT_KPIS:
+            df = datasets.get(spec.dataset)
+            if df is not None and spec.dataset not in recent:
+                df = df.assign(**{spec.time_column: pd.to_datetime(df[spec.time_column])})
+                recent[spec.dataset] = self._recent(df, spec.time_column)
+        segments = detect_segment_anomalies(recent, top_k=self.segment_top_k)
+        for seg in segments:
+            logger.info(f"Segment anomaly: {seg['kpi']} {seg['dimension']}={seg['segment']} z_score={seg['z_score']:.2f}")
+        return segments
+
+    def analyze(self, datasets: Dict[str, pd.DataFrame]) -> Insights:
         logger.info("Starting analysis on datasets...")
-        s = self._sales_conversion_change(datasets['sales'])
-        m = self._marketing_conversion_change(datasets['marketing'])
-        sp = self._support_spike(datasets['support'])
+        if self.rollups is not None:
+            self.rollups.update(datasets)
+        series = {
+            'sales_conversion': self._sales_series(datasets['sales']),
+            'marketing_conversion': self._marketing_series(datasets['marketing']),
+            'support_volume': self._support_series(datasets['support']),
+        }
+        if self.resolution_tracker is not None:
+            self.resolution_tracker.update(datasets['support'])
+            series['support_mttr_p95'] = self.resolution_tracker.series('p95', lookback_days=self.lookback_days)
+        scored = self._score_all(series)
+        s = self._sales_conversion_change(datasets['sales'], series['sales_conversion'], scored['sales_conversion'])
+        m = self._marketing_conversion_change(datasets['marketing'], series['marketing_conversion'], scored['marketing_conversion'])
+        sp = self._support_spike(datasets['support'], series['support_volume'], scored['support_volume'])
 
         summary_parts = []
-        if s["anomaly"]: summary_parts.append("Sales anomaly detected")
-        if m["anomaly"]: summary_parts.append("Marketing anomaly detected")
-        if sp["anomaly"]: summary_parts.append("Support spike anomaly detected")
+        if s.anomaly: summary_parts.append("Sales anomaly detected")
+        if m.anomaly: summary_parts.append("Marketing anomaly detected")
+        if sp.anomaly: summary_parts.append("Support spike anomaly detected")
+
+        mttr = None
+        if self.resolution_tracker is not None:
+            mttr = self._support_mttr(series['support_mttr_p95'], scored['support_mttr_p95'])
+            self.resolution_tracker.save()
+            if mttr["anomaly"]: summary_parts.append("Support resolution time anomaly detected")
+
+        segments = self._segment_anomalies(datasets) if self.segment_top_k else []
+        if segments: summary_parts.append(f"{len(segments)} segment anomalies detected")
+
+        emerging = None
+        if self.subject_clusterer is not None:
+            emerging = self._emerging_issues(datasets['support'])
+            if emerging: summary_parts.append(f"{len(emerging)} emerging support issues detected")
+
+        if self.online_kpis:
+            self.online_detector.save()
 
         summary = " | ".join(summary_parts) if summary_parts else "No major anomalies"
         logger.info(f"Analysis complete. Summary: {summary}")
 
-        return {
-            "sales": s,
-            "marketing": m,
-            "support": sp,
-            "summary": summary
-        }
+        return Insights(
+            sales=s,
+            marketing=m,
+            support=sp,
+            summary=summary,
+            segments=segments if self.segment_top_k else None,
+            support_mttr=mttr,
+            emerging_issues=emerging,
+        )
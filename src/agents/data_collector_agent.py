@@ -5,43 +5,119 @@ DataCollectorAgent
 - Validates, compacts, and returns a consistent object
 """
 
-from typing import Dict
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
 from src.tools.data_fetcher import DataFetcher  # adjust import path if necessary
+from src.utils.logger import logger
+
+# Declared dataset schemas: required columns plus the compact dtypes applied
+# during validation. Low-cardinality labels become categoricals (int codes),
+# numeric measures are downcast to the smallest dtype that holds them
+# exactly (amounts like 1234567.89 stay float64).
+# Timestamps stay datetime64, which is already an int64 epoch column.
+SCHEMAS = {
+    'sales': {
+        'required': {'date', 'lead_id', 'stage', 'owner', 'amount', 'source'},
+        'categorical': ('stage', 'owner', 'source', 'region'),
+        'numeric': ('amount',),
+    },
+    'support': {
+        'required': {'ticket_id', 'created_at', 'priority', 'status', 'subject', 'escalated'},
+        'categorical': ('priority', 'status', 'issue_type', 'agent'),
+        'boolean': ('escalated',),
+    },
+    'marketing': {
+        'required': {'date', 'campaign', 'channel', 'spend', 'impressions',
+                     'clicks', 'conversions', 'conversion_rate'},
+        'categorical': ('campaign', 'channel'),
+        'numeric': ('spend', 'impressions', 'clicks', 'conversions'),
+    },
+}
+
+
+def _downcast(series: pd.Series) -> pd.Series:
+    values = pd.to_numeric(series, errors='coerce')
+    if values.isna().any() or not np.array_equal(values, np.floor(values)):
+        values = values.astype('float64')
+        narrow = values.astype('float32')
+        # float32 only if every value survives the round trip
+        if np.array_equal(narrow.to_numpy(dtype='float64'), values.to_numpy(), equal_nan=True):
+            return narrow
+        return values
+    return pd.to_numeric(values.astype('int64'), downcast='integer')
+
+
+def _to_bool(series: pd.Series) -> pd.Series:
+    if series.dtype == object or pd.api.types.is_string_dtype(series):
+        return series.astype(str).str.lower().isin(('true', '1', 'yes'))
+    return series.fillna(False).astype(bool)
+
+
+def memory_report(before: pd.Series, after: pd.Series) -> Dict[str, Dict[str, int]]:
+    """Per-column bytes before/after compaction (from DataFrame.memory_usage(deep=True))."""
+    report = {}
+    for col in after.index:
+        report[str(col)] = {'before': int(before.get(col, 0)), 'after': int(after[col])}
+    report['total'] = {'before': int(before.sum()), 'after': int(after.sum())}
+    return report
+
 
 class DataCollectorAgent:
-    def __init__(self, fetcher: DataFetcher):
+    def __init__(self, fetcher: DataFetcher, window_days: Optional[int] = None,
+                 report_memory: bool = False):
         self.fetcher = fetcher
+        # report_memory measures deep memory usage before/after compaction,
+        # which itself walks every string; keep it off in production cycles.
+        self.report_memory = report_memory
+        self.memory_report: Dict[str, Dict] = {}
+        # Rows older than window_days (relative to the newest row) are dropped
+        # while the fetcher streams the files, not after loading everything.
+        # Passed per call, so a shared fetcher keeps its own setting.
+        self.window_days = window_days
 
-    def validate_sales(self, df):
-        # Ensure required columns exist and cast types
-        expected = {'date', 'lead_id', 'stage', 'owner', 'amount', 'source'}
-        missing = expected - set(df.columns)
+    def _apply_schema(self, name: str, df):
+        """Checks required columns and casts to the compact dtypes in one pass."""
+        schema = SCHEMAS[name]
+        missing = schema['required'] - set(df.columns)
         if missing:
-            raise ValueError(f"Missing sales columns: {missing}")
+            raise ValueError(f"Missing {name} columns: {missing}")
+
+        before = df.memory_usage(deep=True) if self.report_memory else None
+        df = df.copy(deep=False)
+        for col in schema.get('categorical', ()):
+            if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+                df[col] = df[col].astype('category')
+        for col in schema.get('numeric', ()):
+            if col in df.columns:
+                df[col] = _downcast(df[col])
+        for col in schema.get('boolean', ()):
+            if col in df.columns and df[col].dtype != bool:
+                df[col] = _to_bool(df[col])
+
+        if before is not None:
+            self.memory_report[name] = memory_report(before, df.memory_usage(deep=True))
         return df
 
+    def validate_sales(self, df):
+        # Ensure required columns exist and cast types
+        return self._apply_schema('sales', df)
+
     def validate_support(self, df):
-        expected = {'ticket_id', 'created_at', 'priority', 'status', 'subject', 'escalated'}
-        missing = expected - set(df.columns)
-        if missing:
-            raise ValueError(f"Missing support columns: {missing}")
-        return df
+        return self._apply_schema('support', df)
 
     def validate_marketing(self, df):
-        expected = {'date', 'campaign', 'channel', 'spend', 'impressions',
-                    'clicks', 'conversions', 'conversion_rate'}
-        missing = expected - set(df.columns)
-        if missing:
-            raise ValueError(f"Missing marketing columns: {missing}")
-        return df
+        return self._apply_schema('marketing', df)
 
     def run(self) -> Dict:
-        datasets = self.fetcher.fetch_all()
+        datasets = self.fetcher.fetch_all(window_days=self.window_days)
         sales = self.validate_sales(datasets['sales'])
         support = self.validate_support(datasets['support'])
         marketing = self.validate_marketing(datasets['marketing'])
 
-        # compacting: keep last 30 days for demo
+        # compacting: the time window is applied by the fetcher; sort for analytics
         try:
             sales = sales.sort_values('date').copy()
             support = support.sort_values('created_at').copy()
@@ -49,4 +125,8 @@ class DataCollectorAgent:
         except Exception:
             pass
 
+        for name, report in self.memory_report.items():
+            total = report['total']
+            logger.info(f"DataCollectorAgent: {name} memory {total['before']:,} -> {total['after']:,} bytes")
+
         return {'sales': sales, 'support': support, 'marketing': marketing}
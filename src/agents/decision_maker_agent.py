@@ -16,6 +16,9 @@ class DecisionMakerAgent:
             'support_escalations': {'action':'open_bug','owner':'engineering_lead','note':'Inspect error logs and release','impact':'fix revenue leakage'},
             'product_bug_or_degradation': {'action':'open_bug','owner':'engineering_lead','note':'Investigate recent release','impact':'restore UX'},
             'campaign_performance_issue': {'action':'audit_campaign','owner':'marketing_lead','note':'Check audiences and landing pages','impact':'improve conversions'},
+            'sales_segment_drop': {'action':'review_pipeline','owner':'sales_lead','note':'Review lead quality and follow-up for the segment','impact':'recover conversions'},
+            'support_segment_spike': {'action':'open_bug','owner':'engineering_lead','note':'Triage tickets from the segment','impact':'reduce ticket volume'},
+            'correlated_kpi_driver': {'action':'investigate_driver','owner':'ops_lead','note':'Check the leading KPI named in the detail','impact':'address upstream cause'},
             'recurrent_issue': {'action':'create_postmortem','owner':'ops_lead','note':'Deep dive recurring incidents','impact':'long term stability'},
             'unknown': {'action':'human_investigate','owner':'ops_lead','note':'Manual triage required','impact':'unknown'}
         }
@@ -37,6 +40,9 @@ class DecisionMakerAgent:
                 'impact': rule['impact'],
                 'confidence': r.get('confidence', 0.5)
             }
+            if r.get('detail'):
+                # which segment / leading KPI the owner should look at
+                plan_item['detail'] = r['detail']
             plan.append(plan_item)
         
         logger.info(f"Plan created with {len(plan)} items.")
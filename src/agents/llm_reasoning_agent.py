@@ -1,10 +1,11 @@
 import json
 import re
 import vertexai
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Union
 from vertexai.preview.generative_models import GenerativeModel, GenerationConfig
 from src.services.knowledge_base import KnowledgeBase
 from src.config import Config
+from src.utils.insights import Insights, as_dict
 from src.utils.logger import logger
 
 class LLMReasoningAgent:
@@ -32,7 +33,7 @@ class LLMReasoningAgent:
         )
         self.knowledge_base = knowledge_base
 
-    def refine_plan(self, raw_plan: List[Dict], insights: Dict, root_causes: List[Dict]) -> List[Dict]:
+    def refine_plan(self, raw_plan: List[Dict], insights: Union[Insights, Dict], root_causes: List[Dict]) -> List[Dict]:
         """
         Refines the initial action plan using LLM reasoning.
         Returns a list of refined action steps.
@@ -73,7 +74,7 @@ class LLMReasoningAgent:
 
         ### Context
         **Insights:**
-        {json.dumps(insights, indent=2)}
+        {json.dumps(as_dict(insights), indent=2)}
 
         **Root Causes:**
         {json.dumps(root_causes, indent=2)}
@@ -3,49 +3,166 @@
 RootCauseAgent
 - Correlates insights with datasets
 - Produces a ranked list of possible causes
+- Attributes anomalous KPI changes to the segments that drove them
+- Ranks other KPI series that lead an anomalous KPI (lagged correlation)
 - Uses simple heuristics + memory lookup to create candidate reasons
 """
 
 from typing import Dict, List, Any, Optional
+
+import numpy as np
+
+from src.agents.analytics_agent import INTRADAY_KPIS
+from src.services.correlation_store import CorrelationStore
 from src.services.knowledge_base import KnowledgeBase
+from src.services.rollup_store import RESOLUTIONS
+from src.utils.attribution import rank_drivers
+from src.utils.correlation import kpi_frame
+from src.utils.insights import Insights
 from src.utils.logger import logger
 
+# KPI -> reason reported for its segment drivers
+ATTRIBUTED_KPIS = {
+    'sales_conversion': 'sales_segment_drop',
+    'marketing_conversion': 'campaign_performance_issue',
+    'support_volume': 'support_segment_spike',
+}
+
 class RootCauseAgent:
-    def __init__(self, memory_bank: Any, knowledge_base: Optional[KnowledgeBase] = None):
+    def __init__(self, memory_bank: Any, knowledge_base: Optional[KnowledgeBase] = None,
+                 lookback_days: int = 14, attribution_top_k: int = 3,
+                 correlations: Optional[CorrelationStore] = None, correlation_top_k: int = 3,
+                 resolution: str = 'daily'):
         self.memory = memory_bank
         # Use provided KB or create a new one (though DI is preferred)
         self.kb = knowledge_base or KnowledgeBase()
+        self.lookback_days = lookback_days
+        self.attribution_top_k = attribution_top_k
+        # AnalyticsAgent's resolution: an intraday KPI flagged in its latest
+        # bucket is attributed over that bucket, not the whole day.
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"Unknown resolution {resolution!r}; expected one of {list(RESOLUTIONS)}")
+        self.freq = RESOLUTIONS[resolution]
+        # With a CorrelationStore, daily KPI and segment series are folded into
+        # a cached lagged correlation matrix each cycle and series that lead
+        # an anomalous KPI (and moved at that lead) become reasons.
+        self.correlations = correlations
+        self.correlation_top_k = correlation_top_k
         logger.info("RootCauseAgent initialized.")
 
-    def correlate(self, insights: Dict, datasets: Dict) -> List[Dict]:
-        logger.info("Correlating insights to find root causes...")
+    def attribute(self, insights: Insights, datasets: Dict) -> List[Dict]:
+        """
+        Segment-level reasons for every anomalous KPI: the segments (per
+        source, owner, campaign, channel, priority, ...) explaining the
+        largest share of the latest period's change, at the analytics
+        resolution for intraday KPIs. Confidence is that share.
+        """
+        insights = Insights.coerce(insights)
+        anomalous = [k.kpi for k in insights.anomalies() if k.kpi in ATTRIBUTED_KPIS]
+        if not anomalous or not self.attribution_top_k:
+            return []
+        by_freq: Dict[str, List[str]] = {}
+        for kpi in anomalous:
+            by_freq.setdefault(self.freq if kpi in INTRADAY_KPIS else 'D', []).append(kpi)
+        drivers = []
+        for freq, kpis in by_freq.items():
+            drivers.extend(rank_drivers(datasets, kpis, top_k=self.attribution_top_k,
+                                        lookback_days=self.lookback_days, freq=freq))
+        reasons = []
+        for d in drivers:
+            reasons.append({
+                'reason': ATTRIBUTED_KPIS[d['kpi']],
+                'confidence': round(min(1.0, d['share']), 3),
+                'detail': (f"{d['dimension']}={d['segment']} explains {d['share']:.0%} of the {d['kpi']} change "
+                           f"({d['baseline']:.4g} -> {d['latest']:.4g})"),
+                **d,
+            })
+        return reasons
+
+    @staticmethod
+    def _zscore_at(series: np.ndarray, pos: int) -> float:
+        history = series[~np.isnan(series)]
+        if pos < 0 or np.isnan(series[pos]) or len(history) < 3 or history.std() == 0:
+            return 0.0
+        return float((series[pos] - history.mean()) / history.std())
+
+    def correlated_drivers(self, insights: Insights, datasets: Dict) -> List[Dict]:
+        """
+        Reasons from the lagged correlation matrix: for each anomalous KPI,
+        series strongly correlated with it at some lag whose value `lag`
+        days before the latest day deviated in the direction that explains
+        the KPI's move. Confidence is |r| scaled by that deviation (|z| / 3, capped).
+        """
+        if self.correlations is None:
+            return []
+        frame = kpi_frame(datasets)
+        if frame.empty:
+            return []
+        self.correlations.update(frame)
+        self.correlations.save()
+
         reasons = []
+        for kpi in (k.kpi for k in Insights.coerce(insights).anomalies()):
+            if kpi not in ATTRIBUTED_KPIS or kpi not in frame.columns:
+                continue
+            target = frame[kpi].to_numpy(dtype=float)
+            direction = np.sign(self._zscore_at(target, len(target) - 1))
+            candidates = self.correlations.drivers(kpi, top_k=self.correlation_top_k * 4)
+            ranked = []
+            for c in candidates:
+                if c['series'] not in frame.columns:
+                    continue
+                z = self._zscore_at(frame[c['series']].to_numpy(dtype=float), len(target) - 1 - c['lag'])
+                if direction == 0 or np.sign(c['corr'] * z) != direction or abs(z) < 1:
+                    continue
+                confidence = round(abs(c['corr']) * min(1.0, abs(z) / 3), 3)
+                ranked.append({
+                    'reason': 'correlated_kpi_driver',
+                    'confidence': confidence,
+                    'detail': f"{c['series']} leads {kpi} by {c['lag']}d (r={c['corr']:.2f}, z={z:.1f})",
+                    'kpi': kpi, 'series': c['series'], 'lag': c['lag'], 'corr': c['corr'], 'z_score': z,
+                })
+            ranked.sort(key=lambda r: r['confidence'], reverse=True)
+            reasons.extend(ranked[:self.correlation_top_k])
+        return reasons
+
+    def correlate(self, insights: Insights, datasets: Dict) -> List[Dict]:
+        logger.info("Correlating insights to find root causes...")
+        # Plain dicts (nested or the older flat keys) are still accepted
+        insights = Insights.coerce(insights)
+        reasons = self.attribute(insights, datasets)
+        reasons.extend(self.correlated_drivers(insights, datasets))
 
         # If sales conversion dropped significantly -> check marketing and support
-        if insights.get('sales_conversion_change', 0) < -0.05:
+        if insights.sales_conversion_change < -0.05:
             # marketing correlation: campaign conversion drop
-            if insights.get('marketing_drop', False):
-                reasons.append({'reason': 'low_campaign_conversion', 'confidence': 0.8, 'detail': f"marketing_pct_change={insights.get('marketing_pct_change')}"})
+            if insights.marketing_drop:
+                reasons.append({'reason': 'low_campaign_conversion', 'confidence': 0.8, 'detail': f"marketing_pct_change={insights.marketing.pct_change}"})
             # support correlation: escalations could cause reduced conversions
-            if insights.get('support_spike', False):
-                reasons.append({'reason': 'support_escalations', 'confidence': 0.75, 'detail': f"support_increase_pct={insights.get('support_increase_pct')}"})
+            if insights.support_spike:
+                reasons.append({'reason': 'support_escalations', 'confidence': 0.75, 'detail': f"support_increase_pct={insights.support.pct_change}"})
             # check memory for previous incidents with same pattern
-            past = self.memory.find_by_type('incident') if hasattr(self.memory, 'find_by_type') else []
-            if past:
-                reasons.append({'reason': 'recurrent_issue', 'confidence': 0.5, 'detail': f"past_count={len(past)}"})
+            if hasattr(self.memory, 'count'):
+                past_count = self.memory.count(type='incident')  # index lookup, no event bodies read
+            elif hasattr(self.memory, 'find_by_type'):
+                past_count = len(self.memory.find_by_type('incident'))
+            else:
+                past_count = 0
+            if past_count:
+                reasons.append({'reason': 'recurrent_issue', 'confidence': 0.5, 'detail': f"past_count={past_count}"})
 
         # If support spike but sales stable -> maybe product bug
-        if insights.get('support_spike', False) and insights.get('sales_conversion_change', 0) >= -0.05:
+        if insights.support_spike and insights.sales_conversion_change >= -0.05:
             reasons.append({'reason': 'product_bug_or_degradation', 'confidence': 0.7, 'detail': 'support spike without sales drop'})
 
         # If marketing drop only
-        if insights.get('marketing_drop', False) and insights.get('sales_conversion_change', 0) >= -0.05:
+        if insights.marketing_drop and insights.sales_conversion_change >= -0.05:
             reasons.append({'reason': 'campaign_performance_issue', 'confidence': 0.75, 'detail': 'marketing conversion decreased'})
 
         # Check Knowledge Base for similar incidents
         query_terms = []
-        if insights.get('support_spike'): query_terms.append("support")
-        if insights.get('sales_conversion_change', 0) < -0.05: query_terms.append("latency checkout")
+        if insights.support_spike: query_terms.append("support")
+        if insights.sales_conversion_change < -0.05: query_terms.append("latency checkout")
         
         if query_terms:
             query = " ".join(query_terms)
@@ -14,10 +14,24 @@ class Config:
     SALES_DATA = DATA_DIR / "sales.csv"
     SUPPORT_DATA = DATA_DIR / "support.csv"
     MARKETING_DATA = DATA_DIR / "marketing.csv"
+    # SQLite stand-in for a warehouse with sales/support/marketing tables
+    WAREHOUSE_DB = Path(os.getenv("WAREHOUSE_DB", DATA_DIR / "warehouse.db"))
+
+    # Parsed dataset cache (see DatasetCache)
+    CACHE_DIR = DATA_DIR / "cache"
+    ROLLUP_FILE = DATA_DIR / "rollups.json"
+    DETECTOR_STATE_FILE = DATA_DIR / "detector_state.json"
+    RESOLUTION_SKETCH_FILE = DATA_DIR / "resolution_sketches.json"
+    SUBJECT_CLUSTER_FILE = DATA_DIR / "subject_clusters.pkl"
+    CORRELATION_FILE = DATA_DIR / "correlations.npz"
+    KPI_BASELINE_DIR = DATA_DIR / "kpi_baselines"
     
     # Output Files
     SLACK_LOGS = BASE_DIR / "slack_logs.json"
     MEMORY_FILE = BASE_DIR / "memory.json"
+    MEMORY_LOG_DIR = BASE_DIR / "memory_log"
+    MEMORY_DB = BASE_DIR / "memory.db"
+    MEMORY_ARCHIVE_DIR = BASE_DIR / "memory_archive"
     TASKS_FILE = BASE_DIR / "tasks.json"
     REPORT_FILE = BASE_DIR / "report.pdf"
     CHROMA_DB_DIR = DATA_DIR / "chroma_db"
@@ -26,6 +40,25 @@ class Config:
     GCP_PROJECT_ID = os.getenv("GCP_PROJECT_ID") or os.getenv("GOOGLE_CLOUD_PROJECT")
     GCP_LOCATION = os.getenv("GCP_LOCATION", "us-central1")
     DEMO_MODE = os.getenv("DEMO_MODE", "false").lower() == "true"
+    LOOKBACK_DAYS = int(os.getenv("LOOKBACK_DAYS", "14"))
+    SEGMENT_TOP_K = int(os.getenv("SEGMENT_TOP_K", "10"))
+    # Bucket size for sales/support KPIs: 5min | hourly | daily
+    ANALYTICS_RESOLUTION = os.getenv("ANALYTICS_RESOLUTION", "daily")
+    # MemoryBank storage: json (single memory.json) | log (segmented append-only log) | sqlite
+    MEMORY_BACKEND = os.getenv("MEMORY_BACKEND", "json")
+    # Days events stay in the hot MemoryBank per type before archive_cold moves
+    # them to monthly gzip archives, e.g. "incident=365,kpi_baseline=30" ("none" = keep)
+    MEMORY_RETENTION_DAYS = {
+        k: None if v.lower() == "none" else int(v)
+        for k, v in (item.split("=", 1) for item in os.getenv("MEMORY_RETENTION_DAYS", "").split(",") if item)
+    }
+    SUBJECT_CLUSTERS = int(os.getenv("SUBJECT_CLUSTERS", "20"))
+    # Comma-separated KPIs scored by the streaming detector, e.g. "support_volume"
+    ONLINE_KPIS = [k for k in os.getenv("ONLINE_KPIS", "").split(",") if k]
+    FETCH_CONCURRENCY = os.getenv("FETCH_CONCURRENCY") or None  # thread | process
+    # Where datasets are read from: csv (the *_DATA exports) | parquet
+    # (<dataset>.parquet in DATA_DIR) | sqlite (tables in WAREHOUSE_DB)
+    DATA_SOURCE = os.getenv("DATA_SOURCE", "csv")
     SLACK_BOT_TOKEN = os.getenv("SLACK_BOT_TOKEN")
     SLACK_CHANNEL_ID = os.getenv("SLACK_CHANNEL_ID")
     SENDGRID_API_KEY = os.getenv("SENDGRID_API_KEY")
@@ -0,0 +1,203 @@
+# src/services/correlation_store.py
+"""
+CorrelationStore
+- Lagged (0..max_lag days) correlations of each headline KPI (the targets
+  drivers() is asked about) with every daily series, kept as sufficient
+  statistics (see src/utils/correlation.py). State is targets x series, so
+  thousands of segment series cost a few MB rather than series x series
+- Each cycle folds in only the days closed since the last update; the newest
+  day is left out until a later one exists, since its rows are still landing
+- Series appearing later are added with empty history; the statistics and
+  the last max_lag rows are cached as .npz between runs
+- Segment series churn: series without a value in the last retire_days
+  days are dropped. max_series is only a backstop against runaway segment
+  cardinality (each series costs 6 x (max_lag + 1) x targets floats); beyond
+  it the least recently seen segment series go first, headline KPIs are
+  always kept
+"""
+
+import json
+import os
+import tempfile
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.utils.correlation import STATS, correlation_from_moments, lagged_moments
+from src.utils.logger import logger
+
+
+class CorrelationStore:
+    def __init__(self, path: Optional[str] = 'correlations.npz', max_lag: int = 7, min_periods: int = 7,
+                 max_series: int = 10_000, retire_days: int = 28):
+        self.path = path
+        self.max_lag = max_lag
+        self.min_periods = min_periods
+        self.max_series = max_series
+        self.retire_days = retire_days
+        self.names: List[str] = []
+        self._seen = np.empty(0, dtype=np.int64)  # per series: last day with a value (days since epoch)
+        self.watermark: Optional[str] = None
+        self._stats: Optional[Dict[str, np.ndarray]] = None
+        self._tail = np.empty((max_lag, 0))
+        self._loaded = False
+        self._corr = None
+
+    def _load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                meta = json.loads(str(data['meta']))
+                if meta['max_lag'] != self.max_lag:
+                    logger.info("CorrelationStore: max_lag changed; rebuilding.")
+                    return
+                self.names, self.watermark = meta['names'], meta['watermark']
+                self._stats = {k: data[k] for k in STATS}
+                if self._stats['n'].shape[1] != len(self.targets):
+                    # written with series x series statistics: keep the target rows
+                    rows = self._target_index()
+                    self._stats = {k: v[:, rows] for k, v in self._stats.items()}
+                self._tail = data['tail']
+                if 'seen' in data.files:
+                    self._seen = data['seen']
+                else:  # written before series were retired: count them all as current
+                    self._seen = np.full(len(self.names), self._day(self.watermark), dtype=np.int64)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"CorrelationStore: cannot read {self.path} ({e}); rebuilding.")
+            self.names, self.watermark, self._stats = [], None, None
+            self._tail = np.empty((self.max_lag, 0))
+            self._seen = np.empty(0, dtype=np.int64)
+
+    @property
+    def targets(self) -> List[str]:
+        """Headline KPIs (no "|segment"), the rows of matrix()."""
+        return [n for n in self.names if '|' not in n]
+
+    def _target_index(self) -> np.ndarray:
+        return np.array([i for i, n in enumerate(self.names) if '|' not in n], dtype=int)
+
+    @staticmethod
+    def _day(stamp) -> int:
+        return int(pd.Timestamp(stamp).value // (86400 * 10**9))
+
+    def save(self):
+        if self._stats is None or not self.path:
+            return
+        meta = json.dumps({'max_lag': self.max_lag, 'names': self.names, 'watermark': self.watermark})
+        dirn = os.path.dirname(os.path.abspath(self.path))
+        with tempfile.NamedTemporaryFile('wb', delete=False, dir=dirn, suffix='.npz') as tf:
+            np.savez(tf, meta=np.array(meta), tail=self._tail, seen=self._seen, **self._stats)
+            tmpname = tf.name
+        os.replace(tmpname, self.path)
+
+    def _grow(self, names: List[str]):
+        new = [n for n in names if n not in self.names]
+        if not new:
+            return
+        # new names are appended, so existing targets keep their row order
+        size = len(self.names) + len(new)
+        rows = len(self.targets) + sum('|' not in n for n in new)
+        grown = {}
+        for k in STATS:
+            arr = np.zeros((self.max_lag + 1, rows, size))
+            if self._stats is not None:
+                old_rows, old = self._stats[k].shape[1:]
+                arr[:, :old_rows, :old] = self._stats[k]
+            grown[k] = arr
+        self._stats = grown
+        self._tail = np.hstack([self._tail, np.full((self.max_lag, len(new)), np.nan)])
+        self._seen = np.concatenate([self._seen, np.full(len(new), np.iinfo(np.int64).min // 2)])
+        self.names = self.names + new
+
+    def _retire(self):
+        # keep headline KPIs, then the most recently seen series seen within retire_days
+        headline = np.array(['|' not in n for n in self.names], dtype=bool)
+        recent = self._seen >= self._day(self.watermark) - self.retire_days
+        candidates = np.flatnonzero(recent & ~headline)
+        room = max(0, self.max_series - int(headline.sum()))
+        if len(candidates) > room:
+            newest_first = candidates[np.argsort(-self._seen[candidates], kind='stable')]
+            candidates = np.sort(newest_first[:room])
+        keep = np.union1d(np.flatnonzero(headline), candidates)
+        if len(keep) == len(self.names):
+            return
+        logger.info(f"CorrelationStore: retiring {len(self.names) - len(keep)} series")
+        # headline KPIs are always kept, so the target rows stay as they are
+        self._stats = {k: v[:, :, keep] for k, v in self._stats.items()}
+        self._tail = self._tail[:, keep]
+        self._seen = self._seen[keep]
+        self.names = [self.names[i] for i in keep]
+
+    def update(self, frame: pd.DataFrame) -> int:
+        """
+        Folds the closed days of `frame` (daily index x one column per
+        series) newer than the watermark into the statistics. Returns the
+        number of days added.
+        """
+        self._load()
+        if frame.empty or len(frame.index) < 2:
+            return 0
+        frame = frame.sort_index()
+        closed = frame.index[:-1]
+        start = closed[0] if self.watermark is None else pd.Timestamp(self.watermark) + pd.Timedelta(days=1)
+        if start > closed[-1]:
+            return 0
+        days = pd.date_range(start, closed[-1], freq='D')
+
+        self._grow(list(frame.columns))
+        block = frame.reindex(index=days, columns=self.names).to_numpy(dtype=float)
+        moments = lagged_moments(block, self._tail, self.max_lag, targets=self._target_index())
+        for k in STATS:
+            self._stats[k] += moments[k]
+        self._tail = np.vstack([self._tail, block])[-self.max_lag:]
+        self.watermark = days[-1].isoformat()
+        present = ~np.isnan(block)
+        has = present.any(axis=0)
+        last = len(days) - 1 - present[::-1].argmax(axis=0)
+        self._seen[has] = self._day(days[0]) + last[has]
+        self._retire()
+        self._corr = None
+        return len(days)
+
+    def matrix(self) -> np.ndarray:
+        """r[lag, i, j] = corr(targets[i] at t, names[j] at t - lag)."""
+        self._load()
+        if self._stats is None:
+            return np.empty((self.max_lag + 1, 0, 0))
+        if self._corr is None:
+            self._corr = correlation_from_moments(self._stats, self.min_periods)
+        return self._corr
+
+    def drivers(self, target: str, top_k: int = 5, min_abs_corr: float = 0.5,
+                exclude_prefix: bool = True) -> List[Dict]:
+        """
+        Series most correlated with `target`, each at its strongest lag
+        (the driver's value `lag` days before the target's). Series derived
+        from the target itself ("target|dim=segment") are skipped when
+        exclude_prefix is set.
+        """
+        corr = self.matrix()
+        targets = self.targets
+        if target not in targets:
+            return []
+        row = corr[:, targets.index(target), :]  # (lags, series)
+        strength = np.nan_to_num(np.abs(row), nan=-1.0)
+        best_lag = strength.argmax(axis=0)
+        best = row[best_lag, np.arange(len(self.names))]
+        order = np.argsort(-np.nan_to_num(np.abs(best), nan=-1.0), kind='stable')
+        out = []
+        for j in order:
+            name = self.names[j]
+            if name == target or (exclude_prefix and name.startswith(target + '|')):
+                continue
+            if np.isnan(best[j]) or abs(best[j]) < min_abs_corr:
+                break
+            out.append({'series': name, 'lag': int(best_lag[j]), 'corr': float(best[j])})
+            if len(out) == top_k:
+                break
+        return out
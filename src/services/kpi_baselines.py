@@ -0,0 +1,201 @@
+# src/services/kpi_baselines.py
+"""
+KPIBaselineStore
+- Baseline values per KPI (one per segment is fine: thousands of KPIs) kept
+  in process as a latest-value map plus a time series per KPI in growable
+  NumPy arrays, so latest() is a dict lookup and history() a binary search
+- Write-through: set() appends one fixed-size binary record (kpi id,
+  timestamp, value) to baselines.bin; a new KPI first appends its name to
+  kpis.jsonl (id = line number)
+- Loaded lazily on first access with one np.fromfile; a partial trailing
+  record or name (crash mid-write) is truncated
+- Several processes can share the directory: set() allocates ids and
+  appends under a file lock after reading what others appended, and every
+  read first picks up names and records appended since the last one
+"""
+
+import json
+import os
+import struct
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.utils.file_store import file_lock
+from src.utils.logger import logger
+
+RECORD = np.dtype([('kpi', '<i4'), ('ts', '<i8'), ('value', '<f8')])
+_PACK = struct.Struct('<iqd')
+
+
+class _Series:
+    __slots__ = ('ts', 'values', 'n')
+
+    def __init__(self, ts: np.ndarray = None, values: np.ndarray = None):
+        self.ts = np.empty(16, dtype=np.int64) if ts is None else ts
+        self.values = np.empty(16, dtype=np.float64) if values is None else values
+        self.n = 0 if ts is None else len(ts)
+
+    def append(self, ts: int, value: float):
+        if self.n == len(self.ts):
+            self.ts = np.resize(self.ts, max(16, 2 * self.n))
+            self.values = np.resize(self.values, max(16, 2 * self.n))
+        if self.n and ts < self.ts[self.n - 1]:
+            # back-filled value: keep the series ordered by time
+            at = int(np.searchsorted(self.ts[:self.n], ts, side='right'))
+            self.ts[at + 1:self.n + 1] = self.ts[at:self.n]
+            self.values[at + 1:self.n + 1] = self.values[at:self.n]
+            self.ts[at], self.values[at] = ts, value
+        else:
+            self.ts[self.n], self.values[self.n] = ts, value
+        self.n += 1
+
+
+class KPIBaselineStore:
+    def __init__(self, path: str = 'kpi_baselines', fsync: bool = False):
+        self.path = path
+        self.fsync = fsync
+        self.records_path = os.path.join(path, 'baselines.bin')
+        self.names_path = os.path.join(path, 'kpis.jsonl')
+        self._names: List[str] = []
+        self._ids: Dict[str, int] = {}
+        self._series: Dict[str, _Series] = {}
+        self._latest: Dict[str, float] = {}
+        self._names_offset = 0
+        self._records_offset = 0
+        self._file = None
+        self._names_file = None
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def _load(self):
+        if self._loaded:
+            return
+        os.makedirs(self.path, exist_ok=True)
+        with file_lock(self.names_path):
+            self._refresh(repair=True)
+            self._file = open(self.records_path, 'ab')
+            self._names_file = open(self.names_path, 'ab')
+        self._loaded = True
+
+    def _read_from(self, path: str, offset: int) -> bytes:
+        try:
+            if os.stat(path).st_size <= offset:  # the common case: nothing new
+                return b''
+            with open(path, 'rb') as f:
+                f.seek(offset)
+                return f.read()
+        except FileNotFoundError:
+            return b''
+
+    def _refresh(self, repair: bool = False):
+        """
+        Applies names and records appended (by any process) since the last
+        call. Only whole lines/records are consumed; with repair (caller
+        holds the file lock, so nobody is mid-write) a partial tail is cut.
+        """
+        data = self._read_from(self.names_path, self._names_offset)
+        end = data.rfind(b'\n') + 1
+        for line in data[:end].splitlines():
+            name = json.loads(line)
+            self._ids[name] = len(self._names)
+            self._names.append(name)
+        self._names_offset += end
+        if repair and end != len(data):
+            logger.warning(f"KPIBaselineStore: truncating partial name in {self.names_path}")
+            with open(self.names_path, 'r+b') as f:
+                f.truncate(self._names_offset)
+
+        data = self._read_from(self.records_path, self._records_offset)
+        whole = len(data) - len(data) % RECORD.itemsize
+        if repair and whole != len(data):
+            logger.warning(f"KPIBaselineStore: truncating partial record at "
+                           f"{self.records_path}:{self._records_offset + whole}")
+            with open(self.records_path, 'r+b') as f:
+                f.truncate(self._records_offset + whole)
+        if not whole:
+            return
+        records = np.frombuffer(data[:whole], dtype=RECORD)
+        self._records_offset += whole
+        records = records[records['kpi'] < len(self._names)]  # name never made it to kpis.jsonl
+
+        # Group by KPI, ordered by time within each (stable: ties keep write order)
+        records = records[np.lexsort((records['ts'], records['kpi']))]
+        bounds = np.flatnonzero(np.diff(records['kpi'])) + 1
+        for chunk in np.split(records, bounds) if len(records) else ():
+            name = self._names[chunk['kpi'][0]]
+            series = self._series.get(name)
+            if series is None:
+                series = self._series[name] = _Series(chunk['ts'].copy(), chunk['value'].copy())
+            else:
+                for ts, value in zip(chunk['ts'].tolist(), chunk['value'].tolist()):
+                    series.append(ts, value)
+            self._latest[name] = float(series.values[series.n - 1])
+
+    def _write(self, f, data: bytes):
+        f.write(data)
+        f.flush()
+        if self.fsync:
+            os.fsync(f.fileno())
+
+    def set(self, kpi: str, value: float, timestamp: Optional[datetime] = None) -> Dict:
+        stamp = pd.Timestamp(timestamp if timestamp is not None else datetime.utcnow())
+        value = float(value)
+        with self._lock, file_lock(self.names_path):
+            self._load()
+            # ids and offsets must account for every other writer before appending
+            self._refresh(repair=True)
+            if kpi not in self._ids:
+                # the name goes first, so every record has a name
+                line = (json.dumps(kpi) + '\n').encode('utf8')
+                self._write(self._names_file, line)
+                self._names_offset += len(line)
+                self._ids[kpi] = len(self._names)
+                self._names.append(kpi)
+            self._write(self._file, _PACK.pack(self._ids[kpi], stamp.value, value))
+            self._records_offset += RECORD.itemsize
+            series = self._series.setdefault(kpi, _Series())
+            series.append(stamp.value, value)
+            self._latest[kpi] = float(series.values[series.n - 1])
+        return {"type": "kpi_baseline", "kpi": kpi, "value": value, "timestamp": stamp.isoformat()}
+
+    def _current(self):
+        with self._lock:
+            if self._loaded:
+                self._refresh()
+            else:
+                self._load()
+
+    def latest(self, kpi: str) -> Optional[float]:
+        """Value with the newest timestamp, or None for an unknown KPI."""
+        self._current()
+        return self._latest.get(kpi)
+
+    def history(self, kpi: str, start=None, end=None) -> pd.Series:
+        """Values of `kpi` with start <= timestamp <= end (either bound optional), oldest first."""
+        self._current()
+        series = self._series.get(kpi)
+        if series is None:
+            return pd.Series(dtype=float, index=pd.DatetimeIndex([]))
+        ts = series.ts[:series.n]
+        lo = 0 if start is None else int(np.searchsorted(ts, pd.Timestamp(start).value, side='left'))
+        hi = series.n if end is None else int(np.searchsorted(ts, pd.Timestamp(end).value, side='right'))
+        index = pd.DatetimeIndex(ts[lo:hi].astype('datetime64[ns]'))
+        return pd.Series(series.values[lo:hi].copy(), index=index, name=kpi)
+
+    def kpis(self) -> List[str]:
+        self._current()
+        return list(self._series)
+
+    def close(self):
+        with self._lock:
+            for f in (self._file, self._names_file):
+                if f is not None and not f.closed:
+                    f.close()
+            # the next access reloads from disk
+            self._loaded = False
+            self._names, self._ids, self._series, self._latest = [], {}, {}, {}
+            self._names_offset = self._records_offset = 0
@@ -1,7 +1,8 @@
 # src/services/logger_service.py
-import json
 from datetime import datetime
 
+from src.utils.serialization import dumps
+
 class LoggerService:
     """
     Writes each log entry as a JSON line in logs.jsonl:
@@ -20,5 +21,5 @@ class LoggerService:
             "message": message
         }
         with open(self.path, "a") as f:
-            f.write(json.dumps(entry) + "\n")
+            f.write(dumps(entry) + "\n")
         print(f"[{agent}:{level}] {message}")
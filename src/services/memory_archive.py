@@ -0,0 +1,127 @@
+# src/services/memory_archive.py
+"""
+MemoryArchive
+- Cold MemoryBank events moved out of the hot store into one gzip-compressed
+  JSONL file per month (by event timestamp), e.g. 2024-03.jsonl.gz
+- index.json maps trace_id -> months holding its events, so archived
+  incidents stay retrievable by trace_id without opening every month
+- Appending to a month rewrites that month's file atomically (old + new
+  events in a single gzip stream), keeping compression good when small
+  batches are archived every cycle
+- RETENTION_DAYS decides what is cold: days kept hot per event type, '*' for
+  other types, None keeps a type hot forever
+"""
+
+import gzip
+import json
+import os
+import tempfile
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from src.utils.file_store import file_lock
+from src.utils.logger import logger
+from src.utils.serialization import dumpb, loads
+
+RETENTION_DAYS = {'kpi_baseline': 30, 'action_executed': 90, 'incident': 180, '*': 90}
+
+
+def is_cold(event: Dict, retention: Dict[str, Optional[int]], now: datetime) -> bool:
+    days = retention.get(event.get('type'), retention.get('*'))
+    stamp = event.get('timestamp')
+    if days is None or not stamp:
+        return False
+    try:
+        age = now - datetime.fromisoformat(str(stamp)).replace(tzinfo=None)
+    except ValueError:
+        return False
+    return age.days >= days
+
+
+class MemoryArchive:
+    def __init__(self, path: str = 'memory_archive', compresslevel: int = 6):
+        self.path = path
+        self.compresslevel = compresslevel
+        self.index_path = os.path.join(path, 'index.json')
+        self._index: Optional[Dict[str, List[str]]] = None
+
+    def _month_path(self, month: str) -> str:
+        return os.path.join(self.path, f"{month}.jsonl.gz")
+
+    def _load_index(self) -> Dict[str, List[str]]:
+        if self._index is None:
+            self._index = {}
+            if os.path.exists(self.index_path):
+                try:
+                    with open(self.index_path, 'r', encoding='utf8') as f:
+                        self._index = json.load(f)
+                except json.JSONDecodeError as e:
+                    logger.warning(f"MemoryArchive: cannot read {self.index_path} ({e}); rebuilding.")
+                    self._index = self._rebuild_index()
+        return self._index
+
+    def _rebuild_index(self) -> Dict[str, List[str]]:
+        index: Dict[str, List[str]] = {}
+        for month in self.months():
+            for event in self.read(month):
+                if event.get('trace_id') is not None:
+                    months = index.setdefault(str(event['trace_id']), [])
+                    if month not in months:
+                        months.append(month)
+        return index
+
+    def _atomic_write(self, path: str, write):
+        with tempfile.NamedTemporaryFile('wb', delete=False, dir=self.path) as tf:
+            write(tf)
+            tmpname = tf.name
+        os.replace(tmpname, path)
+
+    def months(self) -> List[str]:
+        if not os.path.isdir(self.path):
+            return []
+        return sorted(f[:-len('.jsonl.gz')] for f in os.listdir(self.path) if f.endswith('.jsonl.gz'))
+
+    def read(self, month: str) -> Iterator[Dict]:
+        path = self._month_path(month)
+        if not os.path.exists(path):
+            return
+        with gzip.open(path, 'rt', encoding='utf8') as f:
+            for line in f:
+                yield loads(line)
+
+    def append(self, events: Iterable[Dict]) -> int:
+        """Adds events to their months' files; returns the number archived."""
+        by_month: Dict[str, List[Dict]] = {}
+        for event in events:
+            by_month.setdefault(str(event.get('timestamp') or 'unknown')[:7], []).append(event)
+        if not by_month:
+            return 0
+        os.makedirs(self.path, exist_ok=True)
+        with file_lock(self.index_path):
+            self._index = None  # another process may have archived since
+            self._append(by_month)
+        return sum(len(b) for b in by_month.values())
+
+    def _append(self, by_month: Dict[str, List[Dict]]):
+        index = self._load_index()
+        for month, batch in sorted(by_month.items()):
+            old = list(self.read(month))
+
+            def write(raw, events=old + batch):
+                with gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=self.compresslevel) as gz:
+                    for event in events:
+                        gz.write(dumpb(event) + b'\n')
+
+            self._atomic_write(self._month_path(month), write)
+            for event in batch:
+                if event.get('trace_id') is not None:
+                    months = index.setdefault(str(event['trace_id']), [])
+                    if month not in months:
+                        months.append(month)
+        payload = dumpb(index)
+        self._atomic_write(self.index_path, lambda f: f.write(payload))
+
+    def find_by_trace_id(self, trace_id) -> List[Dict]:
+        months = self._load_index().get(str(trace_id), [])
+        return [e for month in sorted(months) for e in self.read(month)
+                if str(e.get('trace_id')) == str(trace_id)]
@@ -1,85 +1,169 @@
 import json
 import os
 from datetime import datetime
-import tempfile
 import shutil
-import numpy as np
+
+from src.services.memory_archive import RETENTION_DAYS, is_cold
+from src.services.memory_index import MemoryIndex
+from src.utils.file_store import atomic_write_json, file_lock
+from src.utils.serialization import json_safe, loads
 
 class MemoryBank:
-    def __init__(self, path='memory.json'):
+    # Optional KPIBaselineStore; when set, KPI baselines go there instead of
+    # being stored (and searched for) as kpi_baseline events.
+    baselines = None
+    # Optional MemoryArchive that archive_cold() moves old events into
+    archive = None
+
+    def __init__(self, path='memory.json', baselines=None, archive=None):
         self.path = path
+        self.baselines = baselines
+        self.archive = archive
+        # Secondary indexes (type, trace_id, kpi, reason signature) kept in a
+        # sidecar file so counts and lookups don't scan every event.
+        self.index_path = f"{path}.idx"
+        self._index = None
         if not os.path.exists(self.path):
-            with open(self.path, 'w', encoding='utf8') as f:
-                json.dump([], f)
+            with file_lock(self.path):
+                if not os.path.exists(self.path):
+                    atomic_write_json(self.path, [])
 
     def _to_json_safe(self, obj):
-        if isinstance(obj, dict):
-            return {k: self._to_json_safe(v) for k, v in obj.items()}
-
-        if isinstance(obj, (list, tuple)):
-            return [self._to_json_safe(i) for i in obj]
-
-        if isinstance(obj, (np.bool_, bool)):
-            return bool(obj)
-
-        if isinstance(obj, (np.integer,)):
-            return int(obj)
-
-        if isinstance(obj, (np.floating,)):
-            return float(obj)
-
-        if isinstance(obj, datetime):
-            return obj.isoformat()
-
-        return obj
+        # NumPy scalars, datetimes and Insights records -> plain JSON types
+        return json_safe(obj)
 
     def _safe_load(self):
         if not os.path.exists(self.path):
             return []
 
         try:
-            with open(self.path, 'r', encoding='utf8') as f:
-                return json.load(f)
+            with open(self.path, 'rb') as f:
+                return loads(f.read())
         except json.JSONDecodeError as e:
-            ts = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
-            corrupt_backup = f"{self.path}.corrupt.{ts}"
-            shutil.copy(self.path, corrupt_backup)
-            with open(self.path, 'w', encoding='utf8') as f:
-                json.dump([], f)
+            with file_lock(self.path):
+                ts = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+                corrupt_backup = f"{self.path}.corrupt.{ts}"
+                shutil.copy(self.path, corrupt_backup)
+                atomic_write_json(self.path, [])
             print(f"[MemoryBank] WARNING: memory.json was corrupted; backed up to {corrupt_backup}. Resetting.")
             return []
         except Exception as e:
             raise
 
     def _atomic_write(self, data):
-        dirn = os.path.dirname(os.path.abspath(self.path))
-        with tempfile.NamedTemporaryFile('w', delete=False, dir=dirn, encoding='utf8') as tf:
-            json.dump(data, tf, indent=2)
-            tmpname = tf.name
-        shutil.move(tmpname, self.path)
+        atomic_write_json(self.path, data)
+
+    def _stamp(self):
+        st = os.stat(self.path)
+        return (st.st_size, st.st_mtime_ns)
+
+    def _load_index(self, data=None) -> MemoryIndex:
+        stamp = self._stamp() if os.path.exists(self.path) else None
+        if self._index is not None and self._index.stamp == stamp:
+            return self._index
+        index = MemoryIndex.load(self.index_path)
+        if index is None or index.stamp != stamp:
+            # Missing, stale or unreadable sidecar: rebuild from the events.
+            # Stamped with the stamp taken before reading, so a write landing
+            # meanwhile (another process) makes it stale rather than wrong.
+            data = self._safe_load() if data is None else data
+            index = MemoryIndex()
+            for i, event in enumerate(data):
+                index.add(i, event)
+            index.stamp = stamp
+            index.save(self.index_path)
+        self._index = index
+        return index
 
     def add_event(self, event):
-        data = self._safe_load()
         safe_event = self._to_json_safe(event)
         safe_event.setdefault("timestamp", datetime.utcnow().isoformat())
-        data.append(safe_event)
-        self._atomic_write(data)
+        # Writers from any process serialize on memory.json.lock
+        with file_lock(self.path):
+            data = self._safe_load()
+            index = self._load_index(data)
+            data.append(safe_event)
+            self._atomic_write(data)
+            index.add(len(data) - 1, safe_event)
+            index.stamp = self._stamp()
+            index.save(self.index_path)
         return safe_event
 
     def query_recent(self, n=10):
         data = self._safe_load()
         return data[-n:]
 
-    def find_by_type(self, event_type):
+    def _read(self, ids):
+        if not ids:
+            return []
         data = self._safe_load()
-        return [d for d in data if d.get('type') == event_type]
+        return [data[i] for i in ids]
+
+    def _select(self, **filters):
+        return self._read(self._load_index().ids(**filters))
+
+    def find_by_type(self, event_type):
+        return self._select(type=event_type)
+
+    def find_by_trace_id(self, trace_id):
+        archived = self.archive.find_by_trace_id(trace_id) if self.archive is not None else []
+        return archived + self._select(trace_id=trace_id)
+
+    def count(self, **filters) -> int:
+        """Events matching type=, trace_id=, kpi= and/or reason= (a reason signature), from the index only."""
+        return self._load_index().count(**filters)
+
+    def exists(self, **filters) -> bool:
+        return self.count(**filters) > 0
+
+    def close(self):
+        """Every event is already on disk; closes the baseline store, if any."""
+        if self.baselines is not None:
+            self.baselines.close()
+
+    def _pinned(self):
+        # ids of the newest kpi_baseline per KPI, which retention never archives
+        index = self._load_index()
+        return {index.last(type='kpi_baseline', kpi=k) for k in index.by['kpi']} - {None}
+
+    def _cold(self, events, ids, retention, now):
+        retention = {**RETENTION_DAYS, **(retention or {})}
+        now = now or datetime.utcnow()
+        pinned = self._pinned()
+        return [i for i, e in zip(ids, events) if i not in pinned and is_cold(e, retention, now)]
+
+    def archive_cold(self, retention=None, now=None) -> int:
+        """
+        Moves events older than their type's retention (days per type, see
+        memory_archive.RETENTION_DAYS; `retention` overrides entries) into
+        self.archive. Returns the number of events moved.
+        """
+        if self.archive is None:
+            return 0
+        with file_lock(self.path):
+            data = self._safe_load()
+            cold = set(self._cold(data, range(len(data)), retention, now))
+            if not cold:
+                return 0
+            self.archive.append(data[i] for i in sorted(cold))
+            self._atomic_write([e for i, e in enumerate(data) if i not in cold])
+        return len(cold)
 
     def set_kpi_baseline(self, kpi_name: str, value: float):
+        if self.baselines is not None:
+            return self.baselines.set(kpi_name, value)
         return self.add_event({"type": "kpi_baseline", "kpi": kpi_name, "value": float(value)})
 
     def get_latest_kpi(self, kpi_name: str):
-        data = self._safe_load()
-        for d in reversed(data):
-            if d.get('type') == 'kpi_baseline' and d.get('kpi') == kpi_name:
-                return d.get('value')
-        return None
+        if self.baselines is not None:
+            value = self.baselines.latest(kpi_name)
+            if value is not None:
+                return value
+        # no store, or a KPI last set before the store was attached
+        return self._latest_kpi_event(kpi_name)
+
+    def _latest_kpi_event(self, kpi_name: str):
+        last = self._load_index().last(type='kpi_baseline', kpi=kpi_name)
+        if last is None:
+            return None
+        return self._read([last])[0].get('value')
@@ -0,0 +1,114 @@
+# src/services/memory_index.py
+"""
+MemoryIndex
+- Secondary indexes over MemoryBank events: event ids (position in the
+  store) by type, trace_id, kpi and reason signature
+- Maintained on every write and persisted next to the store, so counts and
+  existence checks never deserialize event bodies
+- Stamped with the store's size/mtime; a stamp mismatch (store edited
+  outside MemoryBank) means the index is rebuilt from a full scan
+"""
+
+import json
+import os
+import tempfile
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.utils.insights import SECTIONS
+
+FIELDS = ('type', 'trace_id', 'kpi', 'reason')
+
+
+def reason_signature(reasons: Iterable[Dict]) -> Optional[str]:
+    """Order-independent key for the set of reason names of an incident."""
+    names = sorted({r.get('reason') for r in reasons or () if isinstance(r, dict) and r.get('reason')})
+    return '+'.join(names) or None
+
+
+def index_keys(event: Dict) -> Dict[str, List[str]]:
+    """Index keys of one event: its type/trace_id, the KPIs it is about and its reason signature."""
+    keys = {f: [] for f in FIELDS}
+    for field in ('type', 'trace_id'):
+        if event.get(field) is not None:
+            keys[field].append(str(event[field]))
+
+    kpis = set()
+    if event.get('kpi'):
+        kpis.add(str(event['kpi']))
+    insights = event.get('insights')
+    if isinstance(insights, dict):
+        for section, (kpi, _) in SECTIONS.items():
+            if isinstance(insights.get(section), dict) and insights[section].get('anomaly'):
+                kpis.add(kpi)
+    for r in event.get('reasons') or ():
+        if isinstance(r, dict) and r.get('kpi'):
+            kpis.add(str(r['kpi']))
+    keys['kpi'] = sorted(kpis)
+
+    signature = reason_signature(event.get('reasons'))
+    if signature:
+        keys['reason'].append(signature)
+    return keys
+
+
+class MemoryIndex:
+    def __init__(self):
+        self.size = 0  # number of events indexed
+        self.stamp: Optional[Tuple[int, int]] = None
+        self.by: Dict[str, Dict[str, List[int]]] = {f: {} for f in FIELDS}
+
+    def add(self, event_id: int, event: Dict):
+        for field, keys in index_keys(event).items():
+            for key in keys:
+                self.by[field].setdefault(key, []).append(event_id)
+        self.size = max(self.size, event_id + 1)
+
+    def ids(self, **filters) -> List[int]:
+        """
+        Event ids (ascending) matching every filter (type=, trace_id=, kpi=,
+        reason=). No filters means every event.
+        """
+        unknown = set(filters) - set(FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown index fields: {unknown}")
+        lists = [self.by[f].get(str(v), []) for f, v in filters.items() if v is not None]
+        if not lists:
+            return list(range(self.size))
+        lists.sort(key=len)
+        if len(lists) == 1:
+            return list(lists[0])
+        common = set(lists[0]).intersection(*lists[1:])
+        return sorted(common)
+
+    def count(self, **filters) -> int:
+        active = {f: v for f, v in filters.items() if v is not None}
+        if len(active) == 1:
+            field, value = next(iter(active.items()))
+            if field not in FIELDS:
+                raise ValueError(f"Unknown index fields: {{{field!r}}}")
+            return len(self.by[field].get(str(value), ()))
+        return len(self.ids(**filters))
+
+    def last(self, **filters) -> Optional[int]:
+        ids = self.ids(**filters)
+        return ids[-1] if ids else None
+
+    def save(self, path: str):
+        dirn = os.path.dirname(os.path.abspath(path))
+        with tempfile.NamedTemporaryFile('w', delete=False, dir=dirn, encoding='utf8') as tf:
+            json.dump({'size': self.size, 'stamp': self.stamp, 'by': self.by}, tf)
+            tmpname = tf.name
+        os.replace(tmpname, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional['MemoryIndex']:
+        try:
+            with open(path, 'r', encoding='utf8') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        index = cls()
+        index.size = data['size']
+        index.stamp = tuple(data['stamp']) if data.get('stamp') else None
+        index.by.update(data['by'])
+        return index
@@ -0,0 +1,448 @@
+# src/services/memory_log.py
+"""
+SegmentLogMemoryBank
+- MemoryBank on an append-only log: one JSON event per line in numbered
+  segment files inside a directory, so add_event costs one appended line no
+  matter how much history exists
+- The active segment rotates after segment_bytes; once compact_after
+  segments have been sealed since the last compaction they are merged
+  (superseded kpi_baseline events dropped, lines copied verbatim into fresh
+  segments), so each event is rewritten about once rather than per cycle
+- MANIFEST lists the live segments in order and is replaced atomically; files
+  not listed are leftovers of an interrupted compaction and are removed
+- index.json checkpoints the secondary indexes and each event's (segment,
+  offset) at rotation/compaction/close; on open, events after the checkpoint
+  are replayed and a torn last line (crash mid-write) is truncated
+- The checkpoint also keeps the oldest timestamp per event type of every
+  segment, so archive_cold reads only segments that can hold cold events
+  and rewrites only those that do
+"""
+
+import json
+import os
+import tempfile
+from array import array
+from contextlib import ExitStack
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from src.services.memory_archive import RETENTION_DAYS, is_cold
+from src.services.memory_bank import MemoryBank
+from src.services.memory_index import MemoryIndex
+from src.utils.file_store import file_lock
+from src.utils.logger import logger
+from src.utils.serialization import dumpb, dumps, loads
+
+
+class SegmentLogMemoryBank(MemoryBank):
+    def __init__(self, path: str = 'memory_log', segment_bytes: int = 16 * 1024 * 1024,
+                 compact_after: int = 8, fsync: bool = False, baselines=None, archive=None):
+        self.path = path
+        self.baselines = baselines
+        self.archive = archive
+        self.segment_bytes = segment_bytes
+        self.compact_after = compact_after
+        self.fsync = fsync
+        self.manifest_path = os.path.join(path, 'MANIFEST')
+        self.index_path = os.path.join(path, 'index.json')
+        os.makedirs(path, exist_ok=True)
+        # One writer process per log: the in-memory index and offsets are not
+        # shared, so a second process must use its own log (or SQLiteMemoryBank)
+        self._guard = ExitStack()
+        try:
+            self._guard.enter_context(file_lock(os.path.join(path, 'LOG'), blocking=False))
+        except BlockingIOError:
+            raise RuntimeError(f"SegmentLogMemoryBank: {path} is open in another process") from None
+        self._recover()
+
+    # -- files -------------------------------------------------------------
+
+    def _segment_path(self, number: int) -> str:
+        return os.path.join(self.path, f"{number:08d}.jsonl")
+
+    def _write_json(self, path: str, data: Dict):
+        with tempfile.NamedTemporaryFile('w', delete=False, dir=self.path, encoding='utf8') as tf:
+            tf.write(dumps(data))
+            tf.flush()
+            if self.fsync:
+                os.fsync(tf.fileno())
+            tmpname = tf.name
+        os.replace(tmpname, path)
+
+    def _save_manifest(self):
+        self._write_json(self.manifest_path, {'segments': self._segments, 'next': self._next,
+                                              'compacted': self._compacted})
+
+    def _open_active(self):
+        self._active = open(self._segment_path(self._segments[-1]), 'ab')
+
+    # -- recovery ----------------------------------------------------------
+
+    def _recover(self):
+        names = sorted(f for f in os.listdir(self.path) if f.endswith('.jsonl'))
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, 'r', encoding='utf8') as f:
+                manifest = json.load(f)
+            self._segments, self._next = manifest['segments'], manifest['next']
+            self._compacted = manifest.get('compacted', 0)
+        else:
+            self._segments = [int(n.split('.')[0]) for n in names]
+            self._next = max(self._segments, default=0) + 1
+            self._compacted = 0
+        listed = {os.path.basename(self._segment_path(n)) for n in self._segments}
+        for name in os.listdir(self.path):
+            if (name.endswith('.jsonl') and name not in listed) or name.startswith('tmp'):
+                os.remove(os.path.join(self.path, name))  # interrupted compaction / write
+        if not self._segments:
+            self._segments, self._next = [self._next], self._next + 1
+        self._save_manifest()
+
+        self._index = MemoryIndex()
+        self._seg = array('l')
+        self._off = array('q')
+        self._oldest: Dict[int, Dict[str, str]] = {}
+        start_segment, start_offset = self._segments[0], 0
+        checkpoint = self._load_checkpoint()
+        if checkpoint is not None:
+            self._index = checkpoint['index']
+            self._seg, self._off = checkpoint['seg'], checkpoint['off']
+            self._oldest = checkpoint['oldest']
+            start_segment, start_offset = checkpoint['covered']
+
+        for number in self._segments[self._segments.index(start_segment):]:
+            self._replay(number, start_offset if number == start_segment else 0)
+        self._open_active()
+
+    def _load_checkpoint(self) -> Optional[Dict]:
+        try:
+            with open(self.index_path, 'rb') as f:
+                data = loads(f.read())
+        except (OSError, json.JSONDecodeError):
+            return None
+        if not {'segments', 'covered', 'size', 'by', 'seg', 'off', 'oldest'} <= set(data):
+            return None
+        # Valid while its segments are still the first live ones (rotation only
+        # appends); a compaction that did not get to checkpoint means a full replay
+        covered = data.get('segments') or []
+        if covered != self._segments[:len(covered)] or data['covered'][0] not in self._segments:
+            return None
+        index = MemoryIndex()
+        index.size = data['size']
+        index.by.update(data['by'])
+        return {'index': index, 'seg': array('l', data['seg']), 'off': array('q', data['off']),
+                'covered': tuple(data['covered']),
+                'oldest': {int(n): oldest for n, oldest in data['oldest'].items()}}
+
+    def _replay(self, number: int, offset: int):
+        path = self._segment_path(number)
+        last = number == self._segments[-1]
+        if not os.path.exists(path):
+            if not last:
+                logger.warning(f"SegmentLogMemoryBank: segment {path} is missing")
+            return
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            pos = offset
+            for line in iter(f.readline, b''):
+                if not line.endswith(b'\n'):
+                    if last:
+                        logger.warning(f"SegmentLogMemoryBank: truncating torn write at {path}:{pos}")
+                        f.close()
+                        with open(path, 'r+b') as w:
+                            w.truncate(pos)
+                        return
+                try:
+                    event = loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"SegmentLogMemoryBank: skipping unreadable event at {path}:{pos}")
+                else:
+                    self._index.add(len(self._off), event)
+                    self._seg.append(number)
+                    self._off.append(pos)
+                    self._note_oldest(number, event)
+                pos += len(line)
+
+    def _checkpoint(self):
+        self._active.flush()
+        self._write_json(self.index_path, {
+            'segments': self._segments,
+            'covered': [self._segments[-1], self._active.tell()],
+            'size': self._index.size,
+            'by': self._index.by,
+            'seg': self._seg.tolist(),
+            'off': self._off.tolist(),
+            'oldest': {str(n): self._oldest[n] for n in self._segments if n in self._oldest},
+        })
+
+    def close(self):
+        """Checkpoints the index so the next open does not replay the active segment."""
+        if self._active is not None and not self._active.closed:
+            self._checkpoint()
+            self._active.close()
+        self._guard.close()
+        super().close()
+
+    # -- MemoryBank storage ------------------------------------------------
+
+    def _load_index(self, data=None) -> MemoryIndex:
+        return self._index
+
+    def add_event(self, event):
+        safe_event = self._to_json_safe(event)
+        safe_event.setdefault("timestamp", datetime.utcnow().isoformat())
+        line = dumpb(safe_event) + b'\n'
+        offset = self._active.tell()
+        self._active.write(line)
+        self._active.flush()
+        if self.fsync:
+            os.fsync(self._active.fileno())
+        self._index.add(len(self._off), safe_event)
+        self._seg.append(self._segments[-1])
+        self._off.append(offset)
+        self._note_oldest(self._segments[-1], safe_event)
+        if offset + len(line) >= self.segment_bytes:
+            self._rotate()
+        return safe_event
+
+    def _rotate(self):
+        self._active.close()
+        self._segments.append(self._next)
+        self._next += 1
+        self._save_manifest()
+        self._open_active()
+        if len(self._segments) - 1 - self._compacted >= self.compact_after:
+            self.compact()
+        else:
+            self._checkpoint()
+
+    def _read(self, ids):
+        events = []
+        handles = {}
+        try:
+            for i in ids:
+                number = self._seg[i]
+                if number not in handles:
+                    handles[number] = open(self._segment_path(number), 'rb')
+                f = handles[number]
+                f.seek(self._off[i])
+                events.append(loads(f.readline()))
+        finally:
+            for f in handles.values():
+                f.close()
+        return events
+
+    def query_recent(self, n=10):
+        size = len(self._off)
+        return self._read(range(max(0, size - n), size))
+
+    def _note_oldest(self, number: int, event: Dict):
+        # ISO timestamps compare as strings; a wrong guess only costs a scan
+        stamp = event.get('timestamp')
+        if not stamp:
+            return
+        oldest = self._oldest.setdefault(number, {})
+        kind, stamp = str(event.get('type')), str(stamp)
+        if kind not in oldest or stamp < oldest[kind]:
+            oldest[kind] = stamp
+
+    def _ranges(self) -> Dict[int, Tuple[int, int]]:
+        # segment -> [first id, last id + 1); a segment's events are contiguous
+        if not len(self._seg):
+            return {}
+        seg = np.frombuffer(self._seg, dtype=f'i{self._seg.itemsize}')
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(seg)) + 1))
+        ends = np.append(starts[1:], len(seg))
+        return {int(seg[lo]): (int(lo), int(hi)) for lo, hi in zip(starts, ends)}
+
+    def archive_cold(self, retention=None, now=None) -> int:
+        """
+        Moves cold events (see MemoryBank.archive_cold) out of the sealed
+        segments into self.archive; the active segment is left alone. Only
+        segments whose oldest event of some type is past that type's
+        retention are read, and only those holding cold events rewritten.
+        """
+        if self.archive is None:
+            return 0
+        merged = {**RETENTION_DAYS, **(retention or {})}
+        now = now or datetime.utcnow()
+        candidates = [n for n in self._segments[:-1]
+                      if any(is_cold({'type': kind, 'timestamp': stamp}, merged, now)
+                             for kind, stamp in self._oldest.get(n, {}).items())]
+        if not candidates:
+            return 0
+        ranges = self._ranges()
+        ids = [i for n in candidates if n in ranges for i in range(*ranges[n])]
+        events = dict(zip(ids, self._read(ids)))
+        for number in candidates:
+            # exact bounds (compaction only leaves conservative ones), so a
+            # segment holding nothing cold yet stops being read every cycle
+            self._oldest.pop(number, None)
+            for i in range(*ranges.get(number, (0, 0))):
+                self._note_oldest(number, events[i])
+        cold = self._cold(events.values(), ids, retention, now)
+        if not cold:
+            return 0
+        # archive first: a crash before the rewrite duplicates, never loses
+        self.archive.append(events[i] for i in cold)
+        self._drop(set(cold), events, ranges)
+        return len(cold)
+
+    def _drop(self, dropped: Set[int], events: Dict[int, Dict], ranges: Dict[int, Tuple[int, int]]):
+        """Rewrites just the sealed segments holding `dropped` ids, each into one new segment."""
+        affected = {self._seg[i] for i in dropped}
+        positions = [p for p, n in enumerate(self._segments) if n in affected]
+        replaced: Dict[int, Optional[int]] = {}
+        new_entries: Dict[int, Tuple[array, array]] = {}
+        for number in (self._segments[p] for p in positions):
+            lo, hi = ranges[number]
+            new_seg, new_off = array('l'), array('q')
+            kept = [i for i in range(lo, hi) if i not in dropped]
+            if kept:
+                replaced[number] = self._next
+                self._next += 1
+                with open(self._segment_path(number), 'rb') as src, \
+                        open(self._segment_path(replaced[number]), 'wb') as out:
+                    for i in kept:
+                        src.seek(self._off[i])
+                        new_seg.append(replaced[number])
+                        new_off.append(out.tell())
+                        out.write(src.readline())
+                        self._note_oldest(replaced[number], events[i])
+                    out.flush()
+                    if self.fsync:
+                        os.fsync(out.fileno())
+            else:
+                replaced[number] = None
+            new_entries[number] = (new_seg, new_off)
+
+        self._compacted -= sum(1 for p in positions if p < self._compacted and replaced[self._segments[p]] is None)
+        old_segments = self._segments
+        self._segments = [replaced.get(n, n) for n in old_segments if replaced.get(n, n) is not None]
+        self._save_manifest()
+        for number in affected:
+            os.remove(self._segment_path(number))
+            self._oldest.pop(number, None)
+
+        lo = min(ranges[n][0] for n in affected)
+        hi = max(ranges[n][1] for n in affected)
+        seg, off = self._seg[:lo], self._off[:lo]
+        for number in old_segments[positions[0]:positions[-1] + 1]:
+            if number in new_entries:
+                seg.extend(new_entries[number][0])
+                off.extend(new_entries[number][1])
+            elif number in ranges:
+                start, end = ranges[number]
+                seg.extend(self._seg[start:end])
+                off.extend(self._off[start:end])
+        self._seg = seg + self._seg[hi:]
+        self._off = off + self._off[hi:]
+        self._renumber(lo, hi, dropped)
+        self._checkpoint()
+        logger.info(f"SegmentLogMemoryBank: archived {len(dropped)} events from {len(affected)} segments")
+
+    # -- compaction --------------------------------------------------------
+
+    def _superseded(self) -> Set[int]:
+        # every kpi_baseline event except the newest one per KPI
+        baselines = set(self._index.by['type'].get('kpi_baseline', ()))
+        latest = {self._index.last(type='kpi_baseline', kpi=k) for k in self._index.by['kpi']}
+        return baselines - latest
+
+    def _first_event(self, segments: Set[int]) -> int:
+        # id of the first event stored in one of `segments` (a trailing run of the log)
+        i = len(self._seg)
+        while i > 0 and self._seg[i - 1] in segments:
+            i -= 1
+        return i
+
+    def compact(self, drop_ids: Optional[Set[int]] = None, full: bool = False):
+        """
+        Rewrites the sealed segments written since the last compaction (all
+        sealed segments when full or drop_ids is given) without superseded
+        kpi_baseline events and without the events in drop_ids, then swaps
+        them in through the manifest. Event ids are renumbered; order is kept.
+        """
+        first = 0 if full or drop_ids else self._compacted
+        sealed = self._segments[first:-1]
+        if not sealed:
+            return
+        lo = self._first_event(set(self._segments[first:]))
+        hi = self._first_event({self._segments[-1]})
+        dropped = {i for i in self._superseded() | set(drop_ids or ()) if lo <= i < hi}
+
+        new_segments: List[int] = []
+        new_seg, new_off = array('l'), array('q')
+        out, out_size = None, 0
+        handles = {}
+        try:
+            for i in range(lo, hi):
+                number = self._seg[i]
+                if number not in handles:
+                    handles[number] = open(self._segment_path(number), 'rb')
+                f = handles[number]
+                f.seek(self._off[i])
+                line = f.readline()
+                if i in dropped:
+                    continue
+                if out is None or out_size >= self.segment_bytes:
+                    if out is not None:
+                        out.close()
+                    new_segments.append(self._next)
+                    self._next += 1
+                    out, out_size = open(self._segment_path(new_segments[-1]), 'wb'), 0
+                new_seg.append(new_segments[-1])
+                new_off.append(out_size)
+                out.write(line)
+                out_size += len(line)
+        finally:
+            for f in handles.values():
+                f.close()
+            if out is not None:
+                out.flush()
+                if self.fsync:
+                    os.fsync(out.fileno())
+                out.close()
+
+        self._segments = self._segments[:first] + new_segments + self._segments[-1:]
+        self._compacted = first + len(new_segments)
+        self._save_manifest()
+        # events are copied verbatim, so the inputs' oldest stamps bound the outputs'
+        merged: Dict[str, str] = {}
+        for number in sealed:
+            os.remove(self._segment_path(number))
+            for kind, stamp in self._oldest.pop(number, {}).items():
+                if kind not in merged or stamp < merged[kind]:
+                    merged[kind] = stamp
+        for number in new_segments:
+            self._oldest[number] = dict(merged)
+
+        self._seg = self._seg[:lo] + new_seg + self._seg[hi:]
+        self._off = self._off[:lo] + new_off + self._off[hi:]
+        removed = self._renumber(lo, hi, dropped)
+        self._checkpoint()
+        logger.info(f"SegmentLogMemoryBank: compacted {len(sealed)} segments into {len(new_segments)}, "
+                    f"dropped {removed} events")
+
+    def _renumber(self, lo: int, hi: int, dropped: Set[int]) -> int:
+        # ids in [lo, hi) shift down by the number of dropped ids before them
+        gone = np.zeros(hi - lo, dtype=bool)
+        gone[[i - lo for i in dropped]] = True
+        shift = np.cumsum(gone).tolist()
+        gone = gone.tolist()
+        removed = len(dropped)
+        if removed:
+            for field in self._index.by.values():
+                for key in list(field):
+                    ids = field[key]
+                    if ids[-1] < lo:
+                        continue  # entirely before the rewritten range
+                    kept = [i if i < lo else i - shift[i - lo] if i < hi else i - removed
+                            for i in ids if not (lo <= i < hi and gone[i - lo])]
+                    if kept:
+                        field[key] = kept
+                    else:
+                        del field[key]
+            self._index.size -= removed
+        return removed
@@ -0,0 +1,254 @@
+# src/services/memory_sqlite.py
+"""
+SQLiteMemoryBank
+- MemoryBank in a SQLite database (WAL journal): one row per event with the
+  event as a JSON column plus indexed type/timestamp/trace_id/reason columns
+  and an event_kpis table, so lookups, counts, query_recent and
+  get_latest_kpi are index queries instead of loading every event
+- Writes are group-committed: add_event buffers rows and one transaction
+  inserts them once batch_size events are pending, or flush_interval
+  seconds after the first of them (a timer thread flushes a quiet buffer);
+  any read, flush() or close() commits the buffer first. A crash loses at
+  most the events of the last flush_interval seconds
+- query() runs ad-hoc read-only SQL (json_extract works on events.body)
+- migrate_json() / `python -m src.services.memory_sqlite memory.json memory.db`
+  imports an existing memory.json
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Sequence, Tuple
+
+from src.services.memory_archive import RETENTION_DAYS
+from src.services.memory_bank import MemoryBank
+from src.services.memory_index import FIELDS, index_keys
+from src.utils.logger import logger
+from src.utils.serialization import dumps, loads
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    type TEXT,
+    timestamp TEXT,
+    trace_id TEXT,
+    reason TEXT,
+    body TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS event_kpis (
+    event_id INTEGER NOT NULL REFERENCES events(id),
+    kpi TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_events_type ON events(type, id);
+CREATE INDEX IF NOT EXISTS idx_events_timestamp ON events(timestamp);
+CREATE INDEX IF NOT EXISTS idx_events_trace_id ON events(trace_id);
+CREATE INDEX IF NOT EXISTS idx_events_reason ON events(reason);
+CREATE INDEX IF NOT EXISTS idx_event_kpis_kpi ON event_kpis(kpi, event_id);
+CREATE INDEX IF NOT EXISTS idx_event_kpis_event ON event_kpis(event_id);
+"""
+
+
+class SQLiteMemoryBank(MemoryBank):
+    def __init__(self, path: str = 'memory.db', batch_size: int = 32, flush_interval: float = 1.0,
+                 baselines=None, archive=None):
+        self.path = path
+        self.baselines = baselines
+        self.archive = archive
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending: List[Dict] = []
+        self._pending_since = 0.0
+        self._timer = None
+        self._lock = threading.RLock()
+        # other processes may hold the write lock briefly; wait rather than fail
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._setup()
+
+    def _setup(self, timeout: float = 30.0):
+        # switching a new file to WAL fails with "database is locked" without
+        # waiting on the busy handler while another process is creating it
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.executescript(SCHEMA)
+                break
+            except sqlite3.OperationalError as e:
+                if 'locked' not in str(e) or time.monotonic() > deadline:
+                    raise
+                time.sleep(0.01)
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+
+    # -- writes ------------------------------------------------------------
+
+    def add_event(self, event):
+        safe_event = self._to_json_safe(event)
+        safe_event.setdefault("timestamp", datetime.utcnow().isoformat())
+        with self._lock:
+            if not self._pending:
+                self._pending_since = time.monotonic()
+                # commit a lone event even if no further add_event comes
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+            self._pending.append(safe_event)
+            if len(self._pending) >= self.batch_size or \
+                    time.monotonic() - self._pending_since >= self.flush_interval:
+                self.flush()
+        return safe_event
+
+    def flush(self):
+        """Commits buffered events in one transaction."""
+        with self._lock:
+            if self._timer is not None:
+                if self._timer is not threading.current_thread():
+                    self._timer.cancel()
+                self._timer = None
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, []
+            with self._conn:
+                self._insert(pending)
+
+    def _insert(self, events: Sequence[Dict]):
+        cur = self._conn.cursor()
+        kpi_rows = []
+        for event in events:
+            keys = index_keys(event)
+            cur.execute(
+                "INSERT INTO events (type, timestamp, trace_id, reason, body) VALUES (?, ?, ?, ?, ?)",
+                (event.get('type'), event.get('timestamp'),
+                 keys['trace_id'][0] if keys['trace_id'] else None,
+                 keys['reason'][0] if keys['reason'] else None,
+                 dumps(event)))
+            kpi_rows.extend((cur.lastrowid, kpi) for kpi in keys['kpi'])
+        cur.executemany("INSERT INTO event_kpis (event_id, kpi) VALUES (?, ?)", kpi_rows)
+
+    def close(self):
+        with self._lock:
+            self.flush()
+            self._conn.close()
+        super().close()
+
+    # -- reads -------------------------------------------------------------
+
+    def _execute(self, sql: str, params: Sequence = ()):
+        with self._lock:
+            self.flush()
+            return self._conn.execute(sql, params).fetchall()
+
+    def _where(self, filters: Dict) -> Tuple[str, List]:
+        unknown = set(filters) - set(FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown index fields: {unknown}")
+        clauses, params = [], []
+        for field, value in filters.items():
+            if value is None:
+                continue
+            if field == 'kpi':
+                clauses.append("id IN (SELECT event_id FROM event_kpis WHERE kpi = ?)")
+            else:
+                clauses.append(f"{field} = ?")
+            params.append(str(value))
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def _select(self, **filters):
+        where, params = self._where(filters)
+        return [loads(body) for (body,) in self._execute(f"SELECT body FROM events{where} ORDER BY id", params)]
+
+    def count(self, **filters) -> int:
+        where, params = self._where(filters)
+        return self._execute(f"SELECT COUNT(*) FROM events{where}", params)[0][0]
+
+    def query_recent(self, n=10):
+        rows = self._execute("SELECT body FROM events ORDER BY id DESC LIMIT ?", (n,))
+        return [loads(body) for (body,) in reversed(rows)]
+
+    def _latest_kpi_event(self, kpi_name: str):
+        rows = self._execute(
+            "SELECT json_extract(e.body, '$.value') FROM event_kpis k JOIN events e ON e.id = k.event_id "
+            "WHERE k.kpi = ? AND e.type = 'kpi_baseline' ORDER BY k.event_id DESC LIMIT 1", (kpi_name,))
+        return rows[0][0] if rows else None
+
+    def _pinned(self):
+        return {row[0] for row in self._execute(
+            "SELECT MAX(e.id) FROM event_kpis k JOIN events e ON e.id = k.event_id "
+            "WHERE e.type = 'kpi_baseline' GROUP BY k.kpi")}
+
+    def archive_cold(self, retention=None, now=None) -> int:
+        """Moves cold events (see MemoryBank.archive_cold) into self.archive and deletes their rows."""
+        if self.archive is None:
+            return 0
+        retention = {**RETENTION_DAYS, **(retention or {})}
+        now = now or datetime.utcnow()
+        # index pre-filter on timestamp per type; is_cold() has the final say
+        clauses, params = [], []
+        for event_type, days in retention.items():
+            if event_type == '*' or days is None:
+                continue
+            clauses.append("(type = ? AND timestamp <= ?)")
+            params += [event_type, (now - timedelta(days=days)).isoformat()]
+        if retention.get('*') is not None:
+            named = [t for t in retention if t != '*']
+            clauses.append(f"(COALESCE(type, '') NOT IN ({', '.join('?' * len(named))}) AND timestamp <= ?)")
+            params += named + [(now - timedelta(days=retention['*'])).isoformat()]
+        if not clauses:
+            return 0
+        rows = self._execute(f"SELECT id, body FROM events WHERE {' OR '.join(clauses)} ORDER BY id", params)
+        events = [loads(body) for _, body in rows]
+        cold = set(self._cold(events, [i for i, _ in rows], retention, now))
+        if not cold:
+            return 0
+        self.archive.append(e for (i, _), e in zip(rows, events) if i in cold)
+        with self._lock, self._conn:
+            ids = [(i,) for i in sorted(cold)]
+            self._conn.executemany("DELETE FROM event_kpis WHERE event_id = ?", ids)
+            self._conn.executemany("DELETE FROM events WHERE id = ?", ids)
+        return len(cold)
+
+    def query(self, sql: str, params: Sequence = ()) -> List[Dict]:
+        """
+        Ad-hoc read-only SQL over events/event_kpis, e.g.
+        "SELECT trace_id, json_extract(body, '$.insights.summary') AS summary
+         FROM events WHERE type = 'incident' AND timestamp >= ?"
+        """
+        with self._lock:
+            self.flush()
+            self._conn.execute("PRAGMA query_only = ON")
+            try:
+                cur = self._conn.execute(sql, params)
+                names = [d[0] for d in cur.description or ()]
+                return [dict(zip(names, row)) for row in cur.fetchall()]
+            finally:
+                self._conn.execute("PRAGMA query_only = OFF")
+
+
+def migrate_json(json_path: str, db_path: str, batch_size: int = 10_000) -> int:
+    """Imports the events of a memory.json into a SQLite MemoryBank, in order. Returns the count."""
+    with open(json_path, 'r', encoding='utf8') as f:
+        events = json.load(f)
+    bank = SQLiteMemoryBank(db_path, batch_size=batch_size)
+    try:
+        if bank.count():
+            raise ValueError(f"{db_path} already holds events; refusing to import twice")
+        for i in range(0, len(events), batch_size):
+            with bank._conn:
+                bank._insert([bank._to_json_safe(e) for e in events[i:i + batch_size]])
+    finally:
+        bank.close()
+    logger.info(f"SQLiteMemoryBank: imported {len(events)} events from {json_path} into {db_path}")
+    return len(events)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import memory.json into a SQLite MemoryBank")
+    parser.add_argument("json_path")
+    parser.add_argument("db_path")
+    args = parser.parse_args()
+    if not os.path.exists(args.json_path):
+        parser.error(f"{args.json_path} does not exist")
+    print(f"Imported {migrate_json(args.json_path, args.db_path)} events into {args.db_path}")
@@ -0,0 +1,99 @@
+# src/services/online_detector.py
+"""
+OnlineZDetector
+- Streaming z-score per KPI using Welford's running mean/variance
+- State is a handful of numbers per KPI, persisted as JSON between cycles,
+  so scoring a new period is O(1) and needs no history
+- The newest period is held as "pending" until a later period arrives, so
+  re-scoring the same day (new rows landed) replaces rather than double counts
+- Periods in the passed history that are newer than the pending one (cycles
+  skipped, or several intraday buckets per cycle) are folded in before scoring
+"""
+
+import json
+import math
+import os
+import tempfile
+from typing import Dict, Iterable, Optional, Tuple
+
+from src.utils.logger import logger
+
+
+class OnlineZDetector:
+    def __init__(self, path: str = 'detector_state.json', threshold: float = 2.5, min_periods: int = 5):
+        self.path = path
+        self.threshold = threshold
+        self.min_periods = min_periods
+        self._state: Optional[Dict[str, Dict]] = None
+
+    def _load(self) -> Dict[str, Dict]:
+        if self._state is None:
+            self._state = {}
+            if os.path.exists(self.path):
+                try:
+                    with open(self.path, 'r', encoding='utf8') as f:
+                        self._state = json.load(f)
+                except json.JSONDecodeError:
+                    logger.warning(f"OnlineZDetector: {self.path} is corrupted; starting fresh.")
+        return self._state
+
+    def save(self):
+        if self._state is None:
+            return
+        dirn = os.path.dirname(os.path.abspath(self.path))
+        with tempfile.NamedTemporaryFile('w', delete=False, dir=dirn, encoding='utf8') as tf:
+            json.dump(self._state, tf)
+            tmpname = tf.name
+        os.replace(tmpname, self.path)
+
+    @staticmethod
+    def _commit(st: Dict, value: float):
+        # Welford update of the committed (closed periods) statistics
+        st['count'] += 1
+        delta = value - st['mean']
+        st['mean'] += delta / st['count']
+        st['m2'] += delta * (value - st['mean'])
+
+    @classmethod
+    def _advance(cls, st: Dict, period: str, value: float):
+        # A newer period closes the pending one; the same period replaces its
+        # value; older periods are already committed.
+        pending = st['pending_period']
+        if pending is not None and period < pending:
+            return
+        if pending is not None and period > pending:
+            cls._commit(st, st['pending_value'])
+        st['pending_period'], st['pending_value'] = period, value
+
+    def score(self, kpi: str, period, value: float,
+              history: Optional[Iterable[Tuple[str, float]]] = None) -> Tuple[bool, float]:
+        """
+        Scores `value` for `period` against everything seen before it. The
+        result equals scipy.stats.zscore over the full series at its last
+        element. history holds the (period, value) pairs before `period`, in
+        order; those newer than the last seen period are folded in first, so
+        a KPI seen for the first time is seeded and gaps between cycles are
+        filled.
+        """
+        state = self._load()
+        period, value = str(period), float(value)
+        st = state.get(kpi)
+        if st is None:
+            st = state[kpi] = {'count': 0, 'mean': 0.0, 'm2': 0.0, 'pending_period': None, 'pending_value': None}
+
+        for p, v in history or ():
+            p = str(p)
+            if p < period:
+                self._advance(st, p, float(v))
+        self._advance(st, period, value)
+
+        # Statistics including the scored value
+        n = st['count'] + 1
+        delta = value - st['mean']
+        mean = st['mean'] + delta / n
+        m2 = st['m2'] + delta * (value - mean)
+        if n < self.min_periods:
+            return False, 0.0
+        std = math.sqrt(m2 / n)
+        z = 0.0 if std == 0 else (value - mean) / std
+        return abs(z) > self.threshold, z
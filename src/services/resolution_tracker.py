@@ -0,0 +1,191 @@
+# src/services/resolution_tracker.py
+"""
+ResolutionTimeTracker
+- Support resolution time (resolved_at - created_at, in hours) per day the
+  ticket was resolved, overall and per priority / issue_type segment
+- Each (segment, day) keeps a mergeable KLL sketch, so MTTR/p50/p95/p99 over
+  any window is a merge of a few small sketches instead of a sort of every
+  ticket, and trackers built on separate shards merge into one
+- Updated incrementally from tickets resolved since the last watermark and
+  persisted as JSON between runs; the ids already counted at the watermark
+  timestamp are kept, so a ticket resolved at that same instant that only
+  shows up in a later fetch is still added once
+"""
+
+import json
+import os
+import tempfile
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.utils.logger import logger
+from src.utils.sketch import KLLSketch
+
+DIMENSIONS = ('priority', 'issue_type')
+QUANTILES = {'p50': 0.5, 'p95': 0.95, 'p99': 0.99}
+OVERALL = '__all__'
+
+
+class ResolutionTimeTracker:
+    def __init__(self, path: Optional[str] = 'resolution_sketches.json', k: int = 200,
+                 retention_days: Optional[int] = 120):
+        # path=None keeps the sketches in memory only (e.g. per-shard workers)
+        self.path = path
+        self.k = k
+        self.retention_days = retention_days
+        self._data = None
+        self._sketches: Dict[str, Dict[str, KLLSketch]] = {}
+
+    def _load(self) -> Dict:
+        if self._data is None:
+            self._data = {'watermark': None, 'watermark_ids': [], 'sketches': {}}
+            if self.path and os.path.exists(self.path):
+                try:
+                    with open(self.path, 'r', encoding='utf8') as f:
+                        self._data = json.load(f)
+                except json.JSONDecodeError:
+                    logger.warning(f"ResolutionTimeTracker: {self.path} is corrupted; starting fresh.")
+            self._sketches = {
+                key: {day: KLLSketch.from_dict(sk) for day, sk in days.items()}
+                for key, days in self._data['sketches'].items()
+            }
+        return self._data
+
+    def save(self):
+        if self._data is None or not self.path:
+            return
+        self._data['sketches'] = {
+            key: {day: sk.to_dict() for day, sk in days.items()}
+            for key, days in self._sketches.items()
+        }
+        dirn = os.path.dirname(os.path.abspath(self.path))
+        with tempfile.NamedTemporaryFile('w', delete=False, dir=dirn, encoding='utf8') as tf:
+            json.dump(self._data, tf)
+            tmpname = tf.name
+        os.replace(tmpname, self.path)
+
+    def _sketch(self, key: str, day: str) -> KLLSketch:
+        days = self._sketches.setdefault(key, {})
+        if day not in days:
+            days[day] = KLLSketch(self.k)
+        return days[day]
+
+    def update(self, df: pd.DataFrame) -> int:
+        """
+        Adds tickets resolved after the watermark; returns how many were added.
+        Frames without resolved_at (or with no resolved tickets) are a no-op.
+        """
+        data = self._load()
+        if df is None or df.empty or 'resolved_at' not in df.columns:
+            return 0
+        resolved = pd.to_datetime(df['resolved_at'], errors='coerce')
+        created = pd.to_datetime(df['created_at'], errors='coerce')
+        keep = resolved.notna() & created.notna() & (resolved >= created)
+        ids = df['ticket_id'].astype(str) if 'ticket_id' in df.columns else None
+        mark = data['watermark']
+        if mark is not None:
+            mark = pd.Timestamp(mark)
+            if ids is None:
+                keep &= resolved > mark
+            else:
+                seen = set(data.get('watermark_ids', ()))
+                keep &= (resolved > mark) | ((resolved == mark) & ~ids.isin(seen))
+        if not keep.any():
+            return 0
+
+        resolved = resolved[keep]
+        hours = ((resolved - created[keep]).dt.total_seconds() / 3600.0).to_numpy()
+        days = resolved.dt.normalize().dt.strftime('%Y-%m-%d').to_numpy()
+        day_codes, day_labels = pd.factorize(days)
+        groups = [(OVERALL, np.zeros(len(hours), dtype=np.int64), np.array([None]))]
+        for dim in DIMENSIONS:
+            if dim in df.columns:
+                codes, labels = pd.factorize(df.loc[keep, dim])
+                groups.append((dim, codes, np.asarray(labels)))
+
+        for dim, codes, labels in groups:
+            flat = codes.astype(np.int64) * len(day_labels) + day_codes
+            order = np.argsort(flat, kind='stable')
+            bounds = np.flatnonzero(np.diff(flat[order])) + 1
+            for chunk in np.split(order, bounds):
+                code = codes[chunk[0]]
+                if code < 0:  # missing segment label
+                    continue
+                key = OVERALL if dim == OVERALL else f"{dim}={labels[code]}"
+                self._sketch(key, day_labels[day_codes[chunk[0]]]).update(hours[chunk])
+
+        newest = resolved.max()
+        if ids is not None:
+            at_newest = ids[keep][resolved == newest].tolist()
+            if mark is not None and newest == mark:
+                at_newest = sorted(set(data.get('watermark_ids', ())) | set(at_newest))
+            data['watermark_ids'] = at_newest
+        data['watermark'] = newest.isoformat()
+        self._trim()
+        return int(keep.sum())
+
+    def _trim(self):
+        if not self.retention_days:
+            return
+        newest = max((max(days) for days in self._sketches.values() if days), default=None)
+        if newest is None:
+            return
+        cutoff = (pd.Timestamp(newest) - pd.Timedelta(days=self.retention_days)).strftime('%Y-%m-%d')
+        for days in self._sketches.values():
+            for day in [d for d in days if d < cutoff]:
+                del days[day]
+
+    def merge(self, other: 'ResolutionTimeTracker') -> 'ResolutionTimeTracker':
+        """Folds another tracker (e.g. built on a different shard) into this one."""
+        data = self._load()
+        other_data = other._load()
+        for key, days in other._sketches.items():
+            for day, sk in days.items():
+                self._sketch(key, day).merge(sk)
+        marks = [m for m in (data['watermark'], other_data['watermark']) if m]
+        newest = max(marks) if marks else None
+        data['watermark_ids'] = sorted(
+            {i for d in (data, other_data) if d['watermark'] == newest for i in d.get('watermark_ids', ())})
+        data['watermark'] = newest
+        return self
+
+    def _window(self, key: str, lookback_days: Optional[int]) -> List[str]:
+        days = sorted(self._sketches.get(key, {}))
+        if lookback_days and days:
+            cutoff = (pd.Timestamp(days[-1]) - pd.Timedelta(days=lookback_days - 1)).strftime('%Y-%m-%d')
+            days = [d for d in days if d >= cutoff]
+        return days
+
+    def summary(self, key: str = OVERALL, lookback_days: Optional[int] = None) -> Dict[str, float]:
+        """MTTR (mean hours), p50/p95/p99 and ticket count over the window."""
+        self._load()
+        merged = KLLSketch(self.k)
+        for day in self._window(key, lookback_days):
+            merged.merge(self._sketches[key][day])
+        values = merged.quantiles(QUANTILES.values())
+        out = {'mttr': merged.mean, 'count': merged.n}
+        out.update({name: float(v) for name, v in zip(QUANTILES, values)})
+        return out
+
+    def segments(self, lookback_days: Optional[int] = None) -> List[Dict]:
+        self._load()
+        rows = []
+        for key in sorted(self._sketches):
+            if key == OVERALL:
+                continue
+            dim, segment = key.split('=', 1)
+            rows.append({'dimension': dim, 'segment': segment, **self.summary(key, lookback_days)})
+        return rows
+
+    def series(self, stat: str = 'p95', key: str = OVERALL, lookback_days: Optional[int] = None) -> pd.Series:
+        """Per-day `stat` (mttr, p50, p95 or p99), oldest first."""
+        self._load()
+        days = self._window(key, lookback_days)
+        sketches: Iterable[KLLSketch] = (self._sketches[key][d] for d in days)
+        if stat == 'mttr':
+            values = [sk.mean for sk in sketches]
+        else:
+            values = [sk.quantile(QUANTILES[stat]) for sk in sketches]
+        return pd.Series(values, index=pd.to_datetime(days), name=f'support_mttr_{stat}', dtype=float)
@@ -0,0 +1,198 @@
+# src/services/rollup_store.py
+"""
+RollupStore
+- Materialized 5-minute, hourly and daily aggregates for each KPI
+- Updated incrementally from the rows that arrived since the last update
+- Intraday resolutions keep a bounded window (RETENTION_DAYS) so the file
+  stays small when cycles run every few minutes
+- Persisted as JSON between runs so analytics reads aggregates, not raw rows
+- With data source connectors, daily buckets come from the source's own
+  daily_aggregates query (full history, not just the fetched window)
+"""
+
+import json
+import os
+import tempfile
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from src.tools.data_sources import Aggregate, DataSource
+from src.utils.kpis import FRACTION_KPIS, period_sums
+from src.utils.logger import logger
+
+# KPI -> (dataset, time column, kind). Each bucket stores [numerator, denominator]:
+#   rate  - numerator/denominator (e.g. SQL leads / all leads), see FRACTION_KPIS
+#   mean  - sum of a column / row count
+#   count - numerator is the row count
+KPIS = {
+    **{k.name: (k.dataset, k.time_column, 'rate') for k in FRACTION_KPIS.values()},
+    'marketing_conversion': ('marketing', 'date', 'mean'),
+    'support_volume': ('support', 'created_at', 'count'),
+}
+
+MEAN_COLUMNS = {'marketing_conversion': 'conversion_rate'}
+
+RESOLUTIONS = {'5min': '5min', 'hourly': 'h', 'daily': 'D'}
+
+# Days of buckets kept per resolution, counted back from the newest bucket;
+# None keeps everything.
+RETENTION_DAYS = {'5min': 3, 'hourly': 35, 'daily': None}
+
+
+def _bucket_sums(df: pd.DataFrame, kpi: str, times: pd.Series, freq: str) -> pd.DataFrame:
+    kind = KPIS[kpi][2]
+    if kind == 'rate':
+        values = FRACTION_KPIS[kpi].mask(df)
+    elif kind == 'mean':
+        values = df[MEAN_COLUMNS[kpi]].to_numpy(dtype=float)
+    else:
+        values = None
+    return period_sums(times, values, freq)
+
+
+def _source_aggregates(kpi: str) -> Optional[List[Aggregate]]:
+    """Aggregates yielding the KPI's daily num/den, or None if a source can't express it."""
+    kind = KPIS[kpi][2]
+    den = Aggregate(f"{kpi}__den", "count")
+    if kind == 'rate':
+        spec = FRACTION_KPIS[kpi]
+        if len(spec.matches) != 1:
+            return None
+        return [Aggregate(f"{kpi}__num", "count_eq", spec.column, spec.matches[0]), den]
+    if kind == 'mean':
+        return [Aggregate(f"{kpi}__num", "sum", MEAN_COLUMNS[kpi]), den]
+    return [den]
+
+
+class RollupStore:
+    def __init__(self, path: str = 'rollups.json', retention_days: Optional[Dict[str, Optional[int]]] = None,
+                 sources: Optional[Dict[str, DataSource]] = None):
+        self.path = path
+        self.retention_days = {**RETENTION_DAYS, **(retention_days or {})}
+        # Dataset name -> connector; daily buckets of those datasets are
+        # aggregated by the source instead of from the fetched rows.
+        self.sources = dict(sources or {})
+        self._data = None
+
+    def _load(self) -> Dict:
+        if self._data is None:
+            self._data = {'watermarks': {}, 'kpis': {}}
+            if os.path.exists(self.path):
+                try:
+                    with open(self.path, 'r', encoding='utf8') as f:
+                        self._data = json.load(f)
+                except json.JSONDecodeError:
+                    logger.warning(f"RollupStore: {self.path} is corrupted; rebuilding from scratch.")
+        return self._data
+
+    def _save(self):
+        dirn = os.path.dirname(os.path.abspath(self.path))
+        with tempfile.NamedTemporaryFile('w', delete=False, dir=dirn, encoding='utf8') as tf:
+            json.dump(self._data, tf)
+            tmpname = tf.name
+        os.replace(tmpname, self.path)
+
+    @staticmethod
+    def _has_rows(kpi: str, df: Optional[pd.DataFrame]) -> bool:
+        return not (df is None or df.empty or (kpi in FRACTION_KPIS and FRACTION_KPIS[kpi].column not in df.columns))
+
+    def _source_daily(self, datasets: Dict[str, pd.DataFrame], watermarks: Dict) -> Dict[str, pd.DataFrame]:
+        """Daily num/den per KPI, one daily_aggregates query per dataset with a source."""
+        wanted: Dict[str, Dict[str, List[Aggregate]]] = {}
+        for kpi, (dataset, _, _) in KPIS.items():
+            aggregates = _source_aggregates(kpi)
+            if dataset in self.sources and aggregates and self._has_rows(kpi, datasets.get(dataset)):
+                wanted.setdefault(dataset, {})[kpi] = aggregates
+
+        sums = {}
+        for dataset, by_kpi in wanted.items():
+            mark = watermarks.get(dataset)
+            start = pd.Timestamp(mark).normalize() if mark is not None else None
+            try:
+                daily = self.sources[dataset].daily_aggregates(
+                    [a for aggregates in by_kpi.values() for a in aggregates], start=start)
+            except NotImplementedError:
+                continue
+            for kpi in by_kpi:
+                den = daily[f"{kpi}__den"]
+                num = daily[f"{kpi}__num"] if f"{kpi}__num" in daily else den
+                sums[kpi] = pd.DataFrame({'num': num.astype(float), 'den': den.astype(int)},
+                                         index=pd.DatetimeIndex(daily.index))
+        return sums
+
+    def update(self, datasets: Dict[str, pd.DataFrame]):
+        """
+        Folds new rows into the rollups. For each resolution, everything from
+        the start of the bucket holding the previous watermark is
+        re-aggregated, so rows landing later in that bucket are picked up;
+        earlier buckets are treated as final.
+        """
+        data = self._load()
+        changed = False
+        source_daily = self._source_daily(datasets, data['watermarks']) if self.sources else {}
+        for kpi, (dataset, time_col, _) in KPIS.items():
+            df = datasets.get(dataset)
+            if not self._has_rows(kpi, df):
+                continue
+            times = pd.to_datetime(df[time_col])
+            mark = data['watermarks'].get(dataset)
+            if mark is not None:
+                keep = times >= pd.Timestamp(mark).normalize()
+                df, times = df[keep], times[keep]
+                if df.empty:
+                    continue
+
+            store = data['kpis'].setdefault(kpi, {})
+            for res, freq in RESOLUTIONS.items():
+                buckets = store.setdefault(res, {})
+                res_df, res_times = df, times
+                if mark is not None:
+                    start = pd.Timestamp(mark).floor(freq)
+                    keep = res_times >= start
+                    res_df, res_times = res_df[keep], res_times[keep]
+                    cutoff = start.isoformat()
+                    for key in [k for k in buckets if k >= cutoff]:
+                        del buckets[key]
+                if res == 'daily' and kpi in source_daily:
+                    sums = source_daily[kpi]
+                else:
+                    sums = _bucket_sums(res_df, kpi, res_times, freq)
+                for ts, row in sums.iterrows():
+                    buckets[ts.isoformat()] = [float(row['num']), int(row['den'])]
+                self._trim(buckets, self.retention_days.get(res))
+            changed = True
+
+        for dataset, time_col in {(d, t) for d, t, _ in KPIS.values()}:
+            df = datasets.get(dataset)
+            if df is not None and not df.empty:
+                latest = pd.to_datetime(df[time_col]).max()
+                mark = data['watermarks'].get(dataset)
+                if mark is None or latest.isoformat() > mark:
+                    data['watermarks'][dataset] = latest.isoformat()
+
+        if changed:
+            self._save()
+
+    @staticmethod
+    def _trim(buckets: Dict, days: Optional[int]):
+        if not days or not buckets:
+            return
+        cutoff = (pd.Timestamp(max(buckets)) - pd.Timedelta(days=days)).isoformat()
+        for key in [k for k in buckets if k < cutoff]:
+            del buckets[key]
+
+    def series(self, kpi: str, resolution: str = 'daily', lookback_days: Optional[int] = None) -> pd.Series:
+        """KPI values per bucket, oldest first, optionally limited to the newest lookback_days."""
+        kind = KPIS[kpi][2]
+        buckets = self._load()['kpis'].get(kpi, {}).get(resolution, {})
+        keys = sorted(buckets)
+        if lookback_days and keys:
+            start = pd.Timestamp(keys[-1]).normalize() - pd.Timedelta(days=lookback_days - 1)
+            cutoff = start.isoformat()
+            keys = [k for k in keys if k >= cutoff]
+        if kind == 'count':
+            values = [buckets[k][0] for k in keys]
+        else:
+            values = [buckets[k][0] / max(1, buckets[k][1]) for k in keys]
+        return pd.Series(values, index=pd.to_datetime(keys), name=kpi, dtype=float)
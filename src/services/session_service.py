@@ -1,13 +1,19 @@
 # src/services/session_service.py
-import json
-import os
+from collections import OrderedDict
 from datetime import datetime
 from typing import Optional, Dict, Any, List
+import os
 import uuid
 
+from src.utils.file_store import file_lock
+from src.utils.serialization import dumpb, loads
+
+STATES = ("active", "paused", "finished")
+
+
 class SessionService:
     """
-    Simple file-backed SessionService.
+    File-backed SessionService with in-memory indexes.
 
     Session fields:
       - session_id (str)
@@ -17,24 +23,118 @@ class SessionService:
       - state: active | paused | finished
       - metadata: dict (arbitrary context, e.g. owner, description)
       - last_trace_id: str (optional)
+
+    Storage is an append log (sessions.jsonl): every create/update appends
+    the full session as one JSON line and the last line per session_id wins.
+    Sessions are indexed by session_id and, per state, ordered by update
+    time, so lookups and get_active_session are O(1). Other processes'
+    writes are picked up by reading only the bytes appended since the last
+    call; writers serialize on a file lock. The log is rewritten as one line
+    per session once superseded lines outnumber live ones.
+    A legacy sessions.json (JSON array) is imported on first open.
     """
 
-    def __init__(self, path: str = "sessions.json"):
+    def __init__(self, path: str = "sessions.jsonl", compact_min: int = 1000):
         self.path = path
-        if not os.path.exists(self.path):
-            with open(self.path, "w") as f:
-                json.dump([], f, indent=2)
+        self.compact_min = compact_min
+        self._reset()
+        with file_lock(self.path):
+            self._import_legacy()
+            if not os.path.exists(self.path):
+                open(self.path, "ab").close()
+        self._refresh()
+
+    # -- log -------------------------------------------------------------
+
+    def _reset(self):
+        self._sessions: Dict[str, Dict[str, Any]] = {}
+        self._by_state: Dict[str, "OrderedDict[str, str]"] = {s: OrderedDict() for s in STATES}
+        self._offset = 0
+        self._inode = None
+        self._lines = 0
+
+    def _import_legacy(self):
+        legacy = self.path
+        if os.path.exists(self.path):
+            with open(self.path, "rb") as f:
+                if f.read(1) != b"[":
+                    return
+        elif self.path.endswith(".jsonl") and os.path.exists(self.path[:-1]):
+            legacy = self.path[:-1]  # sessions.json next to the new sessions.jsonl
+        else:
+            return
+        with open(legacy, "rb") as f:
+            sessions = loads(f.read())
+        tmp = f"{self.path}.import"
+        with open(tmp, "wb") as f:
+            f.writelines(dumpb(s) + b"\n" for s in sessions)
+        os.replace(tmp, self.path)
+
+    def _apply(self, session: Dict[str, Any]):
+        sid = session["session_id"]
+        old = self._sessions.get(sid)
+        if old is not None:
+            self._by_state[old["state"]].pop(sid, None)
+        self._sessions[sid] = session
+        self._by_state.setdefault(session["state"], OrderedDict())[sid] = session["updated_at"]
+        self._lines += 1
+
+    def _refresh(self):
+        """Applies lines appended since the last call (by any process); reloads if the log was replaced."""
+        st = os.stat(self.path)
+        if st.st_ino != self._inode or st.st_size < self._offset:
+            self._reset()
+            self._inode = st.st_ino
+        if st.st_size == self._offset:
+            return
+        full = self._offset == 0
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            data = f.read(st.st_size - self._offset)
+        end = data.rfind(b"\n") + 1  # a partial last line is still being written (or torn)
+        for line in data[:end].splitlines():
+            if line.strip():
+                self._apply(loads(line))
+        self._offset += end
+        if full:
+            # file order is write order; sort once so clock skew between writers doesn't matter
+            for state, index in self._by_state.items():
+                self._by_state[state] = OrderedDict(sorted(index.items(), key=lambda kv: kv[1]))
+
+    def _write(self, session: Dict[str, Any]):
+        # caller holds the lock and has refreshed
+        line = dumpb(session) + b"\n"
+        with open(self.path, "r+b") as f:
+            f.truncate(self._offset)  # drop a torn line left by a crashed writer
+            f.seek(self._offset)
+            f.write(line)
+        self._offset += len(line)
+        self._apply(session)
+        if self._lines > max(self.compact_min, 2 * len(self._sessions)):
+            self._compact()
+
+    def _compact(self):
+        dirn = os.path.dirname(os.path.abspath(self.path))
+        tmp = os.path.join(dirn, f".{os.path.basename(self.path)}.compact")
+        with open(tmp, "wb") as f:
+            f.writelines(dumpb(s) + b"\n" for s in self._sessions.values())
+        os.replace(tmp, self.path)
+        self._reset()
+        self._refresh()
 
-    def _load(self) -> List[Dict[str, Any]]:
-        with open(self.path, "r") as f:
-            return json.load(f)
+    def _update(self, session_id: str, **fields) -> Optional[Dict[str, Any]]:
+        with file_lock(self.path):
+            self._refresh()
+            current = self._sessions.get(session_id)
+            if current is None:
+                return None
+            session = {**current, **fields, "updated_at": datetime.utcnow().isoformat()}
+            self._write(session)
+        return dict(session)
 
-    def _save(self, sessions: List[Dict[str, Any]]):
-        with open(self.path, "w") as f:
-            json.dump(sessions, f, indent=2)
+    # -- API -------------------------------------------------------------
 
     def create_session(self, name: str, metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        sessions = self._load()
         session = {
             "session_id": str(uuid.uuid4()),
             "name": name,
@@ -44,49 +144,34 @@ class SessionService:
             "metadata": metadata or {},
             "last_trace_id": None
         }
-        sessions.append(session)
-        self._save(sessions)
-        return session
+        with file_lock(self.path):
+            self._refresh()
+            self._write(session)
+        return dict(session)
 
     def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
-        sessions = self._load()
-        for s in sessions:
-            if s["session_id"] == session_id:
-                return s
-        return None
+        self._refresh()
+        session = self._sessions.get(session_id)
+        return dict(session) if session is not None else None
 
-    def list_sessions(self) -> List[Dict[str, Any]]:
-        return self._load()
+    def list_sessions(self, state: Optional[str] = None) -> List[Dict[str, Any]]:
+        """All sessions in creation order, or those in `state` by update time (oldest first)."""
+        self._refresh()
+        if state is None:
+            return [dict(s) for s in self._sessions.values()]
+        return [dict(self._sessions[sid]) for sid in self._by_state.get(state, ())]
 
     def update_session_state(self, session_id: str, new_state: str) -> Optional[Dict[str, Any]]:
-        assert new_state in ("active", "paused", "finished"), "state must be active|paused|finished"
-        sessions = self._load()
-        updated = None
-        for s in sessions:
-            if s["session_id"] == session_id:
-                s["state"] = new_state
-                s["updated_at"] = datetime.utcnow().isoformat()
-                updated = s
-                break
-        if updated is not None:
-            self._save(sessions)
-        return updated
+        assert new_state in STATES, "state must be active|paused|finished"
+        return self._update(session_id, state=new_state)
 
     def set_last_trace(self, session_id: str, trace_id: str):
-        sessions = self._load()
-        for s in sessions:
-            if s["session_id"] == session_id:
-                s["last_trace_id"] = trace_id
-                s["updated_at"] = datetime.utcnow().isoformat()
-                break
-        self._save(sessions)
+        self._update(session_id, last_trace_id=trace_id)
 
     def get_active_session(self) -> Optional[Dict[str, Any]]:
-        sessions = self._load()
-        # return the most recently updated active session, if any
-        active = [s for s in sessions if s["state"] == "active"]
+        # the most recently updated active session, if any
+        self._refresh()
+        active = self._by_state["active"]
         if not active:
             return None
-        # sort by updated_at desc
-        active = sorted(active, key=lambda x: x["updated_at"], reverse=True)
-        return active[0]
+        return dict(self._sessions[next(reversed(active))])
@@ -0,0 +1,181 @@
+# src/services/subject_clusters.py
+"""
+SubjectClusterer
+- Groups support ticket subjects into topics so a spike can be read as
+  "refund tickets doubled" rather than "volume went up"
+- Subjects are embedded with a stateless HashingVectorizer (no vocabulary
+  held in memory) and clustered with MiniBatchKMeans.partial_fit, one
+  bounded batch at a time, so millions of tickets fit on a single CPU box
+- Only tickets newer than the watermark are processed each cycle (plus those
+  created at the watermark instant whose ticket_id wasn't seen yet); per-day
+  ticket counts per cluster are accumulated and a cluster whose daily share
+  jumps against its own history is reported as an emerging issue
+- Model and counts are pickled between runs
+"""
+
+import os
+import pickle
+import tempfile
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.feature_extraction.text import HashingVectorizer
+
+from src.utils.logger import logger
+from src.utils.segments import latest_zscores
+
+MAX_SAMPLES = 3   # example subjects reported per cluster
+MAX_TRACKED = 20  # candidate subjects counted per cluster for the newest day
+
+
+class SubjectClusterer:
+    def __init__(self, path: Optional[str] = 'subject_clusters.pkl', n_clusters: int = 20,
+                 batch_size: int = 10_000, n_features: int = 2 ** 18, threshold: float = 2.5,
+                 min_periods: int = 5, min_count: int = 5, seed: int = 0):
+        self.path = path
+        self.n_clusters = n_clusters
+        self.batch_size = max(batch_size, n_clusters)  # the first batch initializes every centroid
+        self.threshold = threshold
+        self.min_periods = min_periods
+        self.min_count = min_count
+        self.seed = seed
+        self.vectorizer = HashingVectorizer(n_features=n_features, alternate_sign=False,
+                                            ngram_range=(1, 2), stop_words='english')
+        self._state = None
+
+    def _new_state(self) -> Dict:
+        model = MiniBatchKMeans(n_clusters=self.n_clusters, batch_size=self.batch_size,
+                                random_state=self.seed, n_init=3)
+        return {'model': model, 'fitted': False, 'watermark': None, 'watermark_ids': [], 'counts': {},
+                'examples_day': None, 'examples': [{} for _ in range(self.n_clusters)]}
+
+    def _load(self) -> Dict:
+        if self._state is None:
+            self._state = self._new_state()
+            if self.path and os.path.exists(self.path):
+                try:
+                    with open(self.path, 'rb') as f:
+                        self._state = pickle.load(f)
+                except (pickle.UnpicklingError, EOFError):
+                    logger.warning(f"SubjectClusterer: {self.path} is corrupted; starting fresh.")
+        return self._state
+
+    def save(self):
+        if self._state is None or not self.path:
+            return
+        dirn = os.path.dirname(os.path.abspath(self.path))
+        with tempfile.NamedTemporaryFile('wb', delete=False, dir=dirn) as tf:
+            pickle.dump(self._state, tf, protocol=pickle.HIGHEST_PROTOCOL)
+            tmpname = tf.name
+        os.replace(tmpname, self.path)
+
+    def update(self, df: pd.DataFrame) -> int:
+        """
+        Clusters tickets created after the watermark; returns how many were
+        assigned. The model is first fitted once n_clusters tickets exist.
+        """
+        state = self._load()
+        if df is None or df.empty or 'subject' not in df.columns:
+            return 0
+        created = pd.to_datetime(df['created_at'])
+        ids = df['ticket_id'].astype(str) if 'ticket_id' in df.columns else None
+        mark = pd.Timestamp(state['watermark']) if state['watermark'] else None
+        if mark is None:
+            keep = np.ones(len(df), dtype=bool)
+        elif ids is None:
+            keep = np.asarray(created > mark, dtype=bool)
+        else:
+            seen = set(state.get('watermark_ids', ()))
+            keep = np.asarray((created > mark) | ((created == mark) & ~ids.isin(seen)), dtype=bool)
+        if keep.sum() < (0 if state['fitted'] else self.n_clusters):
+            return 0
+
+        created = created[keep]
+        subjects = df.loc[keep, 'subject'].fillna('').astype(str).to_numpy()
+        order = np.argsort(created.to_numpy(), kind='stable')
+        subjects, created = subjects[order], created.iloc[order]
+        days = created.dt.strftime('%Y-%m-%d').to_numpy()
+
+        model = state['model']
+        for start in range(0, len(subjects), self.batch_size):
+            end = start + self.batch_size
+            X = self.vectorizer.transform(subjects[start:end])
+            model.partial_fit(X)
+            state['fitted'] = True
+            labels = model.predict(X)
+            self._count(state, days[start:end], labels)
+            self._remember(state, days[start:end], subjects[start:end], labels)
+
+        newest = created.max()
+        if ids is not None:
+            at_newest = set(ids[keep].to_numpy()[order][(created == newest).to_numpy()])
+            if mark is not None and newest == mark:
+                at_newest |= set(state.get('watermark_ids', ()))
+            state['watermark_ids'] = sorted(at_newest)
+        state['watermark'] = newest.isoformat()
+        return int(len(subjects))
+
+    def _count(self, state: Dict, days: np.ndarray, labels: np.ndarray):
+        day_codes, day_labels = pd.factorize(days)
+        counts = np.bincount(day_codes * self.n_clusters + labels,
+                             minlength=len(day_labels) * self.n_clusters).reshape(-1, self.n_clusters)
+        for day, row in zip(day_labels, counts):
+            prev = state['counts'].get(day)
+            state['counts'][day] = row if prev is None else prev + row
+
+    def _remember(self, state: Dict, days: np.ndarray, subjects: np.ndarray, labels: np.ndarray):
+        # Most frequent subjects per cluster on the newest day, so a flagged
+        # cluster is described by what drove today's jump. Only the top
+        # MAX_TRACKED candidates per cluster are kept between batches.
+        latest = days[-1]
+        if state['examples_day'] != latest:
+            state['examples_day'] = latest
+            state['examples'] = [{} for _ in range(self.n_clusters)]
+        today = days == latest
+        codes, uniques = pd.factorize(subjects[today])
+        labels = labels[today]
+        counts = np.bincount(labels.astype(np.int64) * len(uniques) + codes,
+                             minlength=self.n_clusters * len(uniques)).reshape(self.n_clusters, -1)
+        for label in np.unique(labels):
+            row = counts[label]
+            top = np.argpartition(-row, min(MAX_TRACKED, len(row)) - 1)[:MAX_TRACKED]
+            seen = state['examples'][label]
+            for idx in top[row[top] > 0]:
+                seen[uniques[idx]] = seen.get(uniques[idx], 0) + int(row[idx])
+            if len(seen) > MAX_TRACKED:
+                state['examples'][label] = dict(sorted(seen.items(), key=lambda kv: -kv[1])[:MAX_TRACKED])
+
+    def detect(self, lookback_days: Optional[int] = 14) -> List[Dict]:
+        """
+        Clusters whose share of the newest day's tickets is a z-score jump
+        above their share on earlier days, largest first.
+        """
+        state = self._load()
+        if not state['counts']:
+            return []
+        end = pd.Timestamp(max(state['counts']))
+        start = pd.Timestamp(min(state['counts']))
+        if lookback_days:
+            start = max(start, end - pd.Timedelta(days=lookback_days - 1))
+        days = pd.date_range(start, end, freq='D').strftime('%Y-%m-%d')
+        zeros = np.zeros(self.n_clusters)
+        counts = np.column_stack([state['counts'].get(d, zeros) for d in days]).astype(float)
+        totals = counts.sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            shares = np.where(totals > 0, counts / totals, np.nan)
+
+        z = latest_zscores(shares, self.min_periods)
+        hits = np.flatnonzero((np.nan_to_num(z) > self.threshold) & (counts[:, -1] >= self.min_count))
+        issues = []
+        for idx in hits[np.argsort(-z[hits])]:
+            issues.append({
+                'cluster': int(idx),
+                'latest_share': float(shares[idx, -1]),
+                'baseline_share': float(np.nanmean(shares[idx, :-1])),
+                'latest_count': int(counts[idx, -1]),
+                'z_score': float(z[idx]),
+                'examples': sorted(state['examples'][idx], key=state['examples'][idx].get, reverse=True)[:MAX_SAMPLES],
+            })
+        return issues
@@ -1,25 +1,271 @@
+import io
+import os
+import time
+from concurrent.futures import FIRST_EXCEPTION, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Optional, Tuple
+
 import pandas as pd
 
+from src.tools.data_sources import DataSource
+from src.tools.dataset_cache import DatasetCache
+from src.utils.logger import logger
+
+# Bytes of the file head remembered per checkpoint; a change here means the
+# file was rewritten rather than appended to.
+_HEAD_BYTES = 4096
+_SCAN_BLOCK = 1 << 16
+
+SOURCES = ("sales", "support", "marketing")
+# Column each dataset is windowed and bucketed on
+TIME_COLUMNS = {"sales": "date", "support": "created_at", "marketing": "date"}
+
+
+class _IngestCheckpoint:
+    """Per-file state retained between cycles in incremental mode."""
+
+    __slots__ = ("inode", "head", "offset", "open_rows", "columns", "frame", "window")
+
+    def __init__(self, inode, head, offset, open_rows, columns, frame, window):
+        self.inode = inode
+        self.head = head          # first bytes of the file at last full load
+        self.offset = offset      # byte offset just past the last complete line
+        self.open_rows = open_rows  # rows parsed from an unterminated last line
+        self.columns = columns
+        self.frame = frame
+        self.window = window      # window_days the frame was trimmed to
+
+
+def _complete_lines_end(f, size: int) -> int:
+    """Returns the byte offset just past the last newline in the file."""
+    pos = size
+    while pos > 0:
+        start = max(0, pos - _SCAN_BLOCK)
+        f.seek(start)
+        block = f.read(pos - start)
+        idx = block.rfind(b"\n")
+        if idx != -1:
+            return start + idx + 1
+        pos = start
+    return 0
+
+
+def _timed_fetch(fetcher: "DataFetcher", name: str, window_days: Optional[int]) -> Tuple[pd.DataFrame, float]:
+    # Module-level so it can be shipped to a process pool worker.
+    t0 = time.perf_counter()
+    df = getattr(fetcher, f"fetch_{name}")(window_days=window_days)
+    return df, time.perf_counter() - t0
+
+
 class DataFetcher:
-    def __init__(self, sales_path, support_path, marketing_path):
+    def __init__(self, sales_path, support_path, marketing_path, incremental: bool = False,
+                 cache: Optional[DatasetCache] = None, window_days: Optional[int] = None,
+                 chunksize: int = 100_000, concurrency: Optional[str] = None,
+                 max_workers: Optional[int] = None, sources: Optional[Dict[str, DataSource]] = None):
         self.sales_path = sales_path
         self.support_path = support_path
         self.marketing_path = marketing_path
+        # Connectors (see data_sources.py) override the CSV path of the same
+        # dataset name; the time window is pushed down into their query.
+        self.sources = dict(sources or {})
+        # fetch_all loads sources sequentially (None) or in a "thread" or
+        # "process" pool. Incremental checkpoints live in this process, so
+        # they cannot be combined with a process pool.
+        if concurrency not in (None, "thread", "process"):
+            raise ValueError("concurrency must be None, 'thread' or 'process'")
+        if concurrency == "process" and incremental:
+            raise ValueError("incremental ingestion requires sequential or thread concurrency")
+        if concurrency == "process" and not all(s.process_safe for s in self.sources.values()):
+            raise ValueError("pooled sources (e.g. SQLSource) require sequential or thread concurrency")
+        self.concurrency = concurrency
+        self.max_workers = max_workers
+        # Per-source wall time and row counts of the last fetch_all call
+        self.last_fetch_stats: Dict[str, Dict[str, float]] = {}
+        # When set, only rows within window_days of the newest timestamp are
+        # kept. Full reads stream the CSV in chunks so memory is bounded by
+        # the window rather than the file size. fetch_*(window_days=...)
+        # overrides it for one call.
+        self.window_days = window_days
+        self.chunksize = chunksize
+        # Optional on-disk cache of parsed frames; full loads hit it first.
+        self.cache = cache
+        # Incremental mode keeps the parsed frame per file and only parses
+        # rows appended since the previous fetch.
+        self.incremental = incremental
+        self._checkpoints: Dict[str, _IngestCheckpoint] = {}
+
+    @staticmethod
+    def _prepare_sales(df):
+        df['date'] = pd.to_datetime(df['date'])
+        return df
+
+    @staticmethod
+    def _prepare_support(df):
+        for col in ('created_at', 'resolved_at'):
+            if col not in df.columns:
+                continue
+            df[col] = pd.to_datetime(df[col], errors='coerce' if col == 'resolved_at' else 'raise')
+            # Ensure timestamps are timezone-naive to match injected data
+            if df[col].dt.tz is not None:
+                df[col] = df[col].dt.tz_localize(None)
+        return df
 
-    def fetch_sales(self):
-        df = pd.read_csv(self.sales_path)
+    @staticmethod
+    def _prepare_marketing(df):
         df['date'] = pd.to_datetime(df['date'])
         return df
 
-    def fetch_support(self):
-        df = pd.read_csv(self.support_path)
-        df['created_at'] = pd.to_datetime(df['created_at'])
-        # Ensure timestamps are timezone-naive to match injected data
-        if df['created_at'].dt.tz is not None:
-            df['created_at'] = df['created_at'].dt.tz_localize(None)
-        
+    def reset(self, path: Optional[str] = None):
+        """Drops incremental checkpoints (all files, or a single path)."""
+        if path is None:
+            self._checkpoints.clear()
+        else:
+            self._checkpoints.pop(str(path), None)
+
+    def _window(self, window_days: Optional[int]) -> Optional[int]:
+        return self.window_days if window_days is None else window_days
+
+    @staticmethod
+    def _window_start(latest: pd.Timestamp, window: int) -> pd.Timestamp:
+        # window calendar days, counting the day of the newest row
+        return latest.normalize() - pd.Timedelta(days=window - 1)
+
+    def _apply_window(self, df: pd.DataFrame, time_col: str, window: Optional[int]) -> pd.DataFrame:
+        if not window or df.empty:
+            return df
+        start = self._window_start(df[time_col].max(), window)
+        if df[time_col].min() >= start:
+            return df
+        return df[df[time_col] >= start].reset_index(drop=True)
+
+    def _read_windowed(self, path, prepare, time_col: str, window: int) -> pd.DataFrame:
+        kept = []  # (frame, min_ts) of chunks overlapping the current window
+        latest = None
+        empty = None
+        for chunk in pd.read_csv(path, chunksize=self.chunksize):
+            chunk = prepare(chunk)
+            if empty is None:
+                empty = chunk.iloc[:0]
+            if chunk.empty:
+                continue
+            chunk_max = chunk[time_col].max()
+            if latest is None or chunk_max > latest:
+                latest = chunk_max
+            start = self._window_start(latest, window)
+
+            chunk = chunk[chunk[time_col] >= start]
+            if not chunk.empty:
+                kept.append((chunk, chunk[time_col].min()))
+            # The window only moves forward; trim what earlier chunks kept.
+            kept = [
+                (frame[frame[time_col] >= start], start) if lo < start else (frame, lo)
+                for frame, lo in kept
+            ]
+            kept = [(frame, lo) for frame, lo in kept if not frame.empty]
+
+        if not kept:
+            return empty if empty is not None else prepare(pd.read_csv(path, nrows=0))
+        return pd.concat([frame for frame, _ in kept], ignore_index=True)
+
+    def _load_csv(self, path, prepare, time_col: str, window: Optional[int]) -> pd.DataFrame:
+        if window:
+            return self._read_windowed(path, prepare, time_col, window)
+        return prepare(pd.read_csv(path))
+
+    def _parse(self, path, prepare: Callable[[pd.DataFrame], pd.DataFrame], time_col: str,
+               window: Optional[int]) -> pd.DataFrame:
+        if self.cache is None:
+            return self._load_csv(path, prepare, time_col, window)
+
+        variant = f"window{window}" if window else None
+        df = self.cache.load(path, variant=variant)
+        if df is not None:
+            return df
+        fingerprint = self.cache.fingerprint(path)
+        df = self._load_csv(path, prepare, time_col, window)
+        self.cache.store(path, df, fingerprint=fingerprint, variant=variant)
+        return df
+
+    def _read_connector(self, source: DataSource, prepare, window: Optional[int]) -> pd.DataFrame:
+        start = None
+        if window:
+            latest = source.latest()
+            start = self._window_start(latest, window) if latest is not None else None
+        # Connectors only parse their time column; prepare handles the rest
+        # (e.g. resolved_at) the same way as for CSV exports.
+        return prepare(source.read(start=start))
+
+    def _read(self, name: str, prepare: Callable[[pd.DataFrame], pd.DataFrame], time_col: str,
+              window_days: Optional[int] = None) -> pd.DataFrame:
+        window = self._window(window_days)
+        if name in self.sources:
+            return self._read_connector(self.sources[name], prepare, window)
+        path = getattr(self, f"{name}_path")
+        if not self.incremental:
+            return self._parse(path, prepare, time_col, window)
+        return self._read_incremental(str(path), prepare, time_col, window)
+
+    def _full_load(self, path: str, st, prepare, time_col: str, window: Optional[int]) -> pd.DataFrame:
+        df = self._parse(path, prepare, time_col, window)
+        with open(path, 'rb') as f:
+            head = f.read(min(_HEAD_BYTES, st.st_size))
+            offset = _complete_lines_end(f, st.st_size)
+        # An unterminated last line was parsed as a row; re-parse it next time
+        # once the writer has finished it.
+        open_rows = 1 if offset < st.st_size and len(df) else 0
+        self._checkpoints[path] = _IngestCheckpoint(
+            inode=st.st_ino, head=head, offset=offset, open_rows=open_rows,
+            columns=list(df.columns), frame=df, window=window,
+        )
+        return df
+
+    def _read_incremental(self, path: str, prepare, time_col: str, window: Optional[int]) -> pd.DataFrame:
+        st = os.stat(path)
+        cp = self._checkpoints.get(path)
+        if cp is None or cp.window != window:
+            return self._full_load(path, st, prepare, time_col, window).copy(deep=False)
+
+        with open(path, 'rb') as f:
+            head = f.read(min(len(cp.head), st.st_size))
+            rewritten = (
+                st.st_ino != cp.inode
+                or st.st_size < cp.offset
+                or head != cp.head
+            )
+            if rewritten:
+                logger.info(f"DataFetcher: {path} was truncated or rewritten; reloading in full.")
+                return self._full_load(path, st, prepare, time_col, window).copy(deep=False)
+
+            if st.st_size == cp.offset:
+                return cp.frame.copy(deep=False)
+
+            f.seek(cp.offset)
+            tail = f.read(st.st_size - cp.offset)
+
+        # Only complete lines are parsed; a half-written row is picked up on
+        # the next fetch.
+        end = tail.rfind(b"\n") + 1
+        if end == 0:
+            return cp.frame.copy(deep=False)
+        tail_df = prepare(pd.read_csv(io.BytesIO(tail[:end]), header=None, names=cp.columns))
+
+        frame = cp.frame
+        if cp.open_rows:
+            frame = frame.iloc[:len(frame) - cp.open_rows]
+        if len(tail_df):
+            frame = self._apply_window(pd.concat([frame, tail_df], ignore_index=True), time_col, window)
+
+        cp.offset += end
+        cp.open_rows = 0
+        cp.frame = frame
+        return frame.copy(deep=False)
+
+    def fetch_sales(self, window_days: Optional[int] = None):
+        return self._read('sales', self._prepare_sales, TIME_COLUMNS['sales'], window_days)
+
+    def fetch_support(self, window_days: Optional[int] = None):
+        df = self._read('support', self._prepare_support, TIME_COLUMNS['support'], window_days)
+
         # Inject anomaly for demo purposes
-        import os
         if os.getenv("DEMO_MODE", "false").lower() == "true":
              # Add 100 dummy tickets for today to trigger anomaly
              new_rows = pd.DataFrame({
@@ -32,17 +278,43 @@ class DataFetcher:
                  'resolved_at': [None]*100
              })
              df = pd.concat([df, new_rows], ignore_index=True)
-        
-        return df
 
-    def fetch_marketing(self):
-        df = pd.read_csv(self.marketing_path)
-        df['date'] = pd.to_datetime(df['date'])
         return df
 
-    def fetch_all(self):
-        return {
-            "sales": self.fetch_sales(),
-            "support": self.fetch_support(),
-            "marketing": self.fetch_marketing()
+    def fetch_marketing(self, window_days: Optional[int] = None):
+        return self._read('marketing', self._prepare_marketing, TIME_COLUMNS['marketing'], window_days)
+
+    def _check_sources(self):
+        for name in SOURCES:
+            if name in self.sources:
+                continue
+            path = getattr(self, f"{name}_path")
+            if not path or not os.path.exists(path):
+                raise FileNotFoundError(f"DataFetcher: {name} source not found: {path}")
+
+    def fetch_all(self, window_days: Optional[int] = None):
+        """All datasets; window_days overrides the fetcher's window for this call."""
+        self._check_sources()
+
+        if self.concurrency is None:
+            timed = {name: _timed_fetch(self, name, window_days) for name in SOURCES}
+        else:
+            pool_cls = ThreadPoolExecutor if self.concurrency == "thread" else ProcessPoolExecutor
+            pool = pool_cls(max_workers=self.max_workers or len(SOURCES))
+            futures = {pool.submit(_timed_fetch, self, name, window_days): name for name in SOURCES}
+            done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+            failed = [fut for fut in done if fut.exception() is not None]
+            if failed:
+                # Don't wait for the remaining sources once one has failed
+                pool.shutdown(wait=False, cancel_futures=True)
+                name = futures[failed[0]]
+                raise RuntimeError(f"DataFetcher: failed to load {name}") from failed[0].exception()
+            pool.shutdown()
+            timed = {futures[fut]: fut.result() for fut in futures}
+
+        self.last_fetch_stats = {
+            name: {"seconds": round(elapsed, 4), "rows": int(len(df))}
+            for name, (df, elapsed) in timed.items()
         }
+        logger.info(f"DataFetcher: fetched {self.last_fetch_stats}")
+        return {name: df for name, (df, _) in timed.items()}
@@ -0,0 +1,286 @@
+# src/tools/data_sources.py
+"""
+Data source connectors for DataFetcher
+- CSVSource / ParquetSource read local exports
+- SQLSource queries a DB-API database through a small connection pool
+- Every source supports a time-range read and a daily aggregate query, so
+  warehouses only ship per-day aggregates instead of raw rows
+"""
+
+import queue
+import re
+import sqlite3
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
+from typing import Callable, Iterable, List, Optional
+
+import pandas as pd
+
+from src.tools.dataset_cache import HAVE_PARQUET
+
+# One aggregate column of a daily rollup:
+#   func  - "count" (rows), "sum", "mean", or "count_eq" (rows where column == match)
+Aggregate = namedtuple("Aggregate", ["name", "func", "column", "match"], defaults=(None, None))
+
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def _identifier(name: str) -> str:
+    # Table/column names can't be bound as parameters; only allow plain identifiers.
+    if not _IDENTIFIER.match(name):
+        raise ValueError(f"Invalid SQL identifier: {name!r}")
+    return name
+
+
+def _parse_times(series: pd.Series) -> pd.Series:
+    series = pd.to_datetime(series)
+    if series.dt.tz is not None:
+        series = series.dt.tz_localize(None)
+    return series
+
+
+def _aggregate_frame(df: pd.DataFrame, time_column: str, aggregates: Iterable[Aggregate]) -> pd.DataFrame:
+    """Per-day partial sums/counts for df; combine partials with _finish_aggregates."""
+    day = df[time_column].dt.normalize()
+    parts = {}
+    for agg in aggregates:
+        if agg.func == "count":
+            parts[agg.name] = day.groupby(day).size()
+        elif agg.func == "count_eq":
+            parts[agg.name] = df[agg.column].eq(agg.match).groupby(day).sum()
+        elif agg.func in ("sum", "mean"):
+            grouped = df[agg.column].groupby(day)
+            parts[agg.name] = grouped.sum()
+            if agg.func == "mean":
+                parts[f"{agg.name}__n"] = grouped.count()
+        else:
+            raise ValueError(f"Unknown aggregate function: {agg.func}")
+    return pd.DataFrame(parts)
+
+
+def _finish_aggregates(partials: List[pd.DataFrame], aggregates: Iterable[Aggregate]) -> pd.DataFrame:
+    if not partials:
+        return pd.DataFrame(columns=[a.name for a in aggregates])
+    total = pd.concat(partials).groupby(level=0).sum()
+    for agg in aggregates:
+        if agg.func == "mean":
+            total[agg.name] = total[agg.name] / total.pop(f"{agg.name}__n").where(lambda n: n > 0)
+    total.index.name = "day"
+    return total.sort_index()
+
+
+class DataSource:
+    """Base connector. Implementations return frames with a parsed, tz-naive time column."""
+
+    # False when the source holds live connections and can't be shipped to a
+    # process pool worker.
+    process_safe = True
+
+    def __init__(self, time_column: str):
+        self.time_column = time_column
+
+    def read(self, start: Optional[pd.Timestamp] = None, end: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+        raise NotImplementedError
+
+    def latest(self) -> Optional[pd.Timestamp]:
+        raise NotImplementedError
+
+    def daily_aggregates(self, aggregates: List[Aggregate], start=None, end=None) -> pd.DataFrame:
+        """One row per day (index "day") with a column per Aggregate."""
+        raise NotImplementedError
+
+    def _in_range(self, df: pd.DataFrame, start, end) -> pd.DataFrame:
+        if start is not None:
+            df = df[df[self.time_column] >= start]
+        if end is not None:
+            df = df[df[self.time_column] < end]
+        return df
+
+
+class CSVSource(DataSource):
+    def __init__(self, path, time_column: str, chunksize: int = 100_000):
+        super().__init__(time_column)
+        self.path = str(path)
+        self.chunksize = chunksize
+
+    def _chunks(self, start=None, end=None):
+        for chunk in pd.read_csv(self.path, chunksize=self.chunksize):
+            chunk[self.time_column] = _parse_times(chunk[self.time_column])
+            yield self._in_range(chunk, start, end)
+
+    def read(self, start=None, end=None) -> pd.DataFrame:
+        chunks = [c for c in self._chunks(start, end) if not c.empty]
+        if not chunks:
+            head = pd.read_csv(self.path, nrows=0)
+            head[self.time_column] = _parse_times(head[self.time_column])
+            return head
+        return pd.concat(chunks, ignore_index=True)
+
+    def latest(self):
+        latest = None
+        for chunk in pd.read_csv(self.path, usecols=[self.time_column], chunksize=self.chunksize):
+            value = _parse_times(chunk[self.time_column]).max()
+            if pd.notna(value) and (latest is None or value > latest):
+                latest = value
+        return latest
+
+    def daily_aggregates(self, aggregates, start=None, end=None) -> pd.DataFrame:
+        partials = [_aggregate_frame(c, self.time_column, aggregates)
+                    for c in self._chunks(start, end) if not c.empty]
+        return _finish_aggregates(partials, aggregates)
+
+
+class ParquetSource(DataSource):
+    def __init__(self, path, time_column: str):
+        if not HAVE_PARQUET:
+            raise ImportError("ParquetSource requires pyarrow")
+        super().__init__(time_column)
+        self.path = str(path)
+
+    def read(self, start=None, end=None) -> pd.DataFrame:
+        filters = []
+        if start is not None:
+            filters.append((self.time_column, ">=", pd.Timestamp(start)))
+        if end is not None:
+            filters.append((self.time_column, "<", pd.Timestamp(end)))
+        df = pd.read_parquet(self.path, filters=filters or None)
+        df[self.time_column] = _parse_times(df[self.time_column])
+        return df
+
+    def latest(self):
+        col = pd.read_parquet(self.path, columns=[self.time_column])[self.time_column]
+        return _parse_times(col).max() if len(col) else None
+
+    def daily_aggregates(self, aggregates, start=None, end=None) -> pd.DataFrame:
+        df = self.read(start, end)
+        return _finish_aggregates([_aggregate_frame(df, self.time_column, aggregates)] if len(df) else [], aggregates)
+
+
+class ConnectionPool:
+    """
+    Fixed-size pool of DB-API connections, created lazily by connect().
+    paramstyle is the driver's placeholder style ("qmark" for sqlite3,
+    "format"/"pyformat" for psycopg-style drivers).
+    """
+
+    def __init__(self, connect: Callable[[], object], size: int = 4, paramstyle: str = "qmark"):
+        self._connect = connect
+        self.size = size
+        self.placeholder = "?" if paramstyle == "qmark" else "%s"
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                return self._connect()
+        return self._idle.get()
+
+    @contextmanager
+    def connection(self):
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._lock:
+            self._created = 0
+
+
+def sqlite_pool(db_path, size: int = 4) -> ConnectionPool:
+    return ConnectionPool(
+        lambda: sqlite3.connect(str(db_path), check_same_thread=False),
+        size=size, paramstyle="qmark",
+    )
+
+
+class SQLSource(DataSource):
+    """
+    Reads one table through a ConnectionPool. Time ranges are bound as query
+    parameters and daily aggregation runs in the database. day_expr is the
+    SQL expression that truncates the time column to a day ("date({col})" on
+    SQLite, "CAST({col} AS DATE)" on most warehouses).
+    """
+
+    process_safe = False
+
+    def __init__(self, pool: ConnectionPool, table: str, time_column: str,
+                 day_expr: str = "date({col})"):
+        super().__init__(_identifier(time_column))
+        self.pool = pool
+        self.table = _identifier(table)
+        self.day_expr = day_expr.format(col=self.time_column)
+
+    def _where(self, start, end):
+        clauses, params = [], []
+        ph = self.pool.placeholder
+        if start is not None:
+            clauses.append(f"{self.time_column} >= {ph}")
+            params.append(pd.Timestamp(start).isoformat(sep=" "))
+        if end is not None:
+            clauses.append(f"{self.time_column} < {ph}")
+            params.append(pd.Timestamp(end).isoformat(sep=" "))
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def _query(self, sql: str, params) -> pd.DataFrame:
+        with self.pool.connection() as conn:
+            return pd.read_sql_query(sql, conn, params=params)
+
+    def read(self, start=None, end=None) -> pd.DataFrame:
+        where, params = self._where(start, end)
+        df = self._query(f"SELECT * FROM {self.table}{where}", params)
+        df[self.time_column] = _parse_times(df[self.time_column])
+        return df
+
+    def latest(self):
+        df = self._query(f"SELECT MAX({self.time_column}) AS latest FROM {self.table}", [])
+        value = df["latest"].iloc[0]
+        return None if value is None else _parse_times(pd.Series([value])).iloc[0]
+
+    def daily_aggregates(self, aggregates, start=None, end=None) -> pd.DataFrame:
+        ph = self.pool.placeholder
+        select, params = [f"{self.day_expr} AS day"], []
+        for agg in aggregates:
+            name = _identifier(agg.name)
+            if agg.func == "count":
+                select.append(f"COUNT(*) AS {name}")
+            elif agg.func == "count_eq":
+                select.append(f"SUM(CASE WHEN {_identifier(agg.column)} = {ph} THEN 1 ELSE 0 END) AS {name}")
+                params.append(agg.match)
+            elif agg.func in ("sum", "mean"):
+                fn = "SUM" if agg.func == "sum" else "AVG"
+                select.append(f"{fn}({_identifier(agg.column)}) AS {name}")
+            else:
+                raise ValueError(f"Unknown aggregate function: {agg.func}")
+
+        where, where_params = self._where(start, end)
+        sql = f"SELECT {', '.join(select)} FROM {self.table}{where} GROUP BY day ORDER BY day"
+        df = self._query(sql, params + where_params)
+        df["day"] = pd.to_datetime(df["day"])
+        return df.set_index("day")
+
+
+def load_csv_into_sqlite(csv_path, db_path, table: str, time_column: str, chunksize: int = 100_000):
+    """Local stand-in for a warehouse table: copies a CSV export into SQLite."""
+    table = _identifier(table)
+    time_column = _identifier(time_column)
+    with sqlite3.connect(str(db_path)) as conn:
+        conn.execute(f"DROP TABLE IF EXISTS {table}")
+        for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+            chunk[time_column] = _parse_times(chunk[time_column]).dt.strftime("%Y-%m-%d %H:%M:%S")
+            chunk.to_sql(table, conn, if_exists="append", index=False)
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_{time_column} ON {table}({time_column})")
@@ -0,0 +1,127 @@
+# src/tools/dataset_cache.py
+"""
+DatasetCache
+- Stores already-parsed (typed) DataFrames next to the raw CSV exports
+- Entries are invalidated by the source file's size/mtime (optionally a content hash)
+- Uses Parquet when pyarrow is installed, otherwise pandas' binary pickle format
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from typing import Optional
+
+import pandas as pd
+
+from src.utils.logger import logger
+
+try:
+    import pyarrow  # noqa: F401
+    HAVE_PARQUET = True
+except Exception:
+    HAVE_PARQUET = False
+
+_HASH_BLOCK = 1 << 20
+
+
+def _file_digest(path: str) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class DatasetCache:
+    def __init__(self, cache_dir, verify_hash: bool = False, fmt: Optional[str] = None):
+        self.cache_dir = str(cache_dir)
+        # mtime can be unreliable (copied exports, coarse filesystems); hashing
+        # the source costs a full read but no parsing.
+        self.verify_hash = verify_hash
+        self.fmt = fmt or ("parquet" if HAVE_PARQUET else "pickle")
+        if self.fmt == "parquet" and not HAVE_PARQUET:
+            raise ValueError("Parquet cache format requires pyarrow")
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _entry_paths(self, source_path: str, variant: Optional[str] = None):
+        source_path = os.path.abspath(str(source_path))
+        stem = os.path.splitext(os.path.basename(source_path))[0]
+        if variant:
+            stem = f"{stem}.{variant}"
+        key = hashlib.sha1(source_path.encode("utf8")).hexdigest()[:10]
+        base = os.path.join(self.cache_dir, f"{stem}-{key}")
+        return source_path, f"{base}.{self.fmt}", f"{base}.meta.json"
+
+    def fingerprint(self, source_path) -> dict:
+        """Identity of the source file's current contents, as used for invalidation."""
+        source_path = os.path.abspath(str(source_path))
+        st = os.stat(source_path)
+        fp = {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+        if self.verify_hash:
+            fp["digest"] = _file_digest(source_path)
+        return fp
+
+    def load(self, source_path, variant: Optional[str] = None) -> Optional[pd.DataFrame]:
+        """
+        Returns the cached frame for source_path, or None when missing/stale.
+        variant distinguishes differently-derived frames of the same source
+        (e.g. a windowed read).
+        """
+        source_path, data_path, meta_path = self._entry_paths(source_path, variant)
+        try:
+            with open(meta_path, 'r', encoding='utf8') as f:
+                meta = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+        if meta.get("format") != self.fmt or meta.get("fingerprint") != self.fingerprint(source_path):
+            return None
+
+        try:
+            if self.fmt == "parquet":
+                return pd.read_parquet(data_path)
+            return pd.read_pickle(data_path)
+        except Exception as e:
+            logger.warning(f"DatasetCache: failed to read {data_path}, ignoring entry: {e}")
+            return None
+
+    def store(self, source_path, df: pd.DataFrame, fingerprint: Optional[dict] = None,
+              variant: Optional[str] = None):
+        """
+        Caches df for source_path. Pass the fingerprint taken before parsing so
+        a file modified mid-parse is not cached under its newer identity.
+        """
+        source_path, data_path, meta_path = self._entry_paths(source_path, variant)
+        meta = {
+            "source": source_path,
+            "format": self.fmt,
+            "fingerprint": fingerprint or self.fingerprint(source_path),
+            "rows": int(len(df)),
+        }
+        tmpname = None
+        try:
+            # Drop the old metadata first so a crash never pairs it with new data
+            if os.path.exists(meta_path):
+                os.remove(meta_path)
+            with tempfile.NamedTemporaryFile('wb', delete=False, dir=self.cache_dir) as tf:
+                tmpname = tf.name
+            if self.fmt == "parquet":
+                df.to_parquet(tmpname, index=False)
+            else:
+                df.to_pickle(tmpname)
+            os.replace(tmpname, data_path)
+            with tempfile.NamedTemporaryFile('w', delete=False, dir=self.cache_dir, encoding='utf8') as tf:
+                json.dump(meta, tf)
+                tmpname = tf.name
+            os.replace(tmpname, meta_path)
+        except Exception as e:
+            logger.warning(f"DatasetCache: failed to cache {source_path}: {e}")
+            if tmpname and os.path.exists(tmpname):
+                os.remove(tmpname)
+
+    def invalidate(self, source_path, variant: Optional[str] = None):
+        _, data_path, meta_path = self._entry_paths(source_path, variant)
+        for p in (meta_path, data_path):
+            if os.path.exists(p):
+                os.remove(p)
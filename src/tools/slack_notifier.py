@@ -1,9 +1,10 @@
-import json
 import os
 from datetime import datetime
 from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
 
+from src.utils.file_store import JSONListStore
+
 class SlackNotifier:
     def __init__(self, log_path="slack_logs.json"):
         self.log_path = log_path
@@ -11,9 +12,7 @@ class SlackNotifier:
         self.client = WebClient(token=self.token) if self.token else None
         self.logger = None
         
-        if not os.path.exists(self.log_path):
-            with open(self.log_path, "w") as f:
-                json.dump([], f)
+        self._store = JSONListStore(self.log_path, indent=2)
 
     def attach_logger(self, logger):
         self.logger = logger
@@ -55,14 +54,7 @@ class SlackNotifier:
         }
 
         try:
-            with open(self.log_path, "r+") as f:
-                try:
-                    logs = json.load(f)
-                except json.JSONDecodeError:
-                    logs = []
-                logs.append(log_entry)
-                f.seek(0)
-                json.dump(logs, f, indent=2)
+            self._store.append(log_entry)
         except Exception as e:
             print(f"Error writing slack logs: {e}")
             
@@ -1,8 +1,9 @@
-import json
 import os
 import requests
 from datetime import datetime
 
+from src.utils.file_store import JSONListStore
+
 class TaskManager:
     def __init__(self, task_file="tasks.json"):
         self.task_file = task_file
@@ -14,9 +15,7 @@ class TaskManager:
         self.board_id = os.environ.get("TRELLO_BOARD_ID")
         self.list_id = os.environ.get("TRELLO_LIST_ID")
 
-        if not os.path.exists(self.task_file):
-            with open(self.task_file, "w") as f:
-                json.dump([], f)
+        self._store = JSONListStore(self.task_file, indent=2)
 
     def attach_logger(self, logger):
         self.logger = logger
@@ -55,16 +54,9 @@ class TaskManager:
             "timestamp": datetime.utcnow().isoformat()
         }
 
-        # Write to file
+        # Write to file (locked append, safe with several processes)
         try:
-            with open(self.task_file, "r+") as f:
-                try:
-                    tasks = json.load(f)
-                except json.JSONDecodeError:
-                    tasks = []
-                tasks.append(new_task)
-                f.seek(0)
-                json.dump(tasks, f, indent=2)
+            self._store.append(new_task)
         except Exception as e:
             print(f"Error writing task logs: {e}")
 
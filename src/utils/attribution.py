@@ -0,0 +1,104 @@
+"""
+Contribution analysis for KPI changes.
+
+The latest period of a KPI is compared with its pooled baseline (earlier
+periods in the window) and the change is split across the segments of a
+dimension so that the contributions add up exactly to the total delta:
+
+    count       delta = sum_s (c1_s - c0_s)                 c0 = baseline mean per period
+    rate/mean   delta = sum_s [w1_s (r1_s - r0_s)           rate effect
+                               + (w1_s - w0_s)(r0_s - R0)]  mix effect
+
+where w is a segment's share of rows, r its rate and R0 the baseline rate.
+Segments only present on one side fall back to R0, which keeps the identity.
+All segments of a dimension are handled with one bincount and array ops.
+"""
+
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.utils.segments import SEGMENT_KPIS, SegmentKPI, segment_sums
+
+
+def _window(df: pd.DataFrame, time_column: str, lookback_days: Optional[int]) -> pd.DataFrame:
+    times = pd.to_datetime(df[time_column])
+    if not lookback_days or times.empty:
+        return df.assign(**{time_column: times})
+    start = times.max().normalize() - pd.Timedelta(days=lookback_days - 1)
+    keep = (times >= start).to_numpy()
+    return df[keep].assign(**{time_column: times[keep]})
+
+
+def decompose(df: pd.DataFrame, spec: SegmentKPI, dimension: str, freq: str = 'D') -> Optional[Dict]:
+    """
+    Per-segment contribution to the latest period's change against the
+    baseline. Returns None when there is no baseline period.
+    """
+    num, den, labels, _ = segment_sums(df, spec, dimension, freq)
+    if num.shape[1] < 2:
+        return None
+    base_num, base_den = num[:, :-1].sum(axis=1), den[:, :-1].sum(axis=1)
+    last_num, last_den = num[:, -1], den[:, -1]
+
+    if spec.kind == "count":
+        baseline = base_den / (num.shape[1] - 1)
+        contribution = last_den - baseline
+        return {'labels': labels, 'contribution': contribution, 'delta': float(contribution.sum()),
+                'baseline': baseline, 'latest': last_den, 'rows': last_den}
+
+    total0, total1 = base_den.sum(), last_den.sum()
+    if not total0 or not total1:
+        return None
+    overall0 = base_num.sum() / total0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rate0 = np.where(base_den > 0, base_num / base_den, overall0)
+        rate1 = np.where(last_den > 0, last_num / last_den, rate0)
+    w0, w1 = base_den / total0, last_den / total1
+    contribution = w1 * (rate1 - rate0) + (w1 - w0) * (rate0 - overall0)
+    delta = last_num.sum() / total1 - overall0
+    return {'labels': labels, 'contribution': contribution, 'delta': float(delta),
+            'baseline': rate0, 'latest': rate1, 'rows': last_den}
+
+
+def rank_drivers(datasets: Dict[str, pd.DataFrame], kpis, specs=SEGMENT_KPIS, top_k: int = 3,
+                 lookback_days: Optional[int] = 14, freq: str = 'D') -> List[Dict]:
+    """
+    For each KPI in `kpis`, the top_k segments (across all of its dimensions)
+    that explain the largest share of the latest change. share is the
+    fraction of the total delta a segment accounts for, in its direction.
+    """
+    kpis = set(kpis)
+    drivers = []
+    for spec in specs:
+        df = datasets.get(spec.dataset)
+        if spec.name not in kpis or df is None or df.empty:
+            continue
+        df = _window(df, spec.time_column, lookback_days)
+        found = []
+        for dim in spec.dimensions:
+            if dim not in df.columns:
+                continue
+            result = decompose(df, spec, dim, freq)
+            if result is None or result['delta'] == 0:
+                continue
+            share = result['contribution'] / result['delta']
+            hits = np.flatnonzero(share > 0)
+            if len(hits) > top_k:
+                hits = hits[np.argpartition(-share[hits], top_k)[:top_k]]
+            for idx in hits:
+                found.append({
+                    'kpi': spec.name,
+                    'dimension': dim,
+                    'segment': str(result['labels'][idx]),
+                    'share': float(share[idx]),
+                    'contribution': float(result['contribution'][idx]),
+                    'delta': result['delta'],
+                    'baseline': float(result['baseline'][idx]),
+                    'latest': float(result['latest'][idx]),
+                    'rows': int(result['rows'][idx]),
+                })
+        found.sort(key=lambda d: d['share'], reverse=True)
+        drivers.extend(found[:top_k])
+    return drivers
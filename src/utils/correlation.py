@@ -0,0 +1,114 @@
+"""
+Lagged cross-KPI correlation from sufficient statistics.
+
+For every lag and every ordered pair (i, j) we keep the six sums needed for
+Pearson's r between x_i[t] and x_j[t - lag] over the periods where both are
+present: n, sum x, sum y, sum x^2, sum y^2 and sum xy. Each sum for all pairs
+is a single matrix product over a (periods x series) block, so appending new
+days costs six matmuls per lag and the full matrix never needs the history.
+The lead side can be restricted to a few target series, which keeps the
+sums at targets x series instead of series x series.
+"""
+
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from src.utils.kpis import FRACTION_KPIS, period_sums
+from src.utils.segments import SEGMENT_KPIS, segment_sums
+
+STATS = ('n', 'sx', 'sy', 'sxx', 'syy', 'sxy')
+
+
+def lagged_moments(block: np.ndarray, history: np.ndarray, max_lag: int,
+                   targets: Optional[Sequence[int]] = None) -> Dict[str, np.ndarray]:
+    """
+    Sums over the rows of `block` (new periods x series, NaN = missing)
+    paired with the rows `lag` periods earlier, taken from `history` (the
+    max_lag periods preceding the block, NaN-padded) or the block itself.
+    Each stat has shape (max_lag + 1, targets, series); [lag, i, j] pairs
+    x_targets[i][t] with x_j[t - lag]. targets=None uses every series.
+    """
+    full = np.vstack([history, block])
+    mask = ~np.isnan(full)
+    values = np.where(mask, full, 0.0)
+    m, x = mask.astype(float), values
+    xx = x * x
+    rows = len(block)
+    cols = np.arange(full.shape[1]) if targets is None else np.asarray(targets, dtype=int)
+    out = {k: np.zeros((max_lag + 1, len(cols), full.shape[1])) for k in STATS}
+    lead = slice(max_lag, max_lag + rows)
+    m_lead, x_lead, xx_lead = m[lead][:, cols], x[lead][:, cols], xx[lead][:, cols]
+    for lag in range(max_lag + 1):
+        lagged = slice(max_lag - lag, max_lag - lag + rows)
+        out['n'][lag] = m_lead.T @ m[lagged]
+        out['sx'][lag] = x_lead.T @ m[lagged]
+        out['sy'][lag] = m_lead.T @ x[lagged]
+        out['sxx'][lag] = xx_lead.T @ m[lagged]
+        out['syy'][lag] = m_lead.T @ xx[lagged]
+        out['sxy'][lag] = x_lead.T @ x[lagged]
+    return out
+
+
+def correlation_from_moments(stats: Dict[str, np.ndarray], min_periods: int = 7) -> np.ndarray:
+    """Pearson r per [lag, i, j]; NaN for fewer than min_periods pairs or a constant side."""
+    n = stats['n']
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = stats['sxy'] - stats['sx'] * stats['sy'] / n
+        var_x = stats['sxx'] - stats['sx'] ** 2 / n
+        var_y = stats['syy'] - stats['sy'] ** 2 / n
+        r = cov / np.sqrt(var_x * var_y)
+    r[(n < min_periods) | (var_x <= 1e-12) | (var_y <= 1e-12)] = np.nan
+    return np.clip(r, -1.0, 1.0)
+
+
+def kpi_frame(datasets: Dict[str, pd.DataFrame], specs=SEGMENT_KPIS, max_segments: Optional[int] = 20,
+              freq: str = 'D') -> pd.DataFrame:
+    """
+    One column per daily KPI series: the headline KPIs plus, per dimension of
+    `specs`, the max_segments busiest segments (named "kpi|dimension=segment").
+    Rows are every period in the covered range; counts are 0 and rates/means
+    NaN for periods without rows.
+    """
+    columns = {}
+    for kpi in FRACTION_KPIS.values():
+        df = datasets.get(kpi.dataset)
+        if df is not None and not df.empty and kpi.column in df.columns:
+            sums = period_sums(df[kpi.time_column], kpi.mask(df), freq)
+            columns[kpi.name] = sums['num'] / sums['den']
+    for spec in specs:
+        df = datasets.get(spec.dataset)
+        if df is None or df.empty:
+            continue
+        if spec.name not in columns:
+            values = None
+            if spec.kind != 'count':
+                values = (df[spec.value_column].eq(spec.match).to_numpy(dtype=float, na_value=0.0)
+                          if spec.kind == 'rate' else df[spec.value_column].to_numpy(dtype=float))
+            sums = period_sums(df[spec.time_column], values, freq)
+            columns[spec.name] = sums['num'] if spec.kind == 'count' else sums['num'] / sums['den']
+        for dim in spec.dimensions:
+            if dim not in df.columns:
+                continue
+            num, den, labels, starts = segment_sums(df, spec, dim, freq)
+            busiest = np.argsort(-den.sum(axis=1), kind='stable')[:max_segments]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                values = den if spec.kind == 'count' else np.where(den > 0, num / den, np.nan)
+            index = pd.DatetimeIndex(starts)
+            for idx in busiest:
+                columns[f"{spec.name}|{dim}={labels[idx]}"] = pd.Series(values[idx], index=index)
+
+    if not columns:
+        return pd.DataFrame()
+    frame = pd.DataFrame(columns)
+    frame.index = pd.DatetimeIndex(frame.index)
+    frame = frame.reindex(pd.date_range(frame.index.min(), frame.index.max(), freq=freq))
+    counts = [c for c in frame.columns if _kind(c, specs) == 'count']
+    frame[counts] = frame[counts].fillna(0.0)
+    return frame
+
+
+def _kind(column: str, specs) -> str:
+    name = column.split('|', 1)[0]
+    return next((s.kind for s in specs if s.name == name), 'rate')
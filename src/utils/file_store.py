@@ -0,0 +1,159 @@
+"""
+Multi-process-safe JSON files.
+
+Several supervisor processes, the API and the CLI can write the same JSON
+files (memory.json, tasks.json, slack_logs.json, the sessions log). Writers
+serialize on an advisory lock held on a "<path>.lock" sidecar (flock on
+POSIX, msvcrt on Windows) and replace the file atomically, so readers never
+need the lock and never see a half-written file. The sidecar also holds a
+version number bumped by every write, which read_versioned()/write() use for
+optimistic concurrency when a caller wants to read, think, then write
+without holding the lock.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, List, Optional, Tuple
+
+from src.utils.logger import logger
+from src.utils.serialization import dumps, loads
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class ConcurrentModificationError(RuntimeError):
+    """The file changed between read_versioned() and write()."""
+
+
+_held = threading.local()
+
+
+@contextmanager
+def file_lock(path: str, shared: bool = False, blocking: bool = True):
+    """
+    Advisory lock on f"{path}.lock" for the duration of the block; yields
+    the open lock file. Re-entrant within a thread (an inner call reuses the
+    outer lock); other threads and processes wait. Raises BlockingIOError
+    when blocking is False and someone else holds the lock.
+    """
+    lock_path = os.path.abspath(f"{path}.lock")
+    held = getattr(_held, 'locks', None)
+    if held is None:
+        held = _held.locks = {}
+    if lock_path in held:
+        yield held[lock_path]
+        return
+
+    os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+    f = open(lock_path, 'a+')
+    try:
+        if fcntl is not None:
+            mode = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+            fcntl.flock(f.fileno(), mode if blocking else mode | fcntl.LOCK_NB)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+    except BaseException:
+        f.close()
+        raise
+    held[lock_path] = f
+    try:
+        yield f
+    finally:
+        del held[lock_path]
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        f.close()
+
+
+def atomic_write_json(path: str, data: Any, indent: Optional[int] = None):
+    dirn = os.path.dirname(os.path.abspath(path))
+    with tempfile.NamedTemporaryFile('w', delete=False, dir=dirn, encoding='utf8') as tf:
+        tf.write(dumps(data, indent))
+        tmpname = tf.name
+    os.replace(tmpname, path)
+
+
+class JSONListStore:
+    """A JSON array on disk that any number of processes append to and update."""
+
+    def __init__(self, path: str, indent: Optional[int] = None):
+        self.path = path
+        self.indent = indent
+        if not os.path.exists(path):
+            with file_lock(path):
+                if not os.path.exists(path):
+                    atomic_write_json(path, [], indent)
+
+    def read(self) -> List[Any]:
+        try:
+            with open(self.path, 'rb') as f:
+                return loads(f.read())
+        except FileNotFoundError:
+            return []
+
+    @staticmethod
+    def _version(lock) -> int:
+        lock.seek(0)
+        text = lock.read().strip()
+        return int(text) if text else 0
+
+    @staticmethod
+    def _bump(lock, version: int):
+        lock.seek(0)
+        lock.truncate()
+        lock.write(str(version + 1))
+        lock.flush()
+
+    def update(self, fn: Callable[[List[Any]], Any]) -> Any:
+        """
+        Runs fn(items) under the exclusive lock on the current contents and
+        writes the (mutated) list back; returns fn's result.
+        """
+        with file_lock(self.path) as lock:
+            try:
+                items = self.read()
+            except json.JSONDecodeError:
+                backup = f"{self.path}.corrupt.{datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')}"
+                shutil.copy(self.path, backup)
+                logger.warning(f"JSONListStore: {self.path} was corrupted; backed up to {backup}. Resetting.")
+                items = []
+            result = fn(items)
+            atomic_write_json(self.path, items, self.indent)
+            self._bump(lock, self._version(lock))
+        return result
+
+    def append(self, item: Any) -> Any:
+        self.update(lambda items: items.append(item))
+        return item
+
+    def read_versioned(self) -> Tuple[List[Any], int]:
+        with file_lock(self.path, shared=True) as lock:
+            return self.read(), self._version(lock)
+
+    def write(self, items: List[Any], expected_version: int) -> int:
+        """
+        Replaces the contents if nobody wrote since read_versioned()
+        returned expected_version; returns the new version, otherwise raises
+        ConcurrentModificationError (re-read and retry).
+        """
+        with file_lock(self.path) as lock:
+            version = self._version(lock)
+            if version != expected_version:
+                raise ConcurrentModificationError(
+                    f"{self.path} is at version {version}, expected {expected_version}")
+            atomic_write_json(self.path, items, self.indent)
+            self._bump(lock, version)
+        return version + 1
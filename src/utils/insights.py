@@ -0,0 +1,176 @@
+"""
+Typed insight records passed between pipeline stages.
+
+AnalyticsAgent produces an Insights object and RootCauseAgent, the LLM
+prompt, reports and MemoryBank all consume it. Fields are slotted and hold
+plain Python numbers (NumPy scalars are converted on construction). to_dict()
+produces the nested layout of src/schema/insights.json. Read-only dict-style
+access (insights["summary"], sales["avg_rate"]) is kept for existing callers.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Insights section -> (KPI name, kind); kind picks the legacy key names
+SECTIONS = {
+    'sales': ('sales_conversion', 'rate'),
+    'marketing': ('marketing_conversion', 'rate'),
+    'support': ('support_volume', 'count'),
+}
+
+_LEGACY_KEYS = {
+    'rate': {'latest_rate': 'latest', 'avg_rate': 'average'},
+    'count': {'latest_count': 'latest', 'avg_count': 'average'},
+}
+
+# Optional sections, present only when the producing stage is enabled
+EXTRAS = ('segments', 'support_mttr', 'emerging_issues')
+
+
+@dataclass(slots=True)
+class KPIInsight:
+    kpi: str
+    kind: str
+    latest: float
+    average: float
+    pct_change: float
+    z_score: float
+    anomaly: bool
+
+    def __post_init__(self):
+        self.latest = float(self.latest)
+        self.average = float(self.average)
+        self.pct_change = float(self.pct_change)
+        self.z_score = float(self.z_score)
+        self.anomaly = bool(self.anomaly)
+
+    def _key(self, key: str) -> str:
+        return _LEGACY_KEYS[self.kind].get(key, key)
+
+    def __getitem__(self, key: str):
+        try:
+            return getattr(self, self._key(key))
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def to_dict(self) -> Dict[str, Any]:
+        latest, average = _LEGACY_KEYS[self.kind]
+        return {
+            latest: int(self.latest) if self.kind == 'count' else self.latest,
+            average: self.average,
+            'pct_change': self.pct_change,
+            'z_score': self.z_score,
+            'anomaly': self.anomaly,
+        }
+
+    @classmethod
+    def from_dict(cls, section: str, data: Dict[str, Any]) -> 'KPIInsight':
+        kpi, kind = SECTIONS[section]
+        latest, average = _LEGACY_KEYS[kind]
+        return cls(kpi, kind, data.get(latest, 0.0), data.get(average, 0.0), data.get('pct_change', 0.0),
+                   data.get('z_score', 0.0), data.get('anomaly', False))
+
+
+@dataclass(slots=True)
+class Insights:
+    sales: KPIInsight
+    marketing: KPIInsight
+    support: KPIInsight
+    summary: str
+    segments: Optional[List[Dict]] = None
+    support_mttr: Optional[Dict] = None
+    emerging_issues: Optional[List[Dict]] = None
+
+    def kpis(self) -> Iterator[Tuple[str, KPIInsight]]:
+        for section in SECTIONS:
+            yield section, getattr(self, section)
+
+    def anomalies(self) -> List[KPIInsight]:
+        return [k for _, k in self.kpis() if k.anomaly]
+
+    # Conditions the root-cause rules are written against
+    @property
+    def sales_conversion_change(self) -> float:
+        # gated like its siblings: ordinary noise in pct_change is not a drop
+        return self.sales.pct_change if self.sales.anomaly else 0.0
+
+    @property
+    def marketing_drop(self) -> bool:
+        return self.marketing.anomaly and self.marketing.z_score < 0
+
+    @property
+    def support_spike(self) -> bool:
+        return self.support.anomaly and self.support.z_score > 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        out = {section: k.to_dict() for section, k in self.kpis()}
+        out['summary'] = self.summary
+        for name in EXTRAS:
+            value = getattr(self, name)
+            if value is not None:
+                out[name] = value
+        return out
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Insights':
+        """
+        Accepts the nested layout, or the flat legacy keys
+        (sales_conversion_change, marketing_drop, support_spike).
+        """
+        if all(section in data for section in SECTIONS):
+            sections = {s: KPIInsight.from_dict(s, data[s]) for s in SECTIONS}
+        else:
+            marketing_drop = bool(data.get('marketing_drop', False))
+            support_spike = bool(data.get('support_spike', False))
+            sales_change = data.get('sales_conversion_change') or 0.0
+            sections = {
+                'sales': KPIInsight('sales_conversion', 'rate', 0.0, 0.0,
+                                    sales_change, 0.0, bool(sales_change)),
+                'marketing': KPIInsight('marketing_conversion', 'rate', 0.0, 0.0,
+                                        data.get('marketing_pct_change') or 0.0,
+                                        -1.0 if marketing_drop else 0.0, marketing_drop),
+                'support': KPIInsight('support_volume', 'count', 0.0, 0.0,
+                                      data.get('support_increase_pct') or 0.0,
+                                      1.0 if support_spike else 0.0, support_spike),
+            }
+        return cls(summary=data.get('summary', ''), **sections, **{n: data.get(n) for n in EXTRAS})
+
+    @classmethod
+    def coerce(cls, insights) -> 'Insights':
+        return insights if isinstance(insights, cls) else cls.from_dict(insights or {})
+
+    # Read-only mapping access for callers written against the dict form
+    def __getitem__(self, key: str):
+        if key in SECTIONS or key == 'summary' or (key in EXTRAS and getattr(self, key) is not None):
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __contains__(self, key: str) -> bool:
+        try:
+            self[key]
+            return True
+        except KeyError:
+            return False
+
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        return self.to_dict().keys()
+
+    def items(self):
+        return self.to_dict().items()
+
+
+def as_dict(insights) -> Dict[str, Any]:
+    """Plain (JSON-ready) dict for an Insights object or an insights dict."""
+    return insights.to_dict() if hasattr(insights, 'to_dict') else dict(insights or {})
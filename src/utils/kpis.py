@@ -0,0 +1,75 @@
+"""
+Vectorized per-period KPI aggregation.
+
+Timestamps are mapped to integer bucket codes with plain int64 arithmetic and
+aggregated with np.bincount, so no Python code runs per period or per row.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass(frozen=True)
+class FractionKPI:
+    """Share of rows per period whose `column` is one of `matches`."""
+    name: str
+    dataset: str
+    time_column: str
+    column: str
+    matches: Tuple
+
+    def mask(self, df: pd.DataFrame) -> np.ndarray:
+        col = df[self.column]
+        if len(self.matches) == 1:
+            return col.eq(self.matches[0]).to_numpy(dtype=bool, na_value=False)
+        return col.isin(self.matches).to_numpy(dtype=bool)
+
+
+# Declared "fraction of rows matching a predicate" KPIs; RollupStore
+# materializes every entry.
+FRACTION_KPIS: Dict[str, FractionKPI] = {
+    'sales_conversion': FractionKPI('sales_conversion', 'sales', 'date', 'stage', ('SQL',)),
+    'support_escalation_rate': FractionKPI('support_escalation_rate', 'support', 'created_at', 'escalated', (True,)),
+}
+
+
+def period_codes(times: pd.Series, freq: str = 'D') -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Bucket codes (0..n-1, in time order) for each timestamp plus the bucket
+    start times. freq must be a fixed width ("D", "h", "5min", ...).
+    """
+    step = pd.tseries.frequencies.to_offset(freq).nanos
+    ns = pd.to_datetime(times).to_numpy(dtype='datetime64[ns]').view('int64')
+    buckets = ns // step
+    if not len(buckets):
+        return buckets, np.array([], dtype='datetime64[ns]')
+    first, last = buckets.min(), buckets.max()
+    if last - first > 4 * len(buckets) + 1024:
+        # Sparse buckets (e.g. a stray far-off timestamp): don't allocate the full span
+        uniques, codes = np.unique(buckets, return_inverse=True)
+        return codes, (uniques * step).astype('datetime64[ns]')
+    return buckets - first, ((first + np.arange(last - first + 1)) * step).astype('datetime64[ns]')
+
+
+def period_sums(times: pd.Series, values=None, freq: str = 'D') -> pd.DataFrame:
+    """
+    Per-period sum of `values` ("num") and row count ("den"), indexed by
+    bucket start. values=None counts rows; only non-empty periods are returned.
+    """
+    codes, starts = period_codes(times, freq)
+    den = np.bincount(codes, minlength=len(starts))
+    if values is None:
+        num = den.astype(float)
+    else:
+        num = np.bincount(codes, weights=np.asarray(values, dtype=float), minlength=len(starts))
+    present = den > 0
+    return pd.DataFrame({'num': num[present], 'den': den[present]}, index=pd.DatetimeIndex(starts[present]))
+
+
+def fraction_per_period(df: pd.DataFrame, kpi: FractionKPI, freq: str = 'D') -> pd.Series:
+    """Matching-row share per non-empty period."""
+    sums = period_sums(df[kpi.time_column], kpi.mask(df), freq)
+    return (sums['num'] / sums['den']).rename(kpi.name)
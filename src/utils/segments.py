@@ -0,0 +1,131 @@
+"""
+Segment-level anomaly detection.
+
+Each (KPI, dimension) pair becomes a 2-D segments x periods matrix built with a
+single np.bincount over combined (segment, period) codes, and every segment's
+latest period is z-scored in one vectorized pass.
+"""
+
+import warnings
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.utils.kpis import period_codes
+
+
+@dataclass(frozen=True)
+class SegmentKPI:
+    """
+    kind: "count" (rows per period), "rate" (share of rows where
+    value_column == match) or "mean" (average of value_column).
+    """
+    name: str
+    dataset: str
+    time_column: str
+    dimensions: Tuple[str, ...]
+    kind: str = "count"
+    value_column: Optional[str] = None
+    match: object = None
+
+
+SEGMENT_KPIS = (
+    SegmentKPI('sales_conversion', 'sales', 'date', ('source', 'owner', 'region'), 'rate', 'stage', 'SQL'),
+    SegmentKPI('support_volume', 'support', 'created_at', ('issue_type', 'priority'), 'count'),
+    SegmentKPI('marketing_conversion', 'marketing', 'date', ('campaign', 'channel'), 'mean', 'conversion_rate'),
+)
+
+
+def _segment_codes(values: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.codes.to_numpy(), np.asarray(values.cat.categories)
+    codes, labels = pd.factorize(values)
+    return codes, np.asarray(labels)
+
+
+def segment_sums(df: pd.DataFrame, spec: SegmentKPI, dimension: str, freq: str = 'D'):
+    """
+    Returns (num[S, T], den[S, T], labels[S], period starts[T]): per segment
+    and period, the summed value (matching rows for rates, the value column
+    for means, rows for counts) and the row count.
+    """
+    seg, labels = _segment_codes(df[dimension])
+    per, starts = period_codes(df[spec.time_column], freq)
+    keep = seg >= 0  # missing segment labels
+    seg, per = seg[keep], per[keep]
+    n_seg, n_per = len(labels), len(starts)
+    flat = seg.astype(np.int64) * n_per + per
+
+    den = np.bincount(flat, minlength=n_seg * n_per).reshape(n_seg, n_per).astype(float)
+    if spec.kind == "count":
+        return den, den, labels, starts
+    if spec.kind == "rate":
+        weights = df[spec.value_column].eq(spec.match).to_numpy(dtype=float, na_value=0.0)[keep]
+    else:
+        weights = df[spec.value_column].to_numpy(dtype=float)[keep]
+    num = np.bincount(flat, weights=weights, minlength=n_seg * n_per).reshape(n_seg, n_per)
+    return num, den, labels, starts
+
+
+def segment_matrix(df: pd.DataFrame, spec: SegmentKPI, dimension: str, freq: str = 'D'):
+    """
+    Returns (values[S, T], labels[S], period starts[T]). Periods with no rows
+    are 0 for counts and NaN for rates/means.
+    """
+    num, den, labels, starts = segment_sums(df, spec, dimension, freq)
+    if spec.kind == "count":
+        return den, labels, starts
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(den > 0, num / den, np.nan), labels, starts
+
+
+def latest_zscores(values: np.ndarray, min_periods: int = 5) -> np.ndarray:
+    """
+    z-score of each row's last column against that row's history (population
+    std, latest included, as scipy.stats.zscore does). Rows with fewer than
+    min_periods observations, or a missing latest value, score NaN.
+    """
+    observed = np.sum(~np.isnan(values), axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN segments
+        mean = np.nanmean(values, axis=1)
+        std = np.nanstd(values, axis=1)
+        z = (values[:, -1] - mean) / std
+    z = np.where(std == 0, 0.0, z)
+    z[(observed < min_periods) | np.isnan(values[:, -1])] = np.nan
+    return z
+
+
+def detect_segment_anomalies(datasets: Dict[str, pd.DataFrame], specs=SEGMENT_KPIS, top_k: int = 10,
+                             threshold: float = 2.5, min_periods: int = 5, freq: str = 'D') -> List[Dict]:
+    """Top-k segments by |z| across all KPIs and dimensions, above threshold."""
+    scored = []
+    for spec in specs:
+        df = datasets.get(spec.dataset)
+        if df is None or df.empty:
+            continue
+        for dim in spec.dimensions:
+            if dim not in df.columns:
+                continue
+            values, labels, starts = segment_matrix(df, spec, dim, freq)
+            if values.shape[1] < min_periods:
+                continue
+            z = latest_zscores(values, min_periods)
+            hits = np.flatnonzero(np.abs(np.nan_to_num(z)) > threshold)
+            if len(hits) > top_k:
+                hits = hits[np.argpartition(-np.abs(z[hits]), top_k)[:top_k]]
+            baseline = np.nanmean(values[hits], axis=1) if len(hits) else []
+            for i, idx in enumerate(hits):
+                scored.append({
+                    'kpi': spec.name,
+                    'dimension': dim,
+                    'segment': str(labels[idx]),
+                    'latest': float(values[idx, -1]),
+                    'mean': float(baseline[i]),
+                    'z_score': float(z[idx]),
+                })
+
+    scored.sort(key=lambda r: abs(r['z_score']), reverse=True)
+    return scored[:top_k]
@@ -0,0 +1,142 @@
+"""
+Shared JSON encoding for the stores and logs.
+
+Event payloads carry NumPy scalars/arrays (detector output), pandas
+Timestamps, datetimes and Insights records. Instead of walking every payload
+in Python to coerce them, the encoder handles them in a `default` hook that
+only runs for values json cannot encode natively. orjson is used when
+installed (it serializes NumPy and datetimes itself); otherwise the stdlib
+encoder with the same hook. Both paths write NaN/inf as NaN/Infinity like
+the stdlib (and every memory.json written so far); orjson can only write
+null there, so payloads holding a non-finite float are re-encoded with the
+stdlib, and loads() falls back to the stdlib for input orjson rejects.
+"""
+
+import json
+import math
+from datetime import date, datetime, time
+from typing import Any, Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# dataclasses go through default() so records use their own to_dict() layout
+_ORJSON_OPTS = (orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATACLASS
+                if orjson is not None else 0)
+
+
+def default(obj: Any) -> Any:
+    """JSON-ready stand-in for a value the encoder does not know."""
+    if obj is pd.NaT:
+        return None
+    if hasattr(obj, 'to_dict') and not isinstance(obj, (pd.DataFrame, pd.Series)):
+        return obj.to_dict()  # Insights / KPIInsight records
+    if isinstance(obj, np.generic):
+        if isinstance(obj, np.datetime64):
+            return None if np.isnat(obj) else pd.Timestamp(obj).isoformat()
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, pd.Timedelta):
+        return obj.isoformat()
+    if isinstance(obj, pd.Series):
+        return obj.tolist()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _stdlib_dumps(obj: Any, indent: Optional[int] = None) -> str:
+    if indent:
+        return json.dumps(obj, default=default, indent=indent)
+    return json.dumps(obj, default=default, separators=(',', ':'))
+
+
+# Types that never hold a float; skipped without further checks
+_NO_FLOATS = frozenset((str, int, bool, type(None), np.int64, np.bool_, pd.Timestamp, datetime, date))
+
+
+def _has_nonfinite(obj: Any) -> bool:
+    """Whether a NaN/inf float is anywhere in obj (orjson would write it as null)."""
+    stack = [obj]
+    pop, extend = stack.pop, stack.extend
+    while stack:
+        o = pop()
+        t = type(o)
+        if t in _NO_FLOATS:
+            continue
+        # exact types first: this runs per value, on the hot write path
+        if t is dict:
+            extend(o.values())
+        elif t is float or t is np.float64:
+            if not math.isfinite(o):
+                return True
+        elif t is list or t is tuple:
+            extend(o)
+        elif isinstance(o, (float, np.floating)):
+            if not np.isfinite(o):
+                return True
+        elif isinstance(o, dict):
+            extend(o.values())
+        elif isinstance(o, (list, tuple, set, frozenset)):
+            extend(o)
+        elif isinstance(o, np.ndarray):
+            if o.dtype.kind in 'fc':
+                if not np.isfinite(o).all():
+                    return True
+            elif o.dtype.kind == 'O':
+                extend(o.ravel())
+        elif isinstance(o, pd.Series):
+            extend(o.tolist())
+        elif hasattr(o, 'to_dict') and not isinstance(o, pd.DataFrame):
+            stack.append(o.to_dict())
+    return False
+
+
+def _orjson_dumpb(obj: Any, indent: Optional[int] = None) -> bytes:
+    opts = _ORJSON_OPTS | (orjson.OPT_INDENT_2 if indent else 0)
+    data = orjson.dumps(obj, default=default, option=opts)
+    # Only a payload with nulls can hold a replaced NaN/inf; None fields alone
+    # keep the orjson output.
+    if b'null' in data and _has_nonfinite(obj):
+        # the stdlib writes NaN like every other path
+        try:
+            return _stdlib_dumps(obj, indent).encode('utf8')
+        except TypeError:  # keys only orjson accepts (e.g. NumPy ints)
+            pass
+    return data
+
+
+def dumps(obj: Any, indent: Optional[int] = None) -> str:
+    """Compact JSON (or indented, indent=2) for any payload the stores write."""
+    if orjson is not None:
+        return _orjson_dumpb(obj, indent).decode('utf8')
+    return _stdlib_dumps(obj, indent)
+
+
+def dumpb(obj: Any) -> bytes:
+    """dumps() as UTF-8 bytes, for binary log files."""
+    if orjson is not None:
+        return _orjson_dumpb(obj)
+    return dumps(obj).encode('utf8')
+
+
+def loads(data) -> Any:
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass  # NaN/Infinity, which orjson rejects; genuinely bad input raises below
+    return json.loads(data)
+
+
+def json_safe(obj: Any) -> Any:
+    """The payload as plain dicts/lists/str/numbers, i.e. exactly what reading it back yields."""
+    return loads(dumpb(obj))
@@ -0,0 +1,94 @@
+"""
+Mergeable quantile sketch (KLL).
+
+Values go into level 0; a full level is sorted and every other item (random
+offset) is promoted to the next level with twice the weight. Memory stays
+O(k log(n/k)) and the rank error is roughly 1.7/k, independent of n. Two
+sketches built on different shards merge into one covering both.
+"""
+
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+
+class KLLSketch:
+    def __init__(self, k: int = 200, seed: Optional[int] = None):
+        self.k = k
+        self.n = 0
+        self.total = 0.0  # sum of all values, for the exact mean
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self):
+        h = 0
+        while h < len(self.levels):
+            items = self.levels[h]
+            if len(items) > self._capacity(h):
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                keep = items[-1:] if len(items) % 2 else items[:0]
+                even = items[:len(items) - len(keep)]
+                promoted = even[self._rng.integers(2)::2]
+                self.levels[h] = keep
+                self.levels[h + 1] = np.concatenate([self.levels[h + 1], promoted])
+                h = 0 if h + 2 == len(self.levels) else h + 1  # a new level shrinks the lower capacities
+            else:
+                h += 1
+
+    def update(self, values: Iterable[float]) -> 'KLLSketch':
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[~np.isnan(values)]
+        if len(values):
+            self.levels[0] = np.concatenate([self.levels[0], values])
+            self.n += len(values)
+            self.total += float(values.sum())
+            self._compress()
+        return self
+
+    def merge(self, other: 'KLLSketch') -> 'KLLSketch':
+        """Folds `other` into this sketch (other is unchanged)."""
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for h, items in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], items])
+        self.n += other.n
+        self.total += other.total
+        self._compress()
+        return self
+
+    def quantiles(self, qs: Iterable[float]) -> np.ndarray:
+        """Approximate quantiles for each q in [0, 1]; NaN when empty."""
+        qs = np.asarray(list(qs), dtype=float)
+        if not self.n:
+            return np.full(len(qs), np.nan)
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(lvl), 2.0 ** h) for h, lvl in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        items, cum = items[order], np.cumsum(weights[order])
+        idx = np.searchsorted(cum, qs * cum[-1], side='left')
+        return items[np.minimum(idx, len(items) - 1)]
+
+    def quantile(self, q: float) -> float:
+        return float(self.quantiles([q])[0])
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.n if self.n else float('nan')
+
+    def to_dict(self) -> Dict:
+        return {'k': self.k, 'n': self.n, 'total': self.total,
+                'levels': [lvl.tolist() for lvl in self.levels]}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'KLLSketch':
+        sketch = cls(k=data['k'])
+        sketch.n = data['n']
+        sketch.total = data['total']
+        sketch.levels = [np.asarray(lvl, dtype=float) for lvl in data['levels']] or [np.empty(0)]
+        return sketch
@@ -0,0 +1,579 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+from scipy.stats import zscore
+
+from src.agents.action_executor_agent import ActionExecutorAgent
+from src.agents.analytics_agent import AnalyticsAgent
+from src.agents.decision_maker_agent import DecisionMakerAgent
+from src.config import Config
+from src.services.correlation_store import CorrelationStore
+from src.services.memory_bank import MemoryBank
+from src.services.online_detector import OnlineZDetector
+from src.services.resolution_tracker import ResolutionTimeTracker
+from src.services.subject_clusters import SubjectClusterer
+from src.services.rollup_store import RollupStore
+from src.utils.attribution import decompose, rank_drivers
+from src.utils.correlation import kpi_frame, lagged_moments
+from src.utils.detectors import DETECTORS, run_detectors
+from src.utils.insights import Insights, KPIInsight
+from src.utils.kpis import FRACTION_KPIS, fraction_per_period, period_sums
+from src.utils.segments import SEGMENT_KPIS, SegmentKPI, detect_segment_anomalies
+from src.utils.sketch import KLLSketch
+
+
+def json_roundtrip(obj):
+    return json.loads(json.dumps(obj))
+
+
+def make_sales(days: int, seed: int = 3) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    dates = pd.Timestamp("2025-11-01") + pd.to_timedelta(np.repeat(np.arange(days), 20), unit="D")
+    return pd.DataFrame({
+        "date": dates,
+        "lead_id": [f"LD{i}" for i in range(len(dates))],
+        "stage": rng.choice(["MQL", "SQL"], len(dates)),
+    })
+
+
+class TestVectorizedKPIs(unittest.TestCase):
+    def test_fraction_matches_groupby_apply(self):
+        sales = make_sales(30).sample(frac=1.0, random_state=1)
+        expected = sales.groupby(sales['date'].dt.date).apply(
+            lambda g: (g['stage'] == 'SQL').sum() / max(1, len(g)))
+        got = fraction_per_period(sales, FRACTION_KPIS['sales_conversion'])
+        np.testing.assert_allclose(got.values, expected.values.astype(float))
+
+    def test_sparse_periods_skip_empty_buckets(self):
+        times = pd.Series(pd.to_datetime(["1999-01-01 10:00", "2025-11-01 09:05", "2025-11-01 09:55"]))
+        sums = period_sums(times, freq='h')
+        self.assertEqual(list(sums['den']), [1, 2])
+
+
+class TestSegmentAnomalies(unittest.TestCase):
+    def test_collapsed_segment_is_ranked_first(self):
+        rng = np.random.default_rng(0)
+        n = 20000
+        leads = pd.DataFrame({
+            "date": pd.Timestamp("2025-11-01") + pd.to_timedelta(rng.integers(0, 14, n), unit="D"),
+            "source": rng.choice([f"s{i}" for i in range(20)], n),
+            "stage": np.where(rng.random(n) < 0.3, "SQL", "MQL"),
+        })
+        last_day = leads["date"] == leads["date"].max()
+        leads.loc[last_day & (leads["source"] == "s7"), "stage"] = "MQL"
+
+        spec = SegmentKPI("sales_conversion", "sales", "date", ("source",), "rate", "stage", "SQL")
+        top = detect_segment_anomalies({"sales": leads}, (spec,), top_k=3)
+        self.assertEqual(top[0]["segment"], "s7")
+        self.assertLess(top[0]["z_score"], -2.5)
+        self.assertEqual(top[0]["latest"], 0.0)
+
+
+class TestOnlineDetector(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "detector.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_streaming_score_matches_batch_zscore(self):
+        values = np.random.default_rng(2).normal(100, 15, 60)
+        days = [f"2025-11-{i:03d}" for i in range(60)]
+        for i in range(60):
+            detector = OnlineZDetector(self.path)  # state reloaded from disk each cycle
+            # the same day scored twice (partial, then final value) must not double count
+            detector.score("support_volume", days[i], values[i] * 0.5)
+            _, z = detector.score("support_volume", days[i], values[i])
+            detector.save()
+            if i >= 4:
+                self.assertAlmostEqual(z, zscore(values[:i + 1])[-1], places=9)
+
+    def test_periods_between_cycles_are_folded_in(self):
+        values = np.random.default_rng(5).normal(100, 15, 10)
+        values[-1] += 60
+        days = [f"2025-11-{i + 1:02d}" for i in range(10)]
+        detector = OnlineZDetector(self.path)
+        detector.score("support_volume", days[5], values[5], history=zip(days[:5], values[:5]))
+        # cycles for days 7-9 were skipped; the next one passes them as history
+        anomaly, z = detector.score("support_volume", days[9], values[9], history=zip(days[:9], values[:9]))
+        self.assertAlmostEqual(z, zscore(values)[-1], places=9)
+        self.assertEqual(anomaly, abs(zscore(values)[-1]) > 2.5)
+
+    @patch.object(Config, "DEMO_MODE", False)
+    def test_agent_seeds_from_history(self):
+        support = pd.DataFrame({"created_at": pd.Timestamp("2025-11-01") + pd.to_timedelta(
+            np.repeat(np.arange(10), [5, 6, 5, 4, 6, 5, 5, 6, 4, 30]), unit="D")})
+        batch = AnalyticsAgent(lookback_days=0)._support_spike(support.copy())
+        agent = AnalyticsAgent(lookback_days=0, online_detector=OnlineZDetector(self.path),
+                               online_kpis=["support_volume"])
+        online = agent._support_spike(support.copy())
+        self.assertAlmostEqual(batch["z_score"], online["z_score"])
+
+
+class TestDetectors(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(2)
+        weekly = 100 + 20 * np.sin(2 * np.pi * np.arange(35) / 7)
+        self.values = np.vstack([weekly + rng.normal(0, 2, 35) for _ in range(4)])
+        self.values[1, -1] += 200         # spike on the latest period
+        self.values[2, -5:] += 40         # sustained level shift
+        self.values[3, :31] = np.nan      # too short to score
+
+    def test_zscore_matches_scipy(self):
+        scores = run_detectors(self.values[:3], ["zscore"])["zscore"]["scores"]
+        expected = [zscore(row)[-1] for row in self.values[:3]]
+        np.testing.assert_allclose(scores, expected)
+
+    def test_detectors_flag_planted_anomalies(self):
+        results = run_detectors(self.values, DETECTORS)
+        for name in ("zscore", "robust_mad", "seasonal"):
+            r = results[name]
+            self.assertGreater(abs(r["scores"][1]), r["threshold"], name)
+            self.assertLess(abs(r["scores"][0]), r["threshold"], name)
+        self.assertGreater(results["cusum"]["scores"][2], results["cusum"]["threshold"])
+        for r in results.values():
+            self.assertTrue(np.isnan(r["scores"][3]))
+
+    def test_agent_uses_assigned_detector(self):
+        agent = AnalyticsAgent(detectors={"support_volume": "robust_mad"}, compare_detectors=True)
+        daily = pd.Series(self.values[1], index=pd.date_range("2025-01-01", periods=35))
+        anomaly, score = agent._score("support_volume", daily)
+        self.assertTrue(anomaly)
+        self.assertEqual(set(agent.last_detector_stats), set(DETECTORS))
+        self.assertAlmostEqual(score, agent.last_detector_stats["robust_mad"]["scores"]["support_volume"])
+        with self.assertRaises(ValueError):
+            AnalyticsAgent(detectors={"support_volume": "nope"})
+
+
+def make_support(hours: int, seed: int = 5) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    per_hour = rng.poisson(6, hours)
+    hour = np.repeat(np.arange(hours), per_hour)
+    minutes = rng.integers(0, 60, len(hour))
+    created = pd.Timestamp("2025-11-01") + pd.to_timedelta(hour * 60 + minutes, unit="min")
+    return pd.DataFrame({"ticket_id": np.arange(len(hour)), "created_at": created.sort_values()})
+
+
+class TestAnalyticsResolution(unittest.TestCase):
+    @patch.object(Config, "DEMO_MODE", False)
+    def test_hourly_resolution_catches_morning_spike(self):
+        support = make_support(24 * 6 + 10)
+        burst = pd.DataFrame({"ticket_id": -1, "created_at": [pd.Timestamp("2025-11-07 09:30")] * 60})
+        support = pd.concat([support, burst], ignore_index=True)
+
+        daily = AnalyticsAgent(lookback_days=7)._support_spike(support.copy())
+        hourly = AnalyticsAgent(lookback_days=7, resolution="hourly")._support_spike(support.copy())
+        self.assertFalse(daily["anomaly"])  # the partial day still looks quiet
+        self.assertTrue(hourly["anomaly"])
+        with self.assertRaises(ValueError):
+            AnalyticsAgent(resolution="weekly")
+
+
+def make_resolved(days: int, per_day: int = 200, seed: int = 8) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    created = pd.Timestamp("2025-11-01") + pd.to_timedelta(rng.uniform(0, days * 24, days * per_day), unit="h")
+    hours = rng.lognormal(1.5, 0.6, len(created))
+    df = pd.DataFrame({
+        "created_at": created,
+        "resolved_at": created + pd.to_timedelta(hours, unit="h"),
+        "priority": rng.choice(["low", "medium", "high"], len(created)),
+        "issue_type": rng.choice(["login", "billing"], len(created)),
+    })
+    return df.sort_values("resolved_at", ignore_index=True)
+
+
+class TestResolutionTime(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "sketches.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_sketch_quantiles_and_merge(self):
+        values = np.random.default_rng(0).lognormal(2, 1, 200_000)
+        whole = KLLSketch(seed=1).update(values)
+        shards = KLLSketch(seed=2).update(values[:70_000]).merge(KLLSketch(seed=3).update(values[70_000:]))
+        for sketch in (whole, shards):
+            self.assertEqual(sketch.n, len(values))
+            ranks = np.searchsorted(np.sort(values), sketch.quantiles([0.5, 0.95, 0.99])) / len(values)
+            np.testing.assert_allclose(ranks, [0.5, 0.95, 0.99], atol=0.01)
+        restored = KLLSketch.from_dict(json_roundtrip(whole.to_dict()))
+        np.testing.assert_allclose(restored.quantiles([0.5]), whole.quantiles([0.5]))
+
+    def test_incremental_updates_and_segments(self):
+        df = make_resolved(10)
+        first = ResolutionTimeTracker(self.path)
+        first.update(df.iloc[:900])
+        first.save()
+        tracker = ResolutionTimeTracker(self.path)
+        self.assertEqual(tracker.update(df), len(df) - 900)
+
+        summary = tracker.summary()
+        hours = (df["resolved_at"] - df["created_at"]).dt.total_seconds() / 3600
+        self.assertEqual(summary["count"], len(df))
+        self.assertAlmostEqual(summary["mttr"], hours.mean())
+        self.assertAlmostEqual(summary["p50"], hours.median(), delta=0.05 * hours.median())
+        high = next(r for r in tracker.segments() if r["dimension"] == "priority" and r["segment"] == "high")
+        self.assertEqual(high["count"], int((df["priority"] == "high").sum()))
+
+        other = ResolutionTimeTracker(None)
+        other.update(df.assign(resolved_at=df["resolved_at"] + pd.Timedelta(days=30)))
+        self.assertEqual(tracker.merge(other).summary()["count"], 2 * len(df))
+
+    def test_tickets_at_the_watermark_arriving_later_are_counted_once(self):
+        df = make_resolved(3).assign(ticket_id=lambda d: [f"T{i}" for i in range(len(d))])
+        df.loc[df.index[-4:], "resolved_at"] = df["resolved_at"].iloc[-1]  # resolved at the same instant
+        tracker = ResolutionTimeTracker(self.path)
+        self.assertEqual(tracker.update(df.iloc[:-2]), len(df) - 2)
+        tracker.save()
+
+        tracker = ResolutionTimeTracker(self.path)
+        self.assertEqual(tracker.update(df), 2)
+        self.assertEqual(tracker.update(df), 0)
+        self.assertEqual(tracker.summary()["count"], len(df))
+
+    def test_missing_resolved_at_is_ignored(self):
+        tracker = ResolutionTimeTracker(self.path)
+        self.assertEqual(tracker.update(make_support(24)), 0)
+        self.assertTrue(tracker.series("p95").empty)
+
+    @patch.object(Config, "DEMO_MODE", False)
+    def test_agent_flags_slow_resolution_day(self):
+        df = make_resolved(12)
+        df = df[df["resolved_at"] < pd.Timestamp("2025-11-13")].copy()
+        last_day = df["resolved_at"] >= pd.Timestamp("2025-11-12")
+        df.loc[last_day, "created_at"] -= pd.Timedelta(hours=40)  # resolved 40h slower
+        support = df.assign(ticket_id=np.arange(len(df)))
+        agent = AnalyticsAgent(lookback_days=10, resolution_tracker=ResolutionTimeTracker(self.path))
+        insights = agent.analyze({"sales": make_sales(10), "marketing": pd.DataFrame(
+            {"date": pd.date_range("2025-11-01", periods=10), "conversion_rate": 0.03}), "support": support})
+        self.assertTrue(insights["support_mttr"]["anomaly"])
+        self.assertIn("Support resolution time anomaly detected", insights["summary"])
+        self.assertTrue(os.path.exists(self.path))
+
+
+TOPICS = ["login failure on mobile", "password reset email missing", "checkout payment declined",
+          "invoice wrong amount", "app crashes on startup", "shipping delayed"]
+
+
+class TestSubjectClusters(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "clusters.pkl")
+        rng = np.random.default_rng(1)
+        n = 6000
+        created = pd.Timestamp("2025-11-01") + pd.to_timedelta(rng.uniform(0, 14 * 24, n), unit="h")
+        self.tickets = pd.DataFrame({"created_at": created,
+                                     "subject": rng.choice(TOPICS, n)}).sort_values("created_at", ignore_index=True)
+        refunds = pd.DataFrame({"created_at": pd.Timestamp("2025-11-14 09:00"), "subject": ["refund not processed"] * 200})
+        self.tickets = pd.concat([self.tickets, refunds], ignore_index=True)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_new_topic_is_flagged_across_incremental_batches(self):
+        cut = int(self.tickets["created_at"].searchsorted(pd.Timestamp("2025-11-10")))
+        first = SubjectClusterer(self.path, n_clusters=8, batch_size=500)
+        self.assertEqual(first.update(self.tickets.iloc[:cut]), cut)
+        first.save()
+
+        clusterer = SubjectClusterer(self.path, n_clusters=8, batch_size=500)
+        self.assertEqual(clusterer.update(self.tickets), len(self.tickets) - cut)
+        issues = clusterer.detect(lookback_days=14)
+        self.assertTrue(issues)
+        self.assertEqual(issues[0]["examples"][0], "refund not processed")
+        self.assertGreater(issues[0]["latest_share"], issues[0]["baseline_share"])
+
+    def test_tickets_at_the_watermark_arriving_later_are_clustered_once(self):
+        tickets = self.tickets[self.tickets["created_at"] <= pd.Timestamp("2025-11-14 09:00")]
+        tickets = tickets.assign(ticket_id=[f"T{i}" for i in range(len(tickets))])
+        burst = tickets.index[tickets["subject"] == "refund not processed"]  # the newest tickets, all at 09:00
+        clusterer = SubjectClusterer(self.path, n_clusters=8, batch_size=500)
+        self.assertEqual(clusterer.update(tickets.drop(burst[100:])), len(tickets) - 100)
+        clusterer.save()
+
+        clusterer = SubjectClusterer(self.path, n_clusters=8, batch_size=500)
+        self.assertEqual(clusterer.update(tickets), 100)
+        self.assertEqual(clusterer.update(tickets), 0)
+        self.assertEqual(int(clusterer._load()["counts"]["2025-11-14"].sum()),
+                         int((tickets["created_at"].dt.strftime("%Y-%m-%d") == "2025-11-14").sum()))
+
+    def test_waits_for_enough_tickets(self):
+        clusterer = SubjectClusterer(None, n_clusters=8)
+        self.assertEqual(clusterer.update(self.tickets.iloc[:5]), 0)
+        self.assertEqual(clusterer.detect(), [])
+
+
+class TestAttribution(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(6)
+        n = 8000
+        self.sales = pd.DataFrame({
+            "date": pd.Timestamp("2025-11-01") + pd.to_timedelta(rng.integers(0, 10, n), unit="D"),
+            "source": rng.choice([f"src{i}" for i in range(300)], n),
+            "owner": rng.choice(["Amit", "Reena", "Ravi"], n),
+            "stage": rng.choice(["MQL", "SQL"], n),
+        })
+        # a burst of src7 leads that do not convert on the last day
+        burst = pd.DataFrame({"date": self.sales["date"].max(), "source": "src7",
+                              "owner": rng.choice(["Amit", "Reena", "Ravi"], 150), "stage": "MQL"})
+        self.sales = pd.concat([self.sales, burst], ignore_index=True)
+
+    def test_contributions_sum_to_delta(self):
+        spec = next(s for s in SEGMENT_KPIS if s.name == "sales_conversion")
+        for dim in ("source", "owner"):
+            result = decompose(self.sales, spec, dim)
+            last = self.sales["date"] == self.sales["date"].max()
+            sql = self.sales["stage"].eq("SQL")
+            self.assertAlmostEqual(result["delta"], sql[last].mean() - sql[~last].mean())
+            self.assertAlmostEqual(result["contribution"].sum(), result["delta"])
+
+        support = make_support(24 * 8).assign(priority=lambda d: np.where(d.index % 3 == 0, "high", "low"))
+        spec = next(s for s in SEGMENT_KPIS if s.name == "support_volume")
+        result = decompose(support, spec, "priority")
+        self.assertAlmostEqual(result["contribution"].sum(), result["delta"])
+
+    def test_driver_segment_ranked_first(self):
+        drivers = rank_drivers({"sales": self.sales}, ["sales_conversion"], top_k=3)
+        self.assertEqual((drivers[0]["dimension"], drivers[0]["segment"]), ("source", "src7"))
+        self.assertGreater(drivers[0]["share"], 0.5)
+        self.assertEqual(rank_drivers({"sales": self.sales}, ["support_volume"]), [])
+
+
+class RecordingTasks:
+    def __init__(self):
+        self.tasks = []
+
+    def create_task(self, title, body, assignee="unassigned", trace_id=None):
+        task = {"id": f"TASK-{len(self.tasks)}", "title": title, "body": body, "assignee": assignee}
+        self.tasks.append(task)
+        return task
+
+
+class TestPlanExecution(unittest.TestCase):
+    def execute(self, reasons):
+        tasks = RecordingTasks()
+        plan = DecisionMakerAgent().make_plan(reasons)
+        return ActionExecutorAgent(task_manager=tasks).execute(plan, trace_id="t1"), tasks.tasks
+
+    def test_segment_drop_becomes_pipeline_review_task(self):
+        detail = "source=src7 explains 80% of the sales_conversion change (0.5 -> 0.2)"
+        results, tasks = self.execute([{"reason": "sales_segment_drop", "confidence": 0.8, "detail": detail}])
+        self.assertEqual([r["status"] for r in results], ["task_created"])
+        self.assertEqual((tasks[0]["title"], tasks[0]["assignee"]), ("Action: review_pipeline", "sales_lead"))
+        self.assertIn(detail, tasks[0]["body"])
+
+    def test_correlated_driver_becomes_investigation_task(self):
+        detail = "marketing_conversion leads sales_conversion by 2d (r=0.91, z=-3.2)"
+        results, tasks = self.execute([{"reason": "correlated_kpi_driver", "confidence": 0.7, "detail": detail},
+                                       {"reason": "sales_segment_drop", "confidence": 0.5}])
+        self.assertEqual([r["status"] for r in results], ["task_created", "task_created"])
+        self.assertEqual([t["title"] for t in tasks], ["Action: investigate_driver", "Action: review_pipeline"])
+        self.assertEqual(tasks[0]["assignee"], "ops_lead")
+        self.assertIn(detail, tasks[0]["body"])
+
+
+class TestCorrelationStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "corr.npz")
+        rng = np.random.default_rng(0)
+        lead = rng.normal(size=80)
+        self.frame = pd.DataFrame({
+            "marketing_conversion": lead,
+            "sales_conversion": np.roll(lead, 2) + rng.normal(0, 0.3, 80),
+            "noise": rng.normal(size=80),
+        }, index=pd.date_range("2025-01-01", periods=80))
+        self.frame.iloc[10:13, 2] = np.nan
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_incremental_matrix_matches_pandas(self):
+        first = CorrelationStore(self.path, max_lag=4)
+        first.update(self.frame.iloc[:30, :2])
+        first.save()
+        store = CorrelationStore(self.path, max_lag=4)
+        self.assertEqual(store.update(self.frame), 50)  # newest day is left open
+        self.assertEqual(store.update(self.frame), 0)
+
+        r = store.matrix()
+        closed = self.frame.iloc[:-1].copy()
+        closed.iloc[:29, 2] = np.nan  # "noise" only seen from the second update
+        for lag in range(5):
+            for i, a in enumerate(store.targets):
+                for j, b in enumerate(store.names):
+                    expected = closed[a].corr(closed[b].shift(lag))
+                    self.assertAlmostEqual(r[lag, i, j], expected, places=9)
+
+    def test_drivers_report_leading_series(self):
+        store = CorrelationStore(None, max_lag=4)
+        store.update(self.frame)
+        drivers = store.drivers("sales_conversion", top_k=2)
+        self.assertEqual(drivers[0]["series"], "marketing_conversion")
+        self.assertEqual(drivers[0]["lag"], 2)
+        self.assertEqual(len(drivers), 1)
+
+    def test_segment_churn_keeps_store_bounded(self):
+        store = CorrelationStore(self.path, max_lag=2, max_series=6, retire_days=10)
+        rng = np.random.default_rng(1)
+        days = pd.date_range("2025-01-01", periods=120)
+        for week in range(0, 120, 7):
+            # three new segment series every week, each present for that week only
+            frame = pd.DataFrame({"sales_conversion": rng.normal(size=120),
+                                  **{f"sales_conversion|source=w{week}s{j}": np.nan for j in range(3)}},
+                                 index=days)
+            frame.iloc[week:week + 8, 1:] = rng.normal(size=(len(frame.iloc[week:week + 8]), 3))
+            store.update(frame.iloc[:week + 9])
+            self.assertLessEqual(len(store.names), 6)
+            self.assertEqual(store.matrix().shape[2], len(store.names))
+        store.save()
+        reopened = CorrelationStore(self.path, max_lag=2, max_series=6, retire_days=10)
+        self.assertEqual(reopened.matrix().shape, (3, 1, len(store.names)))
+        self.assertIn("sales_conversion", reopened.names)
+        # only the last weeks' segments were seen within retire_days
+        self.assertEqual({n.split("=")[1][:-2] for n in reopened.names if "|" in n}, {"w105", "w112"})
+
+    def test_reads_file_with_series_by_series_statistics(self):
+        frame = self.frame.assign(**{"sales_conversion|source=a": self.frame["noise"]})
+        expected = CorrelationStore(None, max_lag=4)
+        expected.update(frame)
+        closed = frame.iloc[:-1].to_numpy(dtype=float)
+        square = lagged_moments(closed, np.full((4, 4), np.nan), 4)  # layout before target rows
+        meta = json.dumps({"max_lag": 4, "names": list(frame.columns), "watermark": frame.index[-2].isoformat()})
+        np.savez(self.path, meta=np.array(meta), tail=closed[-4:], seen=expected._seen, **square)
+
+        store = CorrelationStore(self.path, max_lag=4)
+        np.testing.assert_allclose(store.matrix(), expected.matrix())
+        self.assertEqual(store.drivers("sales_conversion"), expected.drivers("sales_conversion"))
+
+    def test_thousands_of_segment_series_keep_state_linear(self):
+        rng = np.random.default_rng(3)
+        days = pd.date_range("2025-01-01", periods=60)
+        segments = rng.normal(size=(60, 3000))
+        frame = pd.DataFrame(segments, index=days,
+                             columns=[f"support_volume|tag=t{i}" for i in range(3000)])
+        frame["sales_conversion"] = np.roll(segments[:, 1234], 3) + rng.normal(0, 0.2, 60)
+        frame["support_volume"] = rng.normal(size=60)
+
+        store = CorrelationStore(None, max_lag=7)
+        store.update(frame)
+        self.assertEqual(len(store.names), 3002)
+        self.assertEqual(store._stats["n"].shape, (8, 2, 3002))
+        self.assertEqual(store.drivers("sales_conversion", top_k=1)[0]["series"], "support_volume|tag=t1234")
+        self.assertEqual(store.drivers("support_volume|tag=t1234"), [])
+
+    def test_kpi_frame_has_headline_and_segment_series(self):
+        frame = kpi_frame({"sales": make_sales(10).assign(source="Ads"), "support": make_support(48)})
+        self.assertIn("sales_conversion", frame.columns)
+        self.assertIn("sales_conversion|source=Ads", frame.columns)
+        self.assertEqual(frame["support_volume"].sum(), len(make_support(48)))
+        self.assertEqual(len(frame), 10)
+
+
+class TestInsights(unittest.TestCase):
+    def make(self):
+        return Insights(
+            sales=KPIInsight("sales_conversion", "rate", np.float64(0.2), 0.4, -0.5, np.float64(-3.1), np.bool_(True)),
+            marketing=KPIInsight("marketing_conversion", "rate", 0.03, 0.03, 0.0, 0.1, False),
+            support=KPIInsight("support_volume", "count", np.int64(40), 12.5, 2.2, 4.0, True),
+            summary="Sales anomaly detected | Support spike anomaly detected",
+        )
+
+    def test_dict_round_trip_matches_schema_layout(self):
+        insights = self.make()
+        data = insights.to_dict()
+        self.assertEqual(set(data), {"sales", "marketing", "support", "summary"})
+        self.assertEqual(data["support"]["latest_count"], 40)
+        self.assertIsInstance(data["sales"]["anomaly"], bool)
+        self.assertEqual(Insights.from_dict(json_roundtrip(data)), insights)
+        self.assertEqual(insights["sales"]["avg_rate"], 0.4)
+        self.assertTrue(insights.support_spike)
+        self.assertFalse(insights.marketing_drop)
+
+    def test_legacy_flat_keys_are_coerced(self):
+        legacy = Insights.coerce({"sales_conversion_change": -0.1, "support_spike": True})
+        self.assertEqual(legacy.sales_conversion_change, -0.1)
+        self.assertTrue(legacy.support_spike)
+        # a flat sales_conversion_change is the caller asserting a sales move
+        self.assertEqual([k.kpi for k in legacy.anomalies()], ["sales_conversion", "support_volume"])
+        self.assertEqual(Insights.coerce({"support_spike": True}).sales_conversion_change, 0.0)
+
+    def test_sales_change_ignores_noise_without_anomaly(self):
+        insights = self.make()
+        self.assertEqual(insights.sales_conversion_change, -0.5)
+        insights.sales = KPIInsight("sales_conversion", "rate", 0.36, 0.4, -0.1, -0.8, False)
+        self.assertEqual(insights.sales_conversion_change, 0.0)
+        # the nested dict AnalyticsAgent returned before never fired the < -0.05 rule without an anomaly
+        self.assertEqual(Insights.coerce(json_roundtrip(insights.to_dict())).sales_conversion_change, 0.0)
+
+    def test_memory_bank_serializes_insights(self):
+        tmp = tempfile.mkdtemp()
+        try:
+            bank = MemoryBank(os.path.join(tmp, "memory.json"))
+            bank.add_event({"type": "incident", "insights": self.make()})
+            stored = bank.query_recent(1)[0]["insights"]
+            self.assertEqual(Insights.from_dict(stored), self.make())
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+class TestRollupStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "rollups.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_incremental_updates_match_full_aggregation(self):
+        sales = make_sales(10)
+        store = RollupStore(self.path)
+        # first half of the data, then everything (the last partial day is re-aggregated)
+        store.update({"sales": sales.iloc[:95]})
+        RollupStore(self.path).update({"sales": sales})
+
+        series = RollupStore(self.path).series("sales_conversion")
+        expected = sales["stage"].eq("SQL").groupby(sales["date"]).mean()
+        np.testing.assert_allclose(series.values, expected.values)
+
+    def test_intraday_buckets_update_incrementally(self):
+        support = make_support(72)
+        store = RollupStore(self.path)
+        cut = support["created_at"].searchsorted(pd.Timestamp("2025-11-02 09:07"))
+        store.update({"support": support.iloc[:cut]})
+        RollupStore(self.path).update({"support": support})
+
+        series = RollupStore(self.path).series("support_volume", "5min")
+        expected = support.groupby(support["created_at"].dt.floor("5min")).size()
+        np.testing.assert_allclose(series.values, expected.values)
+
+    def test_retention_bounds_intraday_buckets(self):
+        store = RollupStore(self.path, retention_days={"5min": 1, "hourly": 2})
+        store.update({"support": make_support(24 * 5)})
+        hourly = store.series("support_volume", "hourly")
+        self.assertLessEqual(hourly.index[-1] - hourly.index[0], pd.Timedelta(days=2))
+        self.assertLessEqual(len(store.series("support_volume", "5min")), 24 * 12 + 1)
+        self.assertEqual(store.series("support_volume", "daily").index[0], pd.Timestamp("2025-11-01"))
+
+    def test_agent_reads_rollups(self):
+        sales = make_sales(10)
+        raw = AnalyticsAgent(lookback_days=7)._sales_conversion_change(sales.copy())
+        agent = AnalyticsAgent(lookback_days=7, rollups=RollupStore(self.path))
+        agent.rollups.update({"sales": sales})
+        rolled = agent._sales_conversion_change(sales.iloc[:0].copy())
+        self.assertAlmostEqual(raw["z_score"], rolled["z_score"])
+        self.assertAlmostEqual(raw["avg_rate"], rolled["avg_rate"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import os
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.agents.data_collector_agent import DataCollectorAgent
+from src.tools.data_fetcher import DataFetcher
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+
+
+class TestCompactSchema(unittest.TestCase):
+    def setUp(self):
+        fetcher = DataFetcher(
+            os.path.join(DATA_DIR, "sales.csv"),
+            os.path.join(DATA_DIR, "support.csv"),
+            os.path.join(DATA_DIR, "marketing.csv"),
+        )
+        self.agent = DataCollectorAgent(fetcher, report_memory=True)
+
+    def test_labels_are_categorical_and_measures_downcast(self):
+        datasets = self.agent.run()
+        self.assertIsInstance(datasets['sales']['stage'].dtype, pd.CategoricalDtype)
+        self.assertIsInstance(datasets['marketing']['channel'].dtype, pd.CategoricalDtype)
+        self.assertLess(datasets['marketing']['impressions'].dtype.itemsize, 8)
+        self.assertEqual(datasets['support']['escalated'].dtype, bool)
+
+        total = self.agent.memory_report['sales']['total']
+        self.assertLess(total['after'], total['before'])
+
+    def test_amounts_are_only_narrowed_when_exact(self):
+        sales = self.agent.fetcher.fetch_sales()
+        amounts = sales.assign(amount=[1234567.89, 0.5, 12.25, 3.0, 4.0][:len(sales)])
+        self.assertEqual(self.agent.validate_sales(amounts)['amount'].iloc[0], 1234567.89)
+        halves = sales.assign(amount=[0.5, 12.25, 3.0, 4.0, 8.0][:len(sales)])
+        self.assertEqual(self.agent.validate_sales(halves)['amount'].dtype, np.float32)
+
+    def test_missing_columns_still_rejected(self):
+        with self.assertRaises(ValueError):
+            self.agent.validate_sales(pd.DataFrame({'date': []}))
+
+
+class TestCollectorWindow(unittest.TestCase):
+    def test_window_is_passed_per_fetch_without_touching_the_fetcher(self):
+        fetcher = DataFetcher(
+            os.path.join(DATA_DIR, "sales.csv"),
+            os.path.join(DATA_DIR, "support.csv"),
+            os.path.join(DATA_DIR, "marketing.csv"),
+        )
+        full = fetcher.fetch_sales()
+        agent = DataCollectorAgent(fetcher, window_days=1)
+
+        windowed = agent.run()['sales']
+        self.assertIsNone(fetcher.window_days)
+        self.assertEqual(windowed['date'].dt.normalize().nunique(), 1)
+        self.assertEqual(len(fetcher.fetch_sales()), len(full))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from src.tools.data_fetcher import DataFetcher
+from src.tools.dataset_cache import DatasetCache
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+
+
+class TestIncrementalFetch(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        for name in ("sales", "support", "marketing"):
+            shutil.copy(os.path.join(DATA_DIR, f"{name}.csv"), self.tmp)
+        self.sales = os.path.join(self.tmp, "sales.csv")
+        self.fetcher = DataFetcher(
+            self.sales,
+            os.path.join(self.tmp, "support.csv"),
+            os.path.join(self.tmp, "marketing.csv"),
+            incremental=True,
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_appended_rows_are_merged(self):
+        base = self.fetcher.fetch_sales()
+        with open(self.sales, "a") as f:
+            f.write("2025-11-15,LD2001,Email,SQL,100,Amit,EMEA\n2025-11-16,LD2002,Em")
+        df = self.fetcher.fetch_sales()
+        self.assertEqual(len(df), len(base) + 1)
+
+        # The half-written row is only picked up once its line is complete
+        with open(self.sales, "a") as f:
+            f.write("ail,MQL,0,Amit,EMEA\n")
+        df = self.fetcher.fetch_sales()
+        self.assertEqual(len(df), len(base) + 2)
+        self.assertEqual(df['lead_id'].iloc[-1], "LD2002")
+        self.assertEqual(df['source'].iloc[-1], "Email")
+        self.assertEqual(str(df['date'].dtype).split('[')[0], "datetime64")
+
+    def test_truncated_file_triggers_full_reload(self):
+        self.fetcher.fetch_sales()
+        with open(self.sales, "w") as f:
+            f.write("date,lead_id,source,stage,amount,owner,region\n")
+            f.write("2025-12-01,LD3001,Email,SQL,10,Amit,EMEA\n")
+        df = self.fetcher.fetch_sales()
+        self.assertEqual(list(df['lead_id']), ["LD3001"])
+
+
+class TestWindowedFetch(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.sales = os.path.join(self.tmp, "sales.csv")
+        with open(self.sales, "w") as f:
+            f.write("date,lead_id,source,stage,amount,owner,region\n")
+            for day in range(1, 31):
+                for i in range(3):
+                    f.write(f"2025-11-{day:02d},LD{day}{i},Email,SQL,10,Amit,EMEA\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_streamed_window_matches_full_filter(self):
+        fetcher = DataFetcher(self.sales, None, None, window_days=7, chunksize=4)
+        df = fetcher.fetch_sales()
+        self.assertEqual(len(df), 7 * 3)
+        self.assertEqual(str(df['date'].min().date()), "2025-11-24")
+
+    def test_incremental_window_slides(self):
+        fetcher = DataFetcher(self.sales, None, None, window_days=7, incremental=True)
+        fetcher.fetch_sales()
+        with open(self.sales, "a") as f:
+            f.write("2025-12-01,LD999,Email,SQL,10,Amit,EMEA\n")
+        df = fetcher.fetch_sales()
+        self.assertEqual(str(df['date'].min().date()), "2025-11-25")
+        self.assertEqual(len(df), 6 * 3 + 1)
+
+
+class TestConcurrentFetch(unittest.TestCase):
+    def test_thread_pool_loads_all_sources_with_stats(self):
+        fetcher = DataFetcher(
+            os.path.join(DATA_DIR, "sales.csv"),
+            os.path.join(DATA_DIR, "support.csv"),
+            os.path.join(DATA_DIR, "marketing.csv"),
+            concurrency="thread",
+        )
+        datasets = fetcher.fetch_all()
+        self.assertEqual(set(datasets), {"sales", "support", "marketing"})
+        self.assertEqual(fetcher.last_fetch_stats["sales"]["rows"], len(datasets["sales"]))
+
+    def test_missing_source_fails_before_loading(self):
+        fetcher = DataFetcher(
+            os.path.join(DATA_DIR, "sales.csv"),
+            os.path.join(DATA_DIR, "missing.csv"),
+            os.path.join(DATA_DIR, "marketing.csv"),
+            concurrency="thread",
+        )
+        with self.assertRaisesRegex(FileNotFoundError, "support"):
+            fetcher.fetch_all()
+
+
+class TestDatasetCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.sales = os.path.join(self.tmp, "sales.csv")
+        shutil.copy(os.path.join(DATA_DIR, "sales.csv"), self.sales)
+        self.cache = DatasetCache(os.path.join(self.tmp, "cache"))
+        self.fetcher = DataFetcher(self.sales, None, None, cache=self.cache)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_warm_load_keeps_types_and_invalidates_on_change(self):
+        cold = self.fetcher.fetch_sales()
+        cached = self.cache.load(self.sales)
+        self.assertIsNotNone(cached)
+        self.assertEqual(cached['date'].dtype, cold['date'].dtype)
+        self.assertEqual(len(self.fetcher.fetch_sales()), len(cold))
+
+        with open(self.sales, "a") as f:
+            f.write("2025-11-15,LD2001,Email,SQL,100,Amit,EMEA\n")
+        self.assertIsNone(self.cache.load(self.sales))
+        self.assertEqual(len(self.fetcher.fetch_sales()), len(cold) + 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
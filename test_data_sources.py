@@ -0,0 +1,99 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import pandas as pd
+
+from src.services.rollup_store import RollupStore
+from src.tools.data_fetcher import DataFetcher
+from src.tools.data_sources import Aggregate, CSVSource, SQLSource, load_csv_into_sqlite, sqlite_pool
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+AGGREGATES = [Aggregate("leads", "count"), Aggregate("sql_leads", "count_eq", "stage", "SQL"),
+              Aggregate("avg_amount", "mean", "amount")]
+
+
+class TestSQLSource(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.csv = os.path.join(DATA_DIR, "sales.csv")
+        self.db = os.path.join(self.tmp, "warehouse.db")
+        load_csv_into_sqlite(self.csv, self.db, "sales", "date")
+        self.pool = sqlite_pool(self.db, size=2)
+        self.source = SQLSource(self.pool, "sales", "date")
+
+    def tearDown(self):
+        self.pool.close()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_server_side_aggregates_match_csv(self):
+        sql = self.source.daily_aggregates(AGGREGATES)
+        csv = CSVSource(self.csv, "date", chunksize=2).daily_aggregates(AGGREGATES)
+        self.assertEqual(list(sql.index), list(csv.index))
+        self.assertEqual(list(sql["sql_leads"]), list(csv["sql_leads"]))
+        self.assertEqual(list(sql["avg_amount"].round(6)), list(csv["avg_amount"].round(6)))
+
+    def test_fetcher_pushes_window_into_query(self):
+        fetcher = DataFetcher(None, None, None, window_days=2, sources={"sales": self.source})
+        df = fetcher.fetch_sales()
+        self.assertEqual(str(df['date'].min().date()), "2025-11-14")
+
+    def test_identifiers_are_validated(self):
+        with self.assertRaises(ValueError):
+            SQLSource(self.pool, "sales; DROP TABLE sales", "date")
+
+    @patch.dict(os.environ, {"DEMO_MODE": "false"})
+    def test_connector_output_is_prepared(self):
+        support = os.path.join(self.tmp, "support.csv")
+        with open(support, "w") as f:
+            f.write("ticket_id,created_at,resolved_at,priority\n")
+            f.write("T1,2025-11-14T10:00:00Z,2025-11-14T12:30:00Z,high\n")
+            f.write("T2,2025-11-15T09:00:00Z,,low\n")
+        load_csv_into_sqlite(support, self.db, "support", "created_at")
+        fetcher = DataFetcher(None, None, None, sources={"support": SQLSource(self.pool, "support", "created_at")})
+        df = fetcher.fetch_support()
+        self.assertEqual(df['resolved_at'].dtype.kind, "M")
+        self.assertEqual(df['resolved_at'].iloc[0], df['created_at'].iloc[0] + pd.Timedelta(hours=2, minutes=30))
+        self.assertTrue(pd.isna(df['resolved_at'].iloc[1]))
+
+    def test_process_pool_rejects_pooled_sources(self):
+        with self.assertRaises(ValueError):
+            DataFetcher(None, None, None, concurrency="process", sources={"sales": self.source})
+
+
+class TestSourceRollups(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.db = os.path.join(self.tmp, "warehouse.db")
+        self.pool = sqlite_pool(self.db, size=2)
+        self.sources = {}
+        for name, col in (("sales", "date"), ("support", "created_at"), ("marketing", "date")):
+            load_csv_into_sqlite(os.path.join(DATA_DIR, f"{name}.csv"), self.db, name, col)
+            self.sources[name] = SQLSource(self.pool, name, col)
+
+    def tearDown(self):
+        self.pool.close()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    @patch.dict(os.environ, {"DEMO_MODE": "false"})
+    def test_daily_rollups_come_from_source_beyond_the_fetched_window(self):
+        windowed = DataFetcher(None, None, None, window_days=2, sources=self.sources).fetch_all()
+        store = RollupStore(os.path.join(self.tmp, "source.json"), sources=self.sources)
+        store.update(windowed)
+
+        full = DataFetcher(None, None, None, sources=self.sources).fetch_all()
+        expected = RollupStore(os.path.join(self.tmp, "rows.json"))
+        expected.update(full)
+
+        for kpi in ("sales_conversion", "support_escalation_rate", "marketing_conversion", "support_volume"):
+            got, want = store.series(kpi), expected.series(kpi)
+            self.assertEqual(list(got.index), list(want.index), kpi)
+            self.assertEqual(list(got.round(9)), list(want.round(9)), kpi)
+        # intraday buckets are still built from the fetched rows
+        self.assertLess(len(store.series("sales_conversion", "hourly")), len(expected.series("sales_conversion", "hourly")))
+
+
+if __name__ == '__main__':
+    unittest.main()
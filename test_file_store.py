@@ -0,0 +1,93 @@
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+from src.services.kpi_baselines import KPIBaselineStore
+from src.services.memory_bank import MemoryBank
+from src.services.memory_sqlite import SQLiteMemoryBank
+from src.services.session_service import SessionService
+from src.utils.file_store import ConcurrentModificationError, JSONListStore, file_lock
+
+WORKERS = 8
+WRITES = 25
+
+
+def write_everything(tmp, worker):
+    store = JSONListStore(os.path.join(tmp, "list.json"))
+    bank = MemoryBank(os.path.join(tmp, "memory.json"))
+    sessions = SessionService(os.path.join(tmp, "sessions.json"))
+    db = SQLiteMemoryBank(os.path.join(tmp, "memory.db"), batch_size=5)
+    baselines = KPIBaselineStore(os.path.join(tmp, "kpi_baselines"))
+    session = sessions.create_session(f"worker-{worker}")
+    for i in range(WRITES):
+        store.append({"worker": worker, "i": i})
+        bank.add_event({"type": "incident", "trace_id": f"w{worker}-{i}"})
+        db.add_event({"type": "incident", "trace_id": f"w{worker}-{i}"})
+        sessions.set_last_trace(session["session_id"], f"w{worker}-{i}")
+        # each worker registers its own KPIs, so ids are allocated concurrently
+        baselines.set(f"kpi|worker={worker}|{i % 5}", worker * 1000 + i)
+    db.close()
+    baselines.close()
+
+
+class TestConcurrentWriters(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_no_lost_writes_across_processes(self):
+        ctx = multiprocessing.get_context("spawn")
+        procs = [ctx.Process(target=write_everything, args=(self.tmp, w)) for w in range(WORKERS)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join(120)
+            self.assertEqual(p.exitcode, 0)
+
+        expected = {(w, i) for w in range(WORKERS) for i in range(WRITES)}
+        items = JSONListStore(os.path.join(self.tmp, "list.json")).read()
+        self.assertEqual({(e["worker"], e["i"]) for e in items}, expected)
+        self.assertEqual(len(items), len(expected))
+
+        bank = MemoryBank(os.path.join(self.tmp, "memory.json"))
+        self.assertEqual(bank.count(type="incident"), WORKERS * WRITES)
+        self.assertTrue(bank.exists(trace_id=f"w{WORKERS - 1}-{WRITES - 1}"))
+        with sqlite3.connect(os.path.join(self.tmp, "memory.db")) as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(DISTINCT trace_id) FROM events").fetchone()[0],
+                             WORKERS * WRITES)
+
+        sessions = SessionService(os.path.join(self.tmp, "sessions.json")).list_sessions()
+        self.assertEqual(len(sessions), WORKERS)
+        self.assertTrue(all(s["last_trace_id"].endswith(f"-{WRITES - 1}") for s in sessions))
+
+        baselines = KPIBaselineStore(os.path.join(self.tmp, "kpi_baselines"))
+        self.assertEqual(len(baselines.kpis()), WORKERS * 5)
+        for w in range(WORKERS):
+            for k in range(5):
+                history = baselines.history(f"kpi|worker={w}|{k}")
+                self.assertEqual(history.tolist(), [w * 1000 + i for i in range(k, WRITES, 5)])
+
+    def test_optimistic_write_detects_conflict(self):
+        store = JSONListStore(os.path.join(self.tmp, "list.json"))
+        items, version = store.read_versioned()
+        store.append("someone else")
+        with self.assertRaises(ConcurrentModificationError):
+            store.write(items + ["mine"], version)
+        items, version = store.read_versioned()
+        self.assertEqual(store.write(items + ["mine"], version), version + 1)
+        self.assertEqual(store.read(), ["someone else", "mine"])
+
+    def test_lock_is_reentrant_within_a_thread(self):
+        path = os.path.join(self.tmp, "x.json")
+        with file_lock(path) as outer:
+            with file_lock(path) as inner:
+                self.assertIs(inner, outer)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,437 @@
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+from src.services.kpi_baselines import KPIBaselineStore
+from src.services.memory_archive import RETENTION_DAYS, MemoryArchive, is_cold
+from src.services.memory_bank import MemoryBank
+from src.services.memory_log import SegmentLogMemoryBank
+from src.services.memory_sqlite import SQLiteMemoryBank, migrate_json
+from src.services.memory_index import reason_signature
+from src.utils import serialization
+from src.utils.insights import KPIInsight
+
+
+def incident(trace_id, reasons, support_anomaly=True):
+    return {
+        "type": "incident",
+        "trace_id": trace_id,
+        "insights": {"sales": {"anomaly": False}, "marketing": {"anomaly": False},
+                     "support": {"anomaly": support_anomaly}, "summary": ""},
+        "reasons": [{"reason": r, "confidence": 0.5} for r in reasons],
+    }
+
+
+def fill_sample(bank):
+    bank.add_event(incident("t1", ["product_bug_or_degradation"]))
+    bank.add_event(incident("t2", ["support_segment_spike", "product_bug_or_degradation"]))
+    bank.add_event({"type": "action_result", "trace_id": "t2", "result": "ok"})
+    bank.set_kpi_baseline("support_volume", 12)
+    bank.set_kpi_baseline("support_volume", 15)
+    bank.add_event(incident("t3", ["product_bug_or_degradation", "support_segment_spike"], False))
+
+
+def without_timestamps(events):
+    return [{k: v for k, v in e.items() if k != "timestamp"} for e in events]
+
+
+class TestMemoryIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "memory.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_counts_and_lookups(self):
+        bank = MemoryBank(self.path)
+        fill_sample(bank)
+        sig = reason_signature([{"reason": "support_segment_spike"}, {"reason": "product_bug_or_degradation"}])
+        self.assertEqual(bank.count(type="incident"), 3)
+        self.assertEqual(bank.count(type="incident", reason=sig), 2)
+        self.assertEqual(bank.count(kpi="support_volume"), 4)
+        self.assertEqual(bank.count(), 6)
+        self.assertTrue(bank.exists(trace_id="t2"))
+        self.assertFalse(bank.exists(trace_id="missing"))
+        self.assertEqual([e["type"] for e in bank.find_by_trace_id("t2")], ["incident", "action_result"])
+        self.assertEqual(len(bank.find_by_type("incident")), 3)
+        self.assertEqual(bank.get_latest_kpi("support_volume"), 15.0)
+        with self.assertRaises(ValueError):
+            bank.count(owner="x")
+
+    def test_sidecar_is_reused_and_rebuilt_when_stale(self):
+        fill_sample(MemoryBank(self.path))
+        self.assertTrue(os.path.exists(self.path + ".idx"))
+        self.assertEqual(MemoryBank(self.path).count(type="incident"), 3)
+
+        # edit the store behind the bank's back
+        with open(self.path, encoding="utf8") as f:
+            events = json.load(f)
+        with open(self.path, "w", encoding="utf8") as f:
+            json.dump(events[:2], f)
+        self.assertEqual(MemoryBank(self.path).count(type="incident"), 2)
+
+
+class TestSegmentLogMemoryBank(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "memory_log")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def open(self, **kwargs):
+        return SegmentLogMemoryBank(self.path, segment_bytes=kwargs.pop("segment_bytes", 1500), **kwargs)
+
+    def fill(self, bank, n=60):
+        for i in range(n):
+            bank.set_kpi_baseline(f"kpi{i % 3}", i)
+            bank.add_event(incident(f"t{i}", ["product_bug_or_degradation"]))
+
+    def test_same_answers_as_json_backend(self):
+        json_bank = MemoryBank(os.path.join(self.tmp, "memory.json"))
+        log_bank = self.open(segment_bytes=1 << 20)
+        fill_sample(json_bank)
+        fill_sample(log_bank)
+        for filters in ({"type": "incident"}, {"kpi": "support_volume"}, {"trace_id": "t2"}, {}):
+            self.assertEqual(log_bank.count(**filters), json_bank.count(**filters))
+        self.assertEqual(without_timestamps(log_bank.find_by_trace_id("t2")),
+                         without_timestamps(json_bank.find_by_trace_id("t2")))
+        self.assertEqual(without_timestamps(log_bank.query_recent(3)), without_timestamps(json_bank.query_recent(3)))
+        self.assertEqual(log_bank.get_latest_kpi("support_volume"), 15.0)
+
+    def test_rotation_and_compaction_keep_order_and_latest_baselines(self):
+        bank = self.open(compact_after=2)
+        self.fill(bank)
+        self.assertGreater(len(bank._segments), 2)
+        self.assertLess(bank.count(type="kpi_baseline"), 60)  # superseded baselines dropped
+        self.assertEqual([e["trace_id"] for e in bank.find_by_type("incident")], [f"t{i}" for i in range(60)])
+        self.assertEqual([bank.get_latest_kpi(f"kpi{k}") for k in range(3)], [57.0, 58.0, 59.0])
+
+        bank.compact(full=True)
+        self.assertEqual(bank.count(type="kpi_baseline"), 3)
+        self.assertEqual(bank.count(type="incident"), 60)
+        self.assertEqual(bank.query_recent(1)[0]["trace_id"], "t59")
+        names = {f for f in os.listdir(self.path) if f.endswith(".jsonl")}
+        self.assertEqual(names, {f"{n:08d}.jsonl" for n in bank._segments})
+
+    def test_recovers_after_crash(self):
+        bank = self.open()
+        self.fill(bank, 40)
+        expected = bank.find_by_type("incident")
+        # no close(): events after the last checkpoint are replayed; a torn
+        # line and a half-written compaction output are discarded
+        bank._active.write(b'{"type": "incident", "trace_id": "to')
+        bank._active.flush()
+        with open(os.path.join(self.path, "99999999.jsonl"), "w") as f:
+            f.write('{"type": "incident"}\n')
+
+        reopened = self.open()
+        self.assertEqual(reopened.find_by_type("incident"), expected)
+        self.assertFalse(os.path.exists(os.path.join(self.path, "99999999.jsonl")))
+        reopened.add_event(incident("t-new", []))
+        reopened.close()
+        self.assertEqual(self.open().query_recent(1)[0]["trace_id"], "t-new")
+        self.assertEqual(self.open().count(type="incident"), 41)
+
+
+class TestSQLiteMemoryBank(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.db = os.path.join(self.tmp, "memory.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_same_answers_as_json_backend(self):
+        json_bank = MemoryBank(os.path.join(self.tmp, "memory.json"))
+        bank = SQLiteMemoryBank(self.db, batch_size=4)
+        fill_sample(json_bank)
+        fill_sample(bank)
+        sig = reason_signature([{"reason": "support_segment_spike"}, {"reason": "product_bug_or_degradation"}])
+        for filters in ({"type": "incident"}, {"type": "incident", "reason": sig}, {"kpi": "support_volume"},
+                        {"trace_id": "t2"}, {}):
+            self.assertEqual(bank.count(**filters), json_bank.count(**filters), filters)
+        self.assertEqual(without_timestamps(bank.find_by_trace_id("t2")),
+                         without_timestamps(json_bank.find_by_trace_id("t2")))
+        self.assertEqual(without_timestamps(bank.query_recent(3)), without_timestamps(json_bank.query_recent(3)))
+        self.assertEqual(bank.get_latest_kpi("support_volume"), 15.0)
+        self.assertIsNone(bank.get_latest_kpi("missing"))
+        with self.assertRaises(ValueError):
+            bank.count(owner="x")
+
+        rows = bank.query("SELECT trace_id, json_extract(body, '$.reasons[0].reason') AS first "
+                          "FROM events WHERE type = 'incident' ORDER BY id")
+        self.assertEqual([r["trace_id"] for r in rows], ["t1", "t2", "t3"])
+        with self.assertRaises(sqlite3.OperationalError):
+            bank.query("DELETE FROM events")
+        bank.close()
+
+    def test_group_commit_is_durable_after_close(self):
+        bank = SQLiteMemoryBank(self.db, batch_size=100, flush_interval=3600)
+        for i in range(10):
+            bank.add_event(incident(f"t{i}", []))
+        with sqlite3.connect(self.db) as other:  # nothing committed yet
+            self.assertEqual(other.execute("SELECT COUNT(*) FROM events").fetchone()[0], 0)
+        self.assertEqual(bank.count(type="incident"), 10)  # reads see the buffer
+        bank.add_event(incident("t10", []))
+        bank.close()
+        self.assertEqual(SQLiteMemoryBank(self.db).count(type="incident"), 11)
+
+    def test_migrate_json(self):
+        source = MemoryBank(os.path.join(self.tmp, "memory.json"))
+        fill_sample(source)
+        self.assertEqual(migrate_json(source.path, self.db, batch_size=4), 6)
+        bank = SQLiteMemoryBank(self.db)
+        self.assertEqual(bank.query_recent(10), source.query_recent(10))
+        self.assertEqual(bank.get_latest_kpi("support_volume"), 15.0)
+        with self.assertRaises(ValueError):
+            migrate_json(source.path, self.db)
+
+    def test_quiet_buffer_is_flushed_after_interval(self):
+        bank = SQLiteMemoryBank(self.db, batch_size=100, flush_interval=0.2)
+        bank.add_event({"type": "incident", "trace_id": "lone"})
+        count = lambda: sqlite3.connect(self.db).execute("SELECT COUNT(*) FROM events").fetchone()[0]
+        self.assertEqual(count(), 0)
+        deadline = time.monotonic() + 5
+        while count() == 0 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(count(), 1)
+        bank.close()
+
+
+class TestKPIBaselineStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "kpi_baselines")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_latest_and_history_survive_reopen(self):
+        store = KPIBaselineStore(self.path)
+        for day in range(1, 11):
+            for seg in range(50):
+                store.set(f"support_volume|region=r{seg}", day * 100 + seg, datetime(2024, 1, day))
+        store.set("support_volume|region=r0", 5, datetime(2023, 12, 31))  # back-filled, not the latest
+        store.close()
+
+        reopened = KPIBaselineStore(self.path)
+        self.assertEqual(reopened.latest("support_volume|region=r3"), 1003.0)
+        self.assertEqual(reopened.latest("support_volume|region=r0"), 1000.0)
+        self.assertIsNone(reopened.latest("missing"))
+        self.assertEqual(len(reopened.kpis()), 50)
+        hist = reopened.history("support_volume|region=r0", start="2024-01-03", end="2024-01-05")
+        self.assertEqual(hist.tolist(), [300.0, 400.0, 500.0])
+        self.assertEqual(reopened.history("support_volume|region=r0").iloc[0], 5.0)
+        self.assertTrue(reopened.history("missing").empty)
+
+    def test_partial_record_is_dropped(self):
+        store = KPIBaselineStore(self.path)
+        store.set("a", 1.0)
+        store.set("a", 2.0)
+        store.close()
+        with open(os.path.join(self.path, "baselines.bin"), "ab") as f:
+            f.write(b"\x00\x01\x02")
+        with open(os.path.join(self.path, "kpis.jsonl"), "ab") as f:
+            f.write(b'"b')
+        reopened = KPIBaselineStore(self.path)
+        self.assertEqual(reopened.history("a").tolist(), [1.0, 2.0])
+        reopened.set("b", 3.0)
+        reopened.close()
+        self.assertEqual(KPIBaselineStore(self.path).latest("b"), 3.0)
+
+    def test_instances_sharing_a_directory_see_each_others_kpis(self):
+        one, two = KPIBaselineStore(self.path), KPIBaselineStore(self.path)
+        one.set("a", 1.0)
+        two.set("b", 2.0)  # b must not reuse a's id
+        one.set("a", 3.0)
+        self.assertEqual((one.latest("a"), one.latest("b")), (3.0, 2.0))
+        self.assertEqual((two.latest("a"), two.latest("b")), (3.0, 2.0))
+        self.assertEqual(two.history("a").tolist(), [1.0, 3.0])
+        self.assertEqual(KPIBaselineStore(self.path).kpis(), ["a", "b"])
+
+    def test_memory_bank_uses_store_and_falls_back_to_events(self):
+        bank = MemoryBank(os.path.join(self.tmp, "memory.json"))
+        bank.set_kpi_baseline("sales_conversion", 0.1)
+        bank = MemoryBank(bank.path, baselines=KPIBaselineStore(self.path))
+        self.assertEqual(bank.get_latest_kpi("sales_conversion"), 0.1)  # from the event history
+        bank.set_kpi_baseline("sales_conversion", 0.2)
+        self.assertEqual(bank.get_latest_kpi("sales_conversion"), 0.2)
+        self.assertEqual(bank.count(type="kpi_baseline"), 1)  # no new event written
+        bank.close()
+
+
+class TestMemoryArchive(unittest.TestCase):
+    NOW = datetime(2024, 7, 1)
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.archive = MemoryArchive(os.path.join(self.tmp, "archive"))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def fill(self, bank):
+        # one incident + action_executed per day from 2024-01-01, baselines on the first days only
+        for day in range(182):
+            stamp = (datetime(2024, 1, 1) + timedelta(days=day)).isoformat()
+            bank.add_event({**incident(f"t{day}", ["product_bug_or_degradation"]), "timestamp": stamp})
+            bank.add_event({"type": "action_executed", "trace_id": f"t{day}", "timestamp": stamp})
+            if day < 3:
+                bank.add_event({"type": "kpi_baseline", "kpi": "sales_conversion", "value": float(day),
+                                "timestamp": stamp})
+
+    def check(self, bank):
+        baselines = bank.count(type="kpi_baseline")  # compaction may already have dropped some
+        moved = bank.archive_cold({"incident": 90, "action_executed": 30}, now=self.NOW)
+        # incidents at least 90 days old (93 of them), action results at least 30
+        # days old (153), baselines except the newest one
+        self.assertEqual(moved, 93 + 153 + baselines - 1)
+        self.assertEqual(bank.count(type="incident"), 89)
+        self.assertEqual(bank.get_latest_kpi("sales_conversion"), 2.0)
+        self.assertEqual(self.archive.months(), ["2024-01", "2024-02", "2024-03", "2024-04", "2024-05", "2024-06"])
+        self.assertEqual([e["type"] for e in bank.find_by_trace_id("t0")], ["incident", "action_executed"])
+        self.assertEqual([e["type"] for e in bank.find_by_trace_id("t100")], ["action_executed", "incident"])
+        self.assertEqual(bank.archive_cold({"incident": 90, "action_executed": 30}, now=self.NOW), 0)
+
+    def test_default_retention_per_type(self):
+        def cold(event_type, days):
+            stamp = (self.NOW - timedelta(days=days)).isoformat()
+            return is_cold({"type": event_type, "timestamp": stamp}, RETENTION_DAYS, self.NOW)
+
+        for event_type, keep in (("kpi_baseline", 30), ("action_executed", 90), ("incident", 180),
+                                 ("slack_message", 90)):
+            self.assertFalse(cold(event_type, keep - 1), event_type)
+            self.assertTrue(cold(event_type, keep), event_type)
+        self.assertFalse(is_cold({"type": "incident"}, RETENTION_DAYS, self.NOW))
+
+    def test_json_backend(self):
+        bank = MemoryBank(os.path.join(self.tmp, "memory.json"), archive=self.archive)
+        self.fill(bank)
+        self.check(bank)
+        self.assertEqual(len(MemoryBank(bank.path).query_recent(1000)), 89 + 29 + 1)
+
+    def test_log_backend(self):
+        bank = SegmentLogMemoryBank(os.path.join(self.tmp, "log"), segment_bytes=4096, archive=self.archive)
+        self.fill(bank)
+        bank._rotate()  # seal everything so it is eligible
+        self.check(bank)
+        bank.close()
+        self.assertEqual(SegmentLogMemoryBank(bank.path).count(), 89 + 29 + 1)
+
+    def test_log_backend_touches_only_segments_with_cold_events(self):
+        bank = SegmentLogMemoryBank(os.path.join(self.tmp, "log"), segment_bytes=4096, compact_after=1000,
+                                    archive=self.archive)
+        self.fill(bank)
+        bank._rotate()
+        total, before = bank.count(), list(bank._segments)
+        retention = {"incident": 150, "action_executed": 150}
+        with patch.object(bank, "_read", wraps=bank._read) as read:
+            # days 0-32 are at least 150 days old; baselines except the newest are past 30
+            self.assertEqual(bank.archive_cold(retention, now=self.NOW), 2 * 33 + 2)
+        self.assertLess(len(read.call_args_list[0].args[0]), total // 4)  # newer segments never read
+        kept = [n for n in before if n in bank._segments]
+        self.assertGreater(len(kept), len(before) * 3 // 4)  # and never rewritten
+        self.assertEqual(bank.count(), total - 68)
+        self.assertEqual(bank.get_latest_kpi("sales_conversion"), 2.0)
+        bank.close()
+
+        reopened = SegmentLogMemoryBank(bank.path, archive=self.archive)
+        self.assertEqual(reopened.count(), total - 68)
+        with patch.object(reopened, "_read", wraps=reopened._read) as read:
+            self.assertEqual(reopened.archive_cold(retention, now=self.NOW), 0)
+        self.assertLess(sum(len(call.args[0]) for call in read.call_args_list), 50)
+        self.assertEqual(len(self.archive.find_by_trace_id("t5")), 2)
+        reopened.close()
+
+    def test_sqlite_backend(self):
+        bank = SQLiteMemoryBank(os.path.join(self.tmp, "memory.db"), archive=self.archive)
+        self.fill(bank)
+        self.check(bank)
+        self.assertEqual(bank.query("SELECT COUNT(*) AS n FROM event_kpis")[0]["n"], 89 + 1)
+        bank.close()
+
+
+class TestSerialization(unittest.TestCase):
+    PAYLOAD = {
+        "type": "incident",
+        "z": np.float64(-3.5), "n": np.int64(7), "flag": np.bool_(True), "arr": np.array([1.0, 2.0]),
+        "when": pd.Timestamp("2024-03-01 12:30"), "day": datetime(2024, 3, 1).date(), "missing": pd.NaT,
+        "sales": KPIInsight("sales_conversion", "rate", 0.1, 0.2, -50.0, -3.1, True),
+        "pair": (1, 2),
+    }
+    EXPECTED = {
+        "type": "incident", "z": -3.5, "n": 7, "flag": True, "arr": [1.0, 2.0],
+        "when": "2024-03-01T12:30:00", "day": "2024-03-01", "missing": None,
+        "sales": {"latest_rate": 0.1, "avg_rate": 0.2, "pct_change": -50.0, "z_score": -3.1, "anomaly": True},
+        "pair": [1, 2],
+    }
+
+    def test_same_output_with_and_without_orjson(self):
+        self.assertEqual(serialization.json_safe(self.PAYLOAD), self.EXPECTED)
+        with patch.object(serialization, "orjson", None):
+            self.assertEqual(serialization.json_safe(self.PAYLOAD), self.EXPECTED)
+            self.assertEqual(json.loads(serialization.dumps(self.PAYLOAD, indent=2)), self.EXPECTED)
+        with self.assertRaises(TypeError):
+            serialization.dumps({"x": object()})
+
+    def test_nan_round_trips_the_same_with_and_without_orjson(self):
+        payload = {"z": np.float64("nan"), "arr": np.array([np.inf, 1.0]), "none": None}
+        written = serialization.dumps(payload)
+        with patch.object(serialization, "orjson", None):
+            self.assertEqual(serialization.dumps(payload), written)
+        self.assertEqual(written, '{"z":NaN,"arr":[Infinity,1.0],"none":null}')
+        self.assertTrue(np.isnan(serialization.loads(written)["z"]))
+        with self.assertRaises(json.JSONDecodeError):
+            serialization.loads(b'{"z": Na')
+
+    @unittest.skipIf(serialization.orjson is None, "orjson not installed")
+    def test_none_fields_keep_the_orjson_output(self):
+        payload = {"last_trace_id": None, "resolved_at": None, "note": "null", "sales": self.PAYLOAD["sales"]}
+        with patch.object(serialization, "_stdlib_dumps") as stdlib:
+            written = serialization.dumps(payload)
+        stdlib.assert_not_called()
+        self.assertEqual(json.loads(written)["resolved_at"], None)
+
+        nan_kpi = KPIInsight("sales_conversion", "rate", 0.1, float("nan"), 0.0, 0.0, False)
+        self.assertIn("NaN", serialization.dumps({"resolved_at": None, "sales": nan_kpi}))
+
+    def test_reads_baseline_memory_json_with_nan(self):
+        tmp = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmp, "memory.json")
+            with open(path, "w") as f:  # as the pre-serialization MemoryBank wrote it
+                json.dump([{"type": "incident", "trace_id": "t1", "z_score": float("nan")}], f, indent=2)
+            bank = MemoryBank(path)
+            self.assertEqual(len(bank.find_by_trace_id("t1")), 1)
+            bank.add_event({"type": "incident", "trace_id": "t2", "z_score": np.float64("nan")})
+            with open(path) as f:
+                events = json.load(f)
+            self.assertEqual([e["trace_id"] for e in events], ["t1", "t2"])
+            self.assertTrue(all(np.isnan(e["z_score"]) for e in events))
+            self.assertEqual([p for p in os.listdir(tmp) if ".corrupt." in p], [])
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    def test_memory_bank_stores_numpy_and_pandas_values(self):
+        tmp = tempfile.mkdtemp()
+        try:
+            bank = MemoryBank(os.path.join(tmp, "memory.json"))
+            self.assertEqual(bank.add_event(dict(self.PAYLOAD))["when"], "2024-03-01T12:30:00")
+            self.assertEqual(without_timestamps(bank.query_recent(1)), [self.EXPECTED])
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,4 +1,7 @@
 import unittest
+
+import pandas as pd
+
 from src.services.knowledge_base import KnowledgeBase
 from src.agents.root_cause_agent import RootCauseAgent
 from src.agents.action_executor_agent import ActionExecutorAgent
@@ -31,6 +34,22 @@ class TestAdvancedFeatures(unittest.TestCase):
         
         self.assertTrue(found_rag, "RootCauseAgent failed to find similar incident")
 
+    def test_attribution_uses_the_analytics_resolution(self):
+        # 24 tickets every day, but the last hour of the last day is a burst
+        # of high-priority tickets.
+        day1 = pd.Timestamp("2025-11-01")
+        times = [day1 + pd.Timedelta(hours=h) for h in range(48 + 19)] + [pd.Timestamp("2025-11-03 23:00")] * 5
+        support = pd.DataFrame({"created_at": times, "priority": ["low"] * 67 + ["high"] * 5,
+                                "issue_type": ["login"] * 72})
+        insights = {"support_spike": True}
+
+        daily = RootCauseAgent(object(), knowledge_base=object())
+        self.assertEqual(daily.attribute(insights, {"support": support}), [])
+
+        hourly = RootCauseAgent(object(), knowledge_base=object(), resolution="hourly")
+        reasons = hourly.attribute(insights, {"support": support})
+        self.assertEqual((reasons[0]["dimension"], reasons[0]["segment"]), ("priority", "high"))
+
     def test_action_approval(self):
         # Mock Slack Notifier
         class MockSlack(SlackNotifier):
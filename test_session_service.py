@@ -0,0 +1,100 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from src.services.session_service import SessionService
+
+
+class TestSessionService(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "sessions.jsonl")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_create_get_update(self):
+        svc = SessionService(self.path)
+        s = svc.create_session("rollout", {"owner": "ops"})
+        self.assertEqual(svc.get_session(s["session_id"])["metadata"], {"owner": "ops"})
+        self.assertIsNone(svc.get_session("missing"))
+        self.assertIsNone(svc.update_session_state("missing", "paused"))
+
+        svc.update_session_state(s["session_id"], "paused")
+        svc.set_last_trace(s["session_id"], "t-1")
+        got = svc.get_session(s["session_id"])
+        self.assertEqual((got["state"], got["last_trace_id"]), ("paused", "t-1"))
+        # callers get copies, not the indexed records
+        got["state"] = "finished"
+        self.assertEqual(svc.get_session(s["session_id"])["state"], "paused")
+
+        reopened = SessionService(self.path)
+        self.assertEqual(reopened.get_session(s["session_id"])["last_trace_id"], "t-1")
+        self.assertEqual(len(reopened.list_sessions()), 1)
+
+    def test_state_index_and_active_session(self):
+        svc = SessionService(self.path)
+        self.assertIsNone(svc.get_active_session())
+        a, b, c = (svc.create_session(n) for n in "abc")
+        self.assertEqual(svc.get_active_session()["session_id"], c["session_id"])
+        svc.update_session_state(c["session_id"], "finished")
+        svc.set_last_trace(a["session_id"], "t")  # a becomes the most recently updated
+        self.assertEqual(svc.get_active_session()["session_id"], a["session_id"])
+        self.assertEqual([s["name"] for s in svc.list_sessions("active")], ["b", "a"])
+        self.assertEqual([s["name"] for s in svc.list_sessions("finished")], ["c"])
+        self.assertEqual([s["name"] for s in svc.list_sessions()], ["a", "b", "c"])
+        self.assertEqual([s["name"] for s in SessionService(self.path).list_sessions("active")], ["b", "a"])
+
+    def test_sees_other_instances_writes(self):
+        one, two = SessionService(self.path), SessionService(self.path)
+        s = one.create_session("shared")
+        self.assertEqual(two.get_session(s["session_id"])["name"], "shared")
+        two.update_session_state(s["session_id"], "paused")
+        self.assertEqual(one.get_session(s["session_id"])["state"], "paused")
+        self.assertIsNone(one.get_active_session())
+
+    def test_compaction_keeps_latest_and_readers_reload(self):
+        writer = SessionService(self.path, compact_min=10)
+        reader = SessionService(self.path)
+        sessions = [writer.create_session(f"s{i}") for i in range(3)]
+        for i in range(20):
+            writer.set_last_trace(sessions[i % 3]["session_id"], f"t{i}")
+        with open(self.path) as f:
+            self.assertLessEqual(len(f.readlines()), 10)
+        self.assertEqual(reader.get_session(sessions[1]["session_id"])["last_trace_id"], "t19")
+        self.assertEqual(len(reader.list_sessions()), 3)
+
+    def test_torn_last_line_is_ignored_and_overwritten(self):
+        svc = SessionService(self.path)
+        s = svc.create_session("ok")
+        with open(self.path, "ab") as f:
+            f.write(b'{"session_id": "half')
+        fresh = SessionService(self.path)
+        self.assertEqual(len(fresh.list_sessions()), 1)
+        fresh.set_last_trace(s["session_id"], "t")
+        with open(self.path) as f:
+            lines = [json.loads(line) for line in f]
+        self.assertEqual(lines[-1]["last_trace_id"], "t")
+
+    def test_imports_legacy_json_array(self):
+        legacy = [{"session_id": "x", "name": "old", "created_at": "2024-01-01T00:00:00",
+                   "updated_at": "2024-01-01T00:00:00", "state": "active", "metadata": {},
+                   "last_trace_id": None}]
+        with open(os.path.join(self.tmp, "sessions.json"), "w") as f:
+            json.dump(legacy, f, indent=2)
+        svc = SessionService(self.path)
+        self.assertEqual(svc.get_active_session()["name"], "old")
+
+        # an array stored at the log path itself is converted in place
+        in_place = os.path.join(self.tmp, "other.json")
+        with open(in_place, "w") as f:
+            json.dump(legacy, f, indent=2)
+        self.assertEqual(SessionService(in_place).get_session("x")["name"], "old")
+        with open(in_place) as f:
+            self.assertEqual(json.loads(f.readline())["session_id"], "x")
+
+
+if __name__ == "__main__":
+    unittest.main()